@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Todo, Category, Note
+from .models import Todo, Category, Note, GeocodingJob
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -26,3 +26,10 @@ class NoteAdmin(admin.ModelAdmin):
     def content_preview(self, obj):
         return obj.content[:50] + '...' if len(obj.content) > 50 else obj.content
     content_preview.short_description = 'Contenido'
+
+@admin.register(GeocodingJob)
+class GeocodingJobAdmin(admin.ModelAdmin):
+    list_display = ('todo', 'status', 'attempts', 'latitude', 'longitude', 'created_at', 'finished_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('todo__title',)
+    raw_id_fields = ('todo',)
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class AppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app'
+
+    def ready(self):
+        from . import metrics, signals  # noqa: F401
+        from .auth import check_shared_cache
+
+        check_shared_cache()
@@ -0,0 +1,85 @@
+"""
+Usuario autenticado servido desde caché.
+
+``CachedModelBackend`` guarda el ``User`` de cada sesión en la caché
+``AUTH_CACHE_ALIAS`` durante ``AUTH_USER_CACHE_TTL`` segundos, así que con
+sesiones en caché (``SESSION_MODE``) una petición autenticada no consulta la
+base de datos ni para la sesión ni para el usuario.
+
+Las señales de ``User`` (guardar, borrar) y el cierre de sesión borran la
+entrada, de modo que un cambio de contraseña invalida las demás sesiones al
+momento (la comprobación del hash de sesión usa el usuario actualizado). Un
+``QuerySet.update()`` sobre usuarios no dispara señales: hay que llamar a
+``forget_user``.
+
+Esas invalidaciones solo llegan a todos los workers si la caché es compartida:
+``check_shared_cache`` impide arrancar con una caché por proceso.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+
+# Viven en la memoria de cada proceso: un borrado no llega a los demás workers
+_PER_PROCESS_BACKENDS = {'django.core.cache.backends.locmem.LocMemCache'}
+
+
+def _cache():
+    return caches[settings.AUTH_CACHE_ALIAS]
+
+
+def _user_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def forget_user(user_id):
+    """Borra de la caché el usuario ``user_id``."""
+    _cache().delete(_user_key(user_id))
+
+
+def check_shared_cache():
+    """
+    Comprueba que las sesiones y usuarios en caché usan una caché compartida.
+
+    Raises:
+        ImproperlyConfigured: Si ``SESSION_MODE`` guarda sesiones o usuarios
+        en una caché por proceso (falta ``AUTH_CACHE_DIR`` u otro backend
+        compartido).
+    """
+    aliases = set()
+    if settings.AUTH_USER_CACHE_TTL:
+        aliases.add(settings.AUTH_CACHE_ALIAS)
+    if settings.SESSION_ENGINE == 'django.contrib.sessions.backends.cached_db':
+        aliases.add(settings.SESSION_CACHE_ALIAS)
+    for alias in sorted(aliases):
+        if settings.CACHES[alias]['BACKEND'] in _PER_PROCESS_BACKENDS:
+            raise ImproperlyConfigured(
+                f'Cached sessions and users need a cache shared by all workers '
+                f'for {alias!r}: set AUTH_CACHE_DIR or configure a shared backend'
+            )
+
+
+class CachedModelBackend(ModelBackend):
+    """``ModelBackend`` con caché de ``get_user``; sin TTL se comporta igual."""
+
+    def get_user(self, user_id):
+        ttl = settings.AUTH_USER_CACHE_TTL
+        if not ttl:
+            return super().get_user(user_id)
+        user = _cache().get(_user_key(user_id))
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                _cache().set(_user_key(user_id), user, ttl)
+        return user
+
+    async def aget_user(self, user_id):
+        ttl = settings.AUTH_USER_CACHE_TTL
+        if not ttl:
+            return await super().aget_user(user_id)
+        user = await _cache().aget(_user_key(user_id))
+        if user is None:
+            user = await super().aget_user(user_id)
+            if user is not None:
+                await _cache().aset(_user_key(user_id), user, ttl)
+        return user
@@ -0,0 +1,401 @@
+"""
+Datos sintéticos y medición de las vistas principales.
+
+``seed`` crea usuarios con tableros completos usando ``bulk_create``; como
+así no se disparan señales, mantiene a mano el índice de búsqueda y los
+contadores (igual que la importación de tableros). ``run_benchmark`` lanza
+peticiones con el cliente de pruebas de Django contra esos usuarios y
+resume, por vista, el rendimiento, la latencia (p50/p95/p99) y las
+consultas SQL; ``find_regressions`` compara el resultado con uno anterior.
+
+``measure_templates`` mide el tamaño y el tiempo de render de cada vista del
+tablero (Kanban, lista) sin caché de fragmentos, para tableros grandes.
+
+``measure_writes`` mide escrituras concurrentes desde varios procesos (como
+los workers de gunicorn), para comparar la configuración de SQLite por
+defecto de Django con la de ``settings.DATABASES``.
+"""
+from collections import Counter
+from datetime import timedelta
+import json
+import multiprocessing
+import platform
+import random
+import statistics
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import OperationalError, connection, connections, transaction
+from django.template.loader import render_to_string
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .board_cache import BOARD_VIEWS
+from .counters import apply_deltas, todo_keys
+from .geo import geohash_for
+from .models import Category, Note, Todo
+from .ordering import ORDER_GAP
+from .search import index_notes, index_todos
+from .views import board_context
+
+SEED_BATCH_SIZE = 2000
+SEED_PASSWORD = 'bench-pass-123'
+# Consultas de más por petición (de media) que no cuentan como regresión: el
+# estado de la BD cambia entre ejecuciones (tarjetas movidas, lápidas)
+QUERY_TOLERANCE = 0.5
+
+_WORDS = (
+    'revisar', 'enviar', 'preparar', 'llamar', 'comprar', 'informe', 'factura', 'reunión',
+    'cliente', 'proyecto', 'presupuesto', 'correo', 'diseño', 'servidor', 'despliegue',
+    'pruebas', 'contrato', 'entrega', 'equipo', 'agenda', 'viaje', 'médico', 'banco',
+)
+_COLORS = ('#3B82F6', '#10B981', '#F59E0B', '#EF4444', '#8B5CF6', '#EC4899')
+
+
+def _sentence(rng, words):
+    return ' '.join(rng.choice(_WORDS) for _ in range(words)).capitalize()
+
+
+def bench_users(prefix):
+    """Usuarios creados por ``seed`` con ``prefix``."""
+    return User.objects.filter(username__startswith=f'{prefix}-').order_by('id')
+
+
+def seed(users, todos, notes, categories, prefix='bench', located=0.0, random_seed=0,
+         batch_size=SEED_BATCH_SIZE):
+    """
+    Crea ``users`` usuarios ``<prefix>-<n>`` con ``categories`` categorías,
+    ``todos`` tareas y ``notes`` notas por tarea cada uno.
+
+    Args:
+        located (float): Fracción de tareas con coordenadas (alrededor de Madrid)
+        random_seed (int): Semilla; la misma semilla genera los mismos datos
+
+    Returns:
+        dict: Filas creadas por tipo
+    """
+    rng = random.Random(random_seed)
+    password = make_password(SEED_PASSWORD)
+    taken = set(bench_users(prefix).values_list('username', flat=True))
+    usernames = (f'{prefix}-{n}' for n in range(len(taken) + users) if f'{prefix}-{n}' not in taken)
+    statuses = [status for status, _ in Todo.STATUS_CHOICES]
+    priorities = [priority for priority, _ in Todo.PRIORITY_CHOICES]
+    now = timezone.now()
+    counts = {'users': 0, 'categories': 0, 'todos': 0, 'notes': 0}
+
+    for username in usernames:
+        with transaction.atomic():
+            user = User.objects.create(username=username, password=password)
+            category_ids = [
+                category.id for category in Category.objects.bulk_create([
+                    Category(user=user, name=f'Categoría {i}', color=_COLORS[i % len(_COLORS)])
+                    for i in range(categories)
+                ])
+            ]
+            column_sizes = Counter()
+            for start in range(0, todos, batch_size):
+                batch = []
+                for _ in range(start, min(start + batch_size, todos)):
+                    status = rng.choice(statuses)
+                    todo = Todo(
+                        user=user,
+                        title=_sentence(rng, rng.randint(2, 5)),
+                        description=_sentence(rng, rng.randint(0, 20)),
+                        status=status,
+                        priority=rng.choice(priorities),
+                        completed=status == 'done',
+                        todo_order=column_sizes[status] * ORDER_GAP,
+                        category_id=rng.choice(category_ids) if category_ids and rng.random() < 0.8 else None,
+                    )
+                    column_sizes[status] += 1
+                    if rng.random() < 0.5:
+                        todo.due_date = now + timedelta(hours=rng.randint(-24 * 30, 24 * 30))
+                    if rng.random() < located:
+                        todo.latitude = round(40.4168 + rng.uniform(-0.3, 0.3), 6)
+                        todo.longitude = round(-3.7038 + rng.uniform(-0.3, 0.3), 6)
+                        todo.geohash = geohash_for(todo.latitude, todo.longitude)
+                    batch.append(todo)
+                created = Todo.objects.bulk_create(batch)
+                index_todos([todo.id for todo in created])
+                apply_deltas(user.id, Counter(key for todo in created for key in todo_keys(todo)))
+                counts['todos'] += len(created)
+
+                note_batch = [
+                    Note(todo=todo, content=_sentence(rng, rng.randint(3, 30)))
+                    for todo in created for _ in range(notes)
+                ]
+                for note_start in range(0, len(note_batch), batch_size):
+                    created_notes = Note.objects.bulk_create(note_batch[note_start:note_start + batch_size])
+                    index_notes([note.id for note in created_notes])
+                    counts['notes'] += len(created_notes)
+        counts['users'] += 1
+        counts['categories'] += len(category_ids)
+    return counts
+
+
+# Cada escenario devuelve la petición ``(método, url, datos, content_type)``
+# para un usuario; ``state`` guarda sus ids de tareas y categorías.
+def _dashboard(state, rng):
+    return 'get', reverse('dashboard'), None, None
+
+
+def _todo_detail(state, rng):
+    return 'get', reverse('todo_detail', args=[rng.choice(state['todo_ids'])]), None, None
+
+
+def _add_todo(state, rng):
+    data = {'title': f'[bench] {_sentence(rng, 3)}', 'priority': 'medium'}
+    if state['category_ids']:
+        data['category'] = rng.choice(state['category_ids'])
+    return 'post', reverse('add_todo'), data, None
+
+
+def _update_todo_order(state, rng):
+    body = json.dumps({
+        'todo_id': rng.choice(state['todo_ids']),
+        'status': rng.choice(Todo.STATUS_CHOICES)[0],
+        'order': rng.randint(0, 100) * ORDER_GAP,
+    })
+    return 'post', reverse('update_todo_order'), body, 'application/json'
+
+
+def _list(state, rng):
+    return 'get', reverse('api_todos'), {'limit': 50}, None
+
+
+def _board_list(state, rng):
+    return 'get', reverse('board_view', args=['list']), None, None
+
+
+SCENARIOS = {
+    'dashboard': _dashboard,
+    'todo_detail': _todo_detail,
+    'add_todo': _add_todo,
+    'update_todo_order': _update_todo_order,
+    'list': _list,
+    'board_list': _board_list,
+}
+
+
+def _percentile(sorted_values, fraction):
+    # Interpolación lineal entre rangos (como numpy.percentile por defecto)
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(latencies, queries, errors):
+    """
+    Returns:
+        dict: Rendimiento, latencias en ms y consultas de una vista
+    """
+    ordered = sorted(latencies)
+    total = sum(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / total, 2) if total else None,
+        'latency_ms': {
+            'mean': round(statistics.fmean(ordered) * 1000, 3),
+            'p50': round(_percentile(ordered, 0.50) * 1000, 3),
+            'p95': round(_percentile(ordered, 0.95) * 1000, 3),
+            'p99': round(_percentile(ordered, 0.99) * 1000, 3),
+            'max': round(ordered[-1] * 1000, 3),
+        },
+        'queries': {
+            'mean': round(statistics.fmean(queries), 2),
+            'max': max(queries),
+        },
+    }
+
+
+def run_benchmark(users, scenarios=tuple(SCENARIOS), requests=100, warmup=10, random_seed=0):
+    """
+    Mide cada escenario con peticiones secuenciales repartidas entre ``users``.
+
+    El rendimiento es el de un único cliente (1 / latencia media); las
+    peticiones ``[bench]`` que crea ``add_todo`` se borran al terminar.
+
+    Returns:
+        dict: ``meta`` y, en ``views``, el resumen de ``summarize`` por escenario
+    """
+    rng = random.Random(random_seed)
+    users = list(users)
+    if not users:
+        raise ValueError('No hay usuarios para el benchmark')
+    clients = {}
+    states = {}
+    for user in users:
+        client = Client(HTTP_HOST='localhost')
+        client.force_login(user)
+        clients[user.id] = client
+        states[user.id] = {
+            'todo_ids': list(Todo.objects.filter(user=user).values_list('id', flat=True)),
+            'category_ids': list(Category.objects.filter(user=user).values_list('id', flat=True)),
+        }
+        if not states[user.id]['todo_ids']:
+            raise ValueError(f'{user.username} no tiene tareas')
+
+    results = {}
+    try:
+        for name in scenarios:
+            scenario = SCENARIOS[name]
+            latencies, queries, errors = [], [], 0
+            for i in range(warmup + requests):
+                user = users[i % len(users)]
+                method, url, data, content_type = scenario(states[user.id], rng)
+                kwargs = {'content_type': content_type} if content_type else {}
+                with CaptureQueriesContext(connection) as ctx:
+                    start = time.perf_counter()
+                    response = getattr(clients[user.id], method)(url, data, **kwargs)
+                    elapsed = time.perf_counter() - start
+                if i < warmup:
+                    continue
+                latencies.append(elapsed)
+                queries.append(len(ctx.captured_queries))
+                errors += response.status_code >= 400
+            results[name] = summarize(latencies, queries, errors)
+    finally:
+        Todo.objects.filter(user__in=users, title__startswith='[bench] ').delete()
+
+    return {
+        'meta': {
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'users': len(users),
+            'requests': requests,
+            'warmup': warmup,
+        },
+        'views': results,
+    }
+
+
+def find_regressions(results, baseline, max_regression=0.25):
+    """
+    Compara un resultado con otro anterior.
+
+    Una vista empeora si su p95 supera al de referencia en más de
+    ``max_regression`` (fracción), si hace de media más de
+    ``QUERY_TOLERANCE`` consultas extra o si tiene errores.
+
+    Returns:
+        list: Mensajes, uno por regresión (vacía si no hay)
+    """
+    problems = []
+    for name, current in results['views'].items():
+        if current['errors']:
+            problems.append(f'{name}: {current["errors"]} respuestas con error')
+        previous = baseline.get('views', {}).get(name)
+        if previous is None:
+            continue
+        limit = previous['latency_ms']['p95'] * (1 + max_regression)
+        if current['latency_ms']['p95'] > limit:
+            problems.append(
+                f'{name}: p95 {current["latency_ms"]["p95"]:.1f} ms > {limit:.1f} ms '
+                f'(referencia {previous["latency_ms"]["p95"]:.1f} ms)'
+            )
+        if current['queries']['mean'] > previous['queries']['mean'] + QUERY_TOLERANCE:
+            problems.append(
+                f'{name}: {current["queries"]["mean"]} consultas de media '
+                f'(referencia {previous["queries"]["mean"]})'
+            )
+    return problems
+
+
+def measure_templates(user, repeat=5):
+    """
+    Renderiza cada vista del tablero de ``user`` ``repeat`` veces, con los
+    datos ya cargados: solo cuenta el render de la plantilla.
+
+    Returns:
+        dict: ``todos`` y, en ``views``, ``bytes`` del HTML y tiempos de
+        render en ms (``min``, ``p50``, ``max``) por vista
+    """
+    request = RequestFactory().get(reverse('dashboard'), HTTP_HOST='localhost')
+    request.user = user
+    context = board_context(user)
+    results = {}
+    for view, template in BOARD_VIEWS.items():
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            html = render_to_string(template, context, request)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        results[view] = {
+            'bytes': len(html.encode()),
+            'render_ms': {
+                'min': round(timings[0] * 1000, 3),
+                'p50': round(_percentile(timings, 0.50) * 1000, 3),
+                'max': round(timings[-1] * 1000, 3),
+            },
+        }
+    return {'todos': len(context['todos']), 'views': results}
+
+
+WRITE_TITLE_PREFIX = '[bench-writes] '
+
+
+def _write_worker(args):
+    options, user_id, deadline, worker = args
+    # Proceso hijo: conexión propia con las opciones del modo medido
+    connection.settings_dict['OPTIONS'] = options
+    committed, locked, latencies = 0, 0, []
+    n = 0
+    while time.time() < deadline:
+        n += 1
+        start = time.perf_counter()
+        try:
+            # Lee y escribe en la misma transacción, como reorder_column o la
+            # importación de tableros
+            with transaction.atomic():
+                last = (
+                    Todo.objects.filter(user_id=user_id, status='todo')
+                    .order_by('-todo_order').values_list('todo_order', flat=True).first()
+                )
+                Todo.objects.create(
+                    user_id=user_id, title=f'{WRITE_TITLE_PREFIX}{worker}-{n}',
+                    todo_order=(last or 0) + ORDER_GAP,
+                )
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            locked += 1
+            continue
+        committed += 1
+        latencies.append(time.perf_counter() - start)
+    connection.close()
+    return committed, locked, latencies
+
+
+def measure_writes(options, user, workers=4, seconds=5.0):
+    """
+    Escrituras concurrentes desde ``workers`` procesos durante ``seconds``.
+
+    Args:
+        options (dict): ``OPTIONS`` de la conexión en los procesos hijos
+
+    Returns:
+        dict: ``commits_per_second``, ``locked_errors`` y latencias en ms de
+        las transacciones confirmadas
+    """
+    connections.close_all()  # Los hijos no deben heredar la conexión abierta
+    deadline = time.time() + seconds
+    with multiprocessing.get_context('fork').Pool(workers) as pool:
+        results = pool.map(_write_worker, [(options, user.id, deadline, i) for i in range(workers)])
+    committed = sum(r[0] for r in results)
+    latencies = sorted(latency for r in results for latency in r[2])
+    return {
+        'workers': workers,
+        'commits_per_second': round(committed / seconds, 1),
+        'locked_errors': sum(r[1] for r in results),
+        'latency_ms': {
+            'p50': round(_percentile(latencies, 0.50) * 1000, 3) if latencies else None,
+            'p95': round(_percentile(latencies, 0.95) * 1000, 3) if latencies else None,
+        },
+    }
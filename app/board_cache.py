@@ -0,0 +1,154 @@
+"""
+Caché de fragmentos del tablero por usuario, invalidada por versión.
+
+Cada usuario tiene un número de versión en la caché ``BOARD_CACHE_ALIAS``.
+Los fragmentos renderizados (Kanban, lista) se guardan bajo una clave que
+incluye esa versión, así que invalidar es solo incrementar el número: las
+claves viejas dejan de leerse y caducan solas, sin recorrer la caché.
+
+El dashboard solo renderiza la vista activa (``BOARD_VIEWS``, elegida con
+la cookie ``BOARD_VIEW_COOKIE``); la otra se pide como fragmento al
+mostrarla.
+
+Tras cada invalidación confirmada se envía ``board_changed`` (con
+``user_id``); ``app/live.py`` lo usa para avisar a los navegadores abiertos.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.dispatch import Signal
+
+from .metrics import record_cache_lookup
+
+board_changed = Signal()
+
+# Vistas del tablero y plantilla de su fragmento
+BOARD_VIEWS = {
+    'kanban': 'app/dashboard_content.html',
+    'list': 'app/list_view_content.html',
+}
+BOARD_VIEW_COOKIE = 'board_view'  # La escribe board.js al cambiar de vista
+
+
+class FragmentStats:
+    """
+    Contadores de aciertos/fallos de la caché de fragmentos (por proceso);
+    también van a ``/metrics`` como ``todo_cache_lookups{cache="board_fragment"}``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit):
+        record_cache_lookup('board_fragment', 'hit' if hit else 'miss')
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+
+fragment_stats = FragmentStats()
+
+
+def active_view(request):
+    view = request.COOKIES.get(BOARD_VIEW_COOKIE)
+    return view if view in BOARD_VIEWS else 'kanban'
+
+
+def _cache():
+    return caches[settings.BOARD_CACHE_ALIAS]
+
+
+def _version_key(user_id):
+    return f'board:{user_id}:version'
+
+
+def _initial_version():
+    # Si la clave de versión se pierde (expulsión, reinicio) la nueva versión
+    # no puede coincidir con una anterior, o se servirían fragmentos viejos.
+    return time.time_ns()
+
+
+def get_version(user_id):
+    cache = _cache()
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        version = _initial_version()
+        if not cache.add(_version_key(user_id), version, None):
+            version = cache.get(_version_key(user_id), version)
+    return version
+
+
+def get_versions(user_ids):
+    """
+    Returns:
+        dict: Versión actual de cada usuario de ``user_ids`` que tenga una
+    """
+    versions = _cache().get_many([_version_key(user_id) for user_id in user_ids])
+    return {user_id: versions[_version_key(user_id)] for user_id in user_ids if _version_key(user_id) in versions}
+
+
+def bump_version(user_id):
+    cache = _cache()
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        cache.set(_version_key(user_id), _initial_version(), None)
+
+
+def invalidate_board(user_id):
+    """
+    Invalida los fragmentos cacheados del usuario.
+
+    Dentro de una transacción se vuelve a invalidar al hacer commit, para
+    que nada renderizado con los datos anteriores quede cacheado bajo la
+    versión nueva.
+    """
+    bump_version(user_id)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: bump_version(user_id))
+    # Fuera de una transacción se ejecuta en el acto
+    transaction.on_commit(lambda: board_changed.send(sender=None, user_id=user_id))
+
+
+def board_fragment(user_id, name, render):
+    """
+    Devuelve el fragmento ``name`` del tablero del usuario.
+
+    Args:
+        user_id (int): Usuario dueño del tablero
+        name (str): Nombre del fragmento (``kanban``, ``list``...)
+        render (callable): Renderiza el fragmento si no está en caché
+
+    Returns:
+        str: HTML del fragmento
+    """
+    cache = _cache()
+    # Con el salt de despliegue, HTML de plantillas anteriores no se reutiliza
+    key = f'board:{user_id}:{get_version(user_id)}:{name}:{settings.CONDITIONAL_GET_SALT}'
+    html = cache.get(key)
+    fragment_stats.record(html is not None)
+    if html is None:
+        html = render()
+        cache.set(key, html, settings.BOARD_CACHE_TTL)
+    return html
@@ -0,0 +1,190 @@
+"""
+Escrituras masivas de tareas, categorías y notas.
+
+``bulk_create``, ``bulk_update`` y los DELETE de este módulo no disparan las
+señales de ``app/signals.py``, así que cada función hace lo que harían
+ellas: geohash, contadores, índice de búsqueda y lápidas. La caché del
+tablero no: quien llama invalida una sola vez al final con
+``invalidate_board``.
+
+Todas esperan ids ya filtrados por usuario o los filtran ellas, y deben
+llamarse dentro de una transacción.
+"""
+from collections import Counter
+
+from django.utils import timezone
+
+from .counters import apply_deltas, todo_keys
+from .geo import geohash_for
+from .models import Category, GeocodingJob, Note, Todo, Tombstone
+from .search import index_notes, index_todos, unindex
+
+# Campos de Todo de los que dependen los contadores (ver counters.counter_keys)
+COUNTER_FIELDS = ('status', 'priority', 'completed', 'due_date')
+# Campos de Todo y Note que guarda el índice de búsqueda
+INDEXED_FIELDS = {'title', 'description', 'content'}
+
+
+def _raw_delete(queryset):
+    # Con receptores de señales, QuerySet.delete() carga y borra fila a fila
+    return queryset._raw_delete(queryset.db)
+
+
+def _record_deletions(user_id, model, object_ids):
+    Tombstone.objects.bulk_create(
+        [Tombstone(user_id=user_id, model=model, object_id=object_id) for object_id in object_ids]
+    )
+
+
+def create_todos(user_id, todos):
+    """
+    Returns:
+        list: Las tareas creadas, con id
+    """
+    for todo in todos:
+        todo.user_id = user_id
+        todo.geohash = geohash_for(todo.latitude, todo.longitude)
+    created = Todo.objects.bulk_create(todos)
+    index_todos([todo.id for todo in created])
+    apply_deltas(user_id, Counter(key for todo in created for key in todo_keys(todo)))
+    for todo in created:
+        todo._counter_keys = todo_keys(todo)
+    return created
+
+
+def update_todos(user_id, todos, fields):
+    """
+    Guarda ``fields`` de ``todos``, cargadas completas antes de modificarlas:
+    los contadores se ajustan con las claves que recordaron al cargarse.
+    """
+    if not todos:
+        return
+    now = timezone.now()
+    deltas = Counter()
+    for todo in todos:
+        todo.updated_at = now
+        todo.geohash = geohash_for(todo.latitude, todo.longitude)
+        new_keys = todo_keys(todo)
+        deltas.update(new_keys)
+        deltas.subtract(todo._counter_keys)
+        todo._counter_keys = new_keys
+    Todo.objects.bulk_update(todos, [*fields, 'geohash', 'updated_at'])
+    if INDEXED_FIELDS & set(fields):
+        index_todos([todo.id for todo in todos])
+    apply_deltas(user_id, deltas)
+
+
+def set_todo_fields(user_id, todo_ids, values):
+    """
+    Pone ``values`` (campo -> valor) en las tareas del usuario con esos ids
+    con un solo UPDATE, sin cargar las tareas. Solo para campos que no
+    cambian el geohash ni el índice de búsqueda (estado, prioridad,
+    completada, categoría...).
+
+    Returns:
+        tuple: ``(encontradas, modificadas)``; las que ya tenían esos valores
+        no se escriben
+    """
+    fields = [field for field in COUNTER_FIELDS if field not in values]
+    rows = list(
+        Todo.objects.select_for_update()
+        .filter(user_id=user_id, id__in=todo_ids)
+        .values('id', *values, *fields)
+    )
+    changed = [row for row in rows if any(row[field] != value for field, value in values.items())]
+    if not changed:
+        return len(rows), 0
+    Todo.objects.filter(user_id=user_id, id__in=[row['id'] for row in changed]).update(
+        **values, updated_at=timezone.now(),
+    )
+    if set(COUNTER_FIELDS) & set(values):
+        deltas = Counter()
+        for row in changed:
+            old = {field: row[field] for field in COUNTER_FIELDS}
+            deltas.update(todo_keys(Todo(**{**old, **values})))
+            deltas.subtract(todo_keys(Todo(**old)))
+        apply_deltas(user_id, deltas)
+    return len(rows), len(changed)
+
+
+def delete_todos(user_id, todo_ids):
+    """
+    Borra las tareas del usuario con esos ids, con sus notas y trabajos de
+    geocodificación.
+
+    Returns:
+        list: Ids de las tareas borradas
+    """
+    rows = list(Todo.objects.filter(user_id=user_id, id__in=todo_ids).values('id', *COUNTER_FIELDS))
+    deleted = [row.pop('id') for row in rows]
+    if not deleted:
+        return []
+    note_ids = list(Note.objects.filter(todo_id__in=deleted).values_list('id', flat=True))
+    _raw_delete(Note.objects.filter(todo_id__in=deleted))
+    _raw_delete(GeocodingJob.objects.filter(todo_id__in=deleted))
+    _raw_delete(Todo.objects.filter(id__in=deleted))
+
+    _record_deletions(user_id, 'note', note_ids)
+    _record_deletions(user_id, 'todo', deleted)
+    unindex('note', note_ids)
+    unindex('todo', deleted)
+    deltas = Counter()
+    for row in rows:
+        deltas.subtract(todo_keys(Todo(**row)))
+    apply_deltas(user_id, deltas)
+    return deleted
+
+
+def create_notes(notes):
+    created = Note.objects.bulk_create(notes)
+    index_notes([note.id for note in created])
+    return created
+
+
+def update_notes(notes, fields):
+    if not notes:
+        return
+    now = timezone.now()
+    for note in notes:
+        note.updated_at = now
+    Note.objects.bulk_update(notes, [*fields, 'updated_at'])
+    if INDEXED_FIELDS & set(fields):
+        index_notes([note.id for note in notes])
+
+
+def delete_notes(user_id, note_ids):
+    """
+    Returns:
+        list: Ids de las notas del usuario borradas
+    """
+    deleted = list(Note.objects.filter(todo__user_id=user_id, id__in=note_ids).values_list('id', flat=True))
+    if deleted:
+        _raw_delete(Note.objects.filter(id__in=deleted))
+        _record_deletions(user_id, 'note', deleted)
+        unindex('note', deleted)
+    return deleted
+
+
+def update_categories(categories, fields):
+    if not categories:
+        return
+    now = timezone.now()
+    for category in categories:
+        category.updated_at = now
+    Category.objects.bulk_update(categories, [*fields, 'updated_at'])
+
+
+def delete_categories(user_id, category_ids):
+    """
+    Borra las categorías del usuario con esos ids; sus tareas se quedan sin
+    categoría (como ``on_delete=SET_NULL``) y cuentan como modificadas.
+
+    Returns:
+        list: Ids de las categorías borradas
+    """
+    deleted = list(Category.objects.filter(user_id=user_id, id__in=category_ids).values_list('id', flat=True))
+    if deleted:
+        Todo.objects.filter(category_id__in=deleted).update(category=None, updated_at=timezone.now())
+        _raw_delete(Category.objects.filter(id__in=deleted))
+        _record_deletions(user_id, 'category', deleted)
+    return deleted
@@ -0,0 +1,161 @@
+"""
+Cambios del tablero desde un cursor, para actualizar la página sin recargarla.
+
+El cursor es un instante. Se devuelven las tareas (índice
+``(user, updated_at)``), categorías y notas con ``updated_at`` posterior y
+las lápidas de lo borrado desde entonces (índice ``(user, deleted_at)``).
+
+``updated_at`` se fija al guardar, antes de confirmar la transacción, así que
+una escritura en curso puede quedar con una fecha anterior a la lectura y
+hacerse visible después. Por eso el cursor nuevo se toma antes de leer y
+``CHANGES_OVERLAP`` hacia atrás: el cliente recibe algunas filas repetidas y
+debe aplicarlas de forma idempotente.
+
+Las escrituras que no pasan por ``save()`` deben actualizar ``updated_at``
+ellas mismas (como ``reorder_column`` o la geocodificación) para aparecer
+aquí.
+
+Las lápidas se guardan ``TOMBSTONE_RETENTION_DAYS`` días (``prune_tombstones``,
+desde ``reconcile_counters``): un cursor más antiguo recibe ``reset``.
+"""
+import base64
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Category, Note, Todo, Tombstone
+from .pagination import InvalidCursor
+
+CHANGES_OVERLAP = timedelta(seconds=5)
+# Con más cambios que estos en un modelo sale más a cuenta recargar
+CHANGES_MAX_ROWS = 500
+
+TODO_CHANGE_FIELDS = (
+    'id', 'title', 'description', 'status', 'priority', 'completed', 'category_id',
+    'todo_order', 'due_date', 'address', 'latitude', 'longitude', 'location_updated_at',
+    'created_at', 'updated_at',
+)
+CATEGORY_CHANGE_FIELDS = ('id', 'name', 'color', 'updated_at')
+NOTE_CHANGE_FIELDS = ('id', 'todo_id', 'content', 'created_at', 'updated_at')
+
+
+def encode_cursor(moment):
+    return base64.urlsafe_b64encode(moment.isoformat().encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Returns:
+        datetime: Instante del cursor
+
+    Raises:
+        InvalidCursor: Si el cursor no es válido.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        moment = parse_datetime(base64.urlsafe_b64decode(padded).decode())
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(str(e)) from e
+    if moment is None or timezone.is_naive(moment):
+        raise InvalidCursor(cursor)
+    return moment
+
+
+def current_cursor():
+    """Cursor para una página que se va a generar ahora."""
+    return encode_cursor(timezone.now() - CHANGES_OVERLAP)
+
+
+def tombstone_cutoff(now=None):
+    """Instante antes del cual las lápidas pueden haberse purgado."""
+    return (now or timezone.now()) - timedelta(days=settings.TOMBSTONE_RETENTION_DAYS)
+
+
+def prune_tombstones(user_id, now=None):
+    """
+    Borra las lápidas de ``user_id`` anteriores a ``tombstone_cutoff``.
+
+    Se conserva la más reciente de cada modelo: de ellas salen el ETag y el
+    Last-Modified del tablero y del detalle (app/freshness.py), que así no
+    cambian al purgar.
+
+    Returns:
+        int: Lápidas borradas
+    """
+    newest = [
+        Tombstone.objects.filter(user_id=user_id, model=model)
+        .order_by('-deleted_at', '-id').values_list('id', flat=True).first()
+        for model, _ in Tombstone.MODEL_CHOICES
+    ]
+    deleted, _ = (
+        Tombstone.objects.filter(user_id=user_id, deleted_at__lt=tombstone_cutoff(now))
+        .exclude(id__in=[tombstone_id for tombstone_id in newest if tombstone_id is not None])
+        .delete()
+    )
+    return deleted
+
+
+def _limited(queryset):
+    rows = list(queryset[:CHANGES_MAX_ROWS + 1])
+    return rows, len(rows) > CHANGES_MAX_ROWS
+
+
+def changes_since(user, since):
+    """
+    Tareas, categorías y notas de ``user`` modificadas después de ``since``
+    y los ids borrados desde entonces.
+
+    Las tareas de una categoría modificada se incluyen aunque no hayan
+    cambiado, porque muestran su nombre y color.
+
+    Returns:
+        dict: ``cursor`` para la siguiente llamada, ``reset`` (True si hay
+        demasiados cambios y conviene recargar; entonces no hay filas),
+        ``todos`` (instancias con ``category`` cargada), ``categories`` y
+        ``notes`` (diccionarios) y ``deleted`` (ids por modelo)
+    """
+    cursor = current_cursor()
+    if since < tombstone_cutoff():
+        # Los borrados de entonces pueden no tener ya lápida
+        return {'cursor': cursor, 'reset': True, 'todos': [], 'categories': [], 'notes': [], 'deleted': {}}
+
+    categories, too_many = _limited(
+        Category.objects.filter(user=user, updated_at__gt=since).order_by().values(*CATEGORY_CHANGE_FIELDS)
+    )
+    changed = Todo.objects.filter(user=user, updated_at__gt=since)
+    if categories:
+        changed = changed | Todo.objects.filter(user=user, category_id__in=[c['id'] for c in categories])
+    todos, too_many_todos = _limited(changed.select_related('category').order_by('updated_at', 'id'))
+    notes, too_many_notes = _limited(
+        Note.objects.filter(todo__user=user, updated_at__gt=since).order_by('updated_at', 'id')
+        .values(*NOTE_CHANGE_FIELDS)
+    )
+    tombstones, too_many_tombstones = _limited(
+        Tombstone.objects.filter(user=user, deleted_at__gt=since).values_list('model', 'object_id')
+    )
+    if too_many or too_many_todos or too_many_notes or too_many_tombstones:
+        return {'cursor': cursor, 'reset': True, 'todos': [], 'categories': [], 'notes': [], 'deleted': {}}
+
+    deleted = {model: [] for model, _ in Tombstone.MODEL_CHOICES}
+    for model, object_id in tombstones:
+        deleted[model].append(object_id)
+
+    return {
+        'cursor': cursor,
+        'reset': False,
+        'todos': todos,
+        'categories': categories,
+        'notes': notes,
+        'deleted': deleted,
+    }
+
+
+def todo_state(todo):
+    """Campos de ``TODO_CHANGE_FIELDS`` de una tarea, listos para JSON."""
+    state = {field: getattr(todo, field) for field in TODO_CHANGE_FIELDS}
+    for field in ('latitude', 'longitude'):
+        if state[field] is not None:
+            state[field] = float(state[field])
+    return state
@@ -0,0 +1,164 @@
+"""
+Contadores de tareas por usuario mantenidos de forma incremental.
+
+Cada usuario tiene filas ``TodoCounter`` con claves:
+
+- ``total``
+- ``status:<estado>``
+- ``priority:<prioridad>``
+- ``completed``
+- ``due:<AAAA-MM-DD>``: tareas sin completar que vencen ese día (fecha local)
+
+Las vencidas se obtienen sumando los ``due:`` anteriores a hoy, así que las
+estadísticas se leen solo de esta tabla. Las señales de ``Todo`` aplican la
+diferencia de claves de cada escritura con un único UPDATE con expresiones
+``F()``; las escrituras masivas deben llamar a ``apply_deltas`` o
+``reconcile``.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, Count, F, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Todo, TodoCounter
+
+
+def counter_keys(status, priority, completed, due_date):
+    """
+    Claves de contador a las que suma una tarea con estos valores.
+
+    Returns:
+        list: Claves de ``TodoCounter``
+    """
+    keys = ['total', f'status:{status}', f'priority:{priority}']
+    if completed:
+        keys.append('completed')
+    elif due_date is not None:
+        if timezone.is_naive(due_date):
+            # Igual que al guardar: las fechas sin zona son de la zona actual
+            due_date = timezone.make_aware(due_date)
+        keys.append(f'due:{timezone.localdate(due_date).isoformat()}')
+    return keys
+
+
+def todo_keys(todo):
+    return counter_keys(todo.status, todo.priority, todo.completed, todo.due_date)
+
+
+def key_deltas(old_keys, new_keys):
+    """
+    Returns:
+        dict: Diferencia por clave entre dos estados de una tarea (sin ceros)
+    """
+    deltas = Counter(new_keys)
+    deltas.subtract(old_keys)
+    return {key: delta for key, delta in deltas.items() if delta}
+
+
+def apply_deltas(user_id, deltas):
+    """
+    Suma ``deltas`` (clave -> incremento) a los contadores del usuario.
+
+    Es un solo UPDATE con ``value = value + CASE key ...``; las claves que aún
+    no tienen fila se crean y se vuelven a actualizar.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    def update(keys):
+        return TodoCounter.objects.filter(user_id=user_id, key__in=keys).update(
+            value=F('value') + Case(*(When(key=key, then=deltas[key]) for key in keys), default=0)
+        )
+
+    if update(list(deltas)) == len(deltas):
+        return
+
+    existing = set(TodoCounter.objects.filter(user_id=user_id, key__in=list(deltas)).values_list('key', flat=True))
+    missing = [key for key in deltas if key not in existing]
+    with transaction.atomic():
+        # ignore_conflicts: otra petición puede crear la misma fila a la vez
+        TodoCounter.objects.bulk_create(
+            [TodoCounter(user_id=user_id, key=key) for key in missing], ignore_conflicts=True,
+        )
+        update(missing)
+
+
+def compute_counters(user_id):
+    """
+    Recalcula los contadores de un usuario desde ``Todo``.
+
+    Returns:
+        dict: Clave -> valor, sin ceros salvo ``total``
+    """
+    todos = Todo.objects.filter(user_id=user_id).order_by()
+    counters = Counter({'total': 0})
+    for status, count in todos.values_list('status').annotate(count=Count('id')):
+        counters[f'status:{status}'] += count
+        counters['total'] += count
+    for priority, count in todos.values_list('priority').annotate(count=Count('id')):
+        counters[f'priority:{priority}'] += count
+    counters['completed'] += todos.filter(completed=True).count()
+
+    due_days = (
+        todos.filter(completed=False, due_date__isnull=False)
+        .annotate(day=TruncDate('due_date', tzinfo=timezone.get_current_timezone()))
+        .values_list('day').annotate(count=Count('id'))
+    )
+    for day, count in due_days:
+        counters[f'due:{day.isoformat()}'] += count
+    return {key: value for key, value in counters.items() if value or key == 'total'}
+
+
+def reconcile(user_id):
+    """
+    Repara los contadores de un usuario si se han desviado.
+
+    Returns:
+        dict: Claves corregidas con ``(valor_anterior, valor_correcto)``
+    """
+    with transaction.atomic():
+        # Bloquea las escrituras concurrentes de contadores del usuario
+        current = dict(
+            TodoCounter.objects.select_for_update().filter(user_id=user_id).values_list('key', 'value')
+        )
+        expected = compute_counters(user_id)
+        drift = {
+            key: (current.get(key, 0), expected.get(key, 0))
+            for key in current.keys() | expected.keys()
+            if current.get(key, 0) != expected.get(key, 0)
+        }
+        TodoCounter.objects.filter(user_id=user_id).exclude(key__in=list(expected)).delete()
+        TodoCounter.objects.bulk_create(
+            [TodoCounter(user_id=user_id, key=key, value=value) for key, value in expected.items()],
+            update_conflicts=True, unique_fields=['user', 'key'], update_fields=['value'],
+        )
+    return drift
+
+
+def get_stats(user_id):
+    """
+    Estadísticas del tablero leídas solo de ``TodoCounter``.
+
+    Returns:
+        dict: ``total``, ``completed``, ``pending``, ``completion_rate``,
+        ``overdue``, ``due_today``, ``by_status`` y ``by_priority``
+    """
+    counters = dict(TodoCounter.objects.filter(user_id=user_id).values_list('key', 'value'))
+    today = f'due:{timezone.localdate().isoformat()}'
+    total = counters.get('total', 0)
+    completed = counters.get('completed', 0)
+    return {
+        'total': total,
+        'completed': completed,
+        'pending': total - completed,
+        'completion_rate': round(completed / total, 4) if total else 0.0,
+        'overdue': sum(v for k, v in counters.items() if k.startswith('due:') and k < today),
+        'due_today': counters.get(today, 0),
+        'by_status': {status: counters.get(f'status:{status}', 0) for status, _ in Todo.STATUS_CHOICES},
+        'by_priority': {
+            priority: counters.get(f'priority:{priority}', 0) for priority, _ in Todo.PRIORITY_CHOICES
+        },
+    }
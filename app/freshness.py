@@ -0,0 +1,107 @@
+"""
+Validadores para GET condicional (ETag / Last-Modified).
+
+Calculan un testigo de frescura barato a partir de agregados sobre columnas
+indexadas (``updated_at`` máximo y número de filas) más las lápidas de
+borrado, de modo que ``django.views.decorators.http.condition`` pueda
+responder 304 antes de ejecutar la vista y renderizar la plantilla.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Count, Max, OuterRef, Subquery, Value
+
+from .board_cache import active_view
+from .models import Category, Note, Todo, Tombstone
+
+
+def _scalar(queryset, aggregate):
+    """Subconsulta escalar con ``aggregate`` sobre todo ``queryset``."""
+    return Subquery(
+        queryset.order_by().annotate(_all=Value(1)).values('_all')
+        .annotate(value=aggregate).values('value')
+    )
+
+
+def _latest(*timestamps):
+    timestamps = [ts for ts in timestamps if ts is not None]
+    return max(timestamps) if timestamps else None
+
+
+def _etag(request, *parts):
+    # La cookie CSRF forma parte del testigo: las páginas con formularios
+    # llevan un token ligado a ella.
+    parts = (settings.CONDITIONAL_GET_SALT, request.user.pk, request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')) + parts
+    raw = '|'.join(str(part) for part in parts)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _memoize(request, key, compute):
+    state = request.__dict__.setdefault('_freshness', {})
+    if key not in state:
+        state[key] = compute()
+    return state[key]
+
+
+def _dashboard_state(request):
+    # Una sola consulta: los agregados van como subconsultas escalares
+    todos = Todo.objects.filter(user=OuterRef('pk'))
+    categories = Category.objects.filter(user=OuterRef('pk'))
+    state = User.objects.filter(pk=request.user.pk).values(
+        todos_latest=_scalar(todos, Max('updated_at')),
+        todos_count=_scalar(todos, Count('id')),
+        categories_latest=_scalar(categories, Max('updated_at')),
+        categories_count=_scalar(categories, Count('id')),
+        deleted_latest=_scalar(Tombstone.objects.filter(user=OuterRef('pk')), Max('deleted_at')),
+    ).get()
+    return (
+        _etag(request, 'dashboard', active_view(request), state['todos_latest'], state['todos_count'],
+              state['categories_latest'], state['categories_count'], state['deleted_latest']),
+        _latest(state['todos_latest'], state['categories_latest'], state['deleted_latest']),
+    )
+
+
+def _todo_detail_state(request, todo_id):
+    notes = Note.objects.filter(todo=OuterRef('pk'))
+    categories = Category.objects.filter(user=OuterRef('user'))
+    deleted = Tombstone.objects.filter(user=OuterRef('user'), model__in=['note', 'category'])
+    state = Todo.objects.filter(id=todo_id, user=request.user).values(
+        'updated_at',
+        notes_latest=_scalar(notes, Max('updated_at')),
+        notes_count=_scalar(notes, Count('id')),
+        categories_latest=_scalar(categories, Max('updated_at')),
+        categories_count=_scalar(categories, Count('id')),
+        deleted_latest=_scalar(deleted, Max('deleted_at')),
+    ).first()
+    if state is None:
+        return None, None  # La vista responde 404
+    return (
+        _etag(request, 'todo', todo_id, state['updated_at'], state['notes_latest'], state['notes_count'],
+              state['categories_latest'], state['categories_count'], state['deleted_latest']),
+        _latest(state['updated_at'], state['notes_latest'], state['categories_latest'], state['deleted_latest']),
+    )
+
+
+def dashboard_etag(request):
+    if not request.user.is_authenticated:
+        return None
+    return _memoize(request, 'dashboard', lambda: _dashboard_state(request))[0]
+
+
+def dashboard_last_modified(request):
+    if not request.user.is_authenticated:
+        return None
+    return _memoize(request, 'dashboard', lambda: _dashboard_state(request))[1]
+
+
+def todo_detail_etag(request, todo_id):
+    if not request.user.is_authenticated:
+        return None
+    return _memoize(request, 'todo', lambda: _todo_detail_state(request, todo_id))[0]
+
+
+def todo_detail_last_modified(request, todo_id):
+    if not request.user.is_authenticated:
+        return None
+    return _memoize(request, 'todo', lambda: _todo_detail_state(request, todo_id))[1]
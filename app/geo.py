@@ -0,0 +1,208 @@
+"""
+Búsqueda espacial de tareas con ubicación sin extensiones GIS.
+
+Cada tarea con coordenadas guarda su geohash en ``Todo.geohash`` (índice
+``(user, geohash)``). Las celdas de un geohash son prefijos, así que las
+tareas dentro de una celda son un rango contiguo del índice. Para buscar
+alrededor de un punto se cubre la caja envolvente del radio con unas pocas
+celdas, se leen esos rangos filtrando además por la caja, y solo sobre esos
+candidatos se calcula la distancia exacta (haversine).
+"""
+import math
+
+from django.db.models import Q
+
+from .models import Todo
+
+GEOHASH_PRECISION = 9  # Celdas de ~5 m
+EARTH_RADIUS_KM = 6371.0088
+MAX_COVER_CELLS = 16
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """
+    Args:
+        latitude (float): Latitud en grados
+        longitude (float): Longitud en grados
+        precision (int): Caracteres del geohash
+
+    Returns:
+        str: Geohash del punto
+    """
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True  # Los bits pares son de longitud
+    while len(chars) < precision:
+        if even:
+            interval, coordinate = lon_range, longitude
+        else:
+            interval, coordinate = lat_range, latitude
+        middle = (interval[0] + interval[1]) / 2
+        if coordinate >= middle:
+            value = value * 2 + 1
+            interval[0] = middle
+        else:
+            value = value * 2
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = value = 0
+    return ''.join(chars)
+
+
+def geohash_for(latitude, longitude):
+    """Geohash de unas coordenadas de ``Todo`` (o None si faltan)."""
+    if latitude is None or longitude is None:
+        return None
+    return encode_geohash(float(latitude), float(longitude))
+
+
+def _cell_size(precision):
+    """Alto y ancho en grados de una celda de ``precision`` caracteres."""
+    lat_bits = 5 * precision // 2
+    lon_bits = 5 * precision - lat_bits
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_boxes(latitude, longitude, radius_km):
+    """
+    Cajas ``(lat_min, lon_min, lat_max, lon_max)`` que contienen el círculo.
+
+    Returns:
+        list: Una caja, o dos si el círculo cruza el antimeridiano
+    """
+    delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    lat_min, lat_max = latitude - delta_lat, latitude + delta_lat
+    if lat_min <= -90 or lat_max >= 90:
+        # Incluye un polo: todas las longitudes
+        return [(max(lat_min, -90.0), -180.0, min(lat_max, 90.0), 180.0)]
+
+    delta_lon = math.degrees(
+        math.asin(min(1.0, math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(latitude))))
+    )
+    lon_min, lon_max = longitude - delta_lon, longitude + delta_lon
+    if delta_lon >= 180 or lon_max - lon_min >= 360:
+        return [(lat_min, -180.0, lat_max, 180.0)]
+    if lon_min < -180:
+        return [(lat_min, lon_min + 360, lat_max, 180.0), (lat_min, -180.0, lat_max, lon_max)]
+    if lon_max > 180:
+        return [(lat_min, lon_min, lat_max, 180.0), (lat_min, -180.0, lat_max, lon_max - 360)]
+    return [(lat_min, lon_min, lat_max, lon_max)]
+
+
+def covering_cells(box):
+    """
+    Prefijos geohash que cubren la caja, con la mayor precisión que no
+    pase de ``MAX_COVER_CELLS`` celdas.
+
+    Returns:
+        set: Prefijos; vacío si ni con un carácter basta (la caja es casi
+        todo el planeta y solo se filtra por la caja)
+    """
+    lat_min, lon_min, lat_max, lon_max = box
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        cell_lat, cell_lon = _cell_size(precision)
+        # La rejilla de geohash empieza en (-90, -180)
+        rows = range(math.floor((lat_min + 90) / cell_lat), math.floor((lat_max + 90) / cell_lat) + 1)
+        cols = range(math.floor((lon_min + 180) / cell_lon), math.floor((lon_max + 180) / cell_lon) + 1)
+        if len(rows) * len(cols) <= MAX_COVER_CELLS:
+            return {
+                encode_geohash(
+                    min(-90 + (row + 0.5) * cell_lat, 90.0),
+                    min(-180 + (col + 0.5) * cell_lon, 180.0),
+                    precision,
+                )
+                for row in rows for col in cols
+            }
+    return set()
+
+
+def _box_filter(user_id, boxes):
+    # Cada rama del OR lleva el usuario para que SQLite haga una búsqueda
+    # por rango en (user, geohash) por celda (MULTI-INDEX OR)
+    query = Q()
+    for lat_min, lon_min, lat_max, lon_max in boxes:
+        in_box = Q(
+            latitude__gte=lat_min, latitude__lte=lat_max,
+            longitude__gte=lon_min, longitude__lte=lon_max,
+        )
+        cells = covering_cells((lat_min, lon_min, lat_max, lon_max))
+        if not cells:
+            query |= Q(user_id=user_id, geohash__isnull=False) & in_box
+        for cell in sorted(cells):
+            query |= Q(user_id=user_id, geohash__gte=cell, geohash__lt=cell + '~') & in_box
+    return query
+
+
+def _candidates(user_id, latitude, longitude, radius_km):
+    """``(distancia, id)`` de las tareas dentro de las cajas del radio, ordenadas."""
+    boxes = bounding_boxes(latitude, longitude, radius_km)
+    rows = Todo.objects.filter(_box_filter(user_id, boxes)).order_by().values_list('id', 'latitude', 'longitude')
+    return sorted(
+        (haversine_km(latitude, longitude, float(lat), float(lon)), todo_id)
+        for todo_id, lat, lon in rows
+    )
+
+
+def _with_fields(matches, fields):
+    rows = {row['id']: row for row in Todo.objects.filter(id__in=[i for _, i in matches]).values('id', *fields)}
+    return [(distance, rows[todo_id]) for distance, todo_id in matches if todo_id in rows]
+
+
+def todos_within(user_id, latitude, longitude, radius_km, fields):
+    """
+    Tareas del usuario a ``radius_km`` o menos del punto.
+
+    Args:
+        fields (tuple): Campos de ``values()`` de cada tarea
+
+    Returns:
+        list: Pares ``(distancia_km, fila)`` ordenados por distancia
+    """
+    matches = [m for m in _candidates(user_id, latitude, longitude, radius_km) if m[0] <= radius_km]
+    return _with_fields(matches, fields)
+
+
+def nearest_todos(user_id, latitude, longitude, k, fields, max_radius_km=None):
+    """
+    Las ``k`` tareas del usuario más cercanas al punto.
+
+    Amplía el radio hasta que la caja tenga ``k`` candidatas; la distancia
+    de la k-ésima acota la respuesta, así que basta una última búsqueda con
+    ese radio (sin saltar a una caja mucho mayor). Mientras tanto solo se
+    leen ids y coordenadas; ``fields`` se carga para las ``k`` elegidas.
+
+    Returns:
+        list: Pares ``(distancia_km, fila)`` ordenados por distancia
+    """
+    max_radius = max_radius_km or math.pi * EARTH_RADIUS_KM
+    radius = min(1.0, max_radius)
+    while True:
+        candidates = _candidates(user_id, latitude, longitude, radius)
+        if len(candidates) >= k:
+            kth_distance = candidates[k - 1][0]
+            if kth_distance > radius:
+                # Puede haber tareas más cerca fuera de esta caja
+                candidates = _candidates(user_id, latitude, longitude, min(kth_distance, max_radius))
+            break
+        if radius >= max_radius:
+            break
+        radius = min(radius * 4, max_radius)
+    limit = max_radius_km if max_radius_km else math.inf
+    return _with_fields([m for m in candidates if m[0] <= limit][:k], fields)
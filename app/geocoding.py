@@ -0,0 +1,317 @@
+"""
+Cola de geocodificación inversa en segundo plano.
+
+``update_todo_location`` guarda las coordenadas y encola un ``GeocodingJob``;
+el comando ``manage.py geocode_worker`` procesa la cola por lotes y rellena
+``Todo.address`` y ``location_updated_at`` al terminar cada trabajo.
+
+Para las tareas que ya tenían coordenadas sin dirección (o con una dirección
+antigua) está ``backfill_addresses``, usado por ``manage.py
+backfill_addresses``: recorre esas filas por bloques, resuelve cada punto
+redondeado una sola vez y escribe cada bloque con ``bulk_update``.
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+import logging
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .board_cache import invalidate_board
+from .models import GeocodingJob, Todo
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_location(todo):
+    """
+    Encola la geocodificación de las coordenadas actuales de ``todo``.
+
+    Los trabajos anteriores de la misma tarea se descartan: solo interesa la
+    última ubicación enviada, y así la cola no acumula trabajos terminados.
+    El que esté en curso se deja terminar (su resultado no se escribirá si
+    las coordenadas ya son otras).
+    """
+    with transaction.atomic():
+        GeocodingJob.objects.filter(todo=todo).exclude(status='running').delete()
+        return GeocodingJob.objects.create(
+            todo=todo,
+            latitude=todo.latitude,
+            longitude=todo.longitude,
+        )
+
+
+def claim_jobs(batch_size):
+    """
+    Reserva hasta ``batch_size`` trabajos para este worker.
+
+    La reserva es un UPDATE condicionado al estado leído, así que varios
+    workers pueden compartir la cola sin procesar dos veces el mismo trabajo.
+    Cada reserva dura ``GEOCODING_LEASE_SECONDS``; si el worker muere, el
+    trabajo vuelve a estar disponible al vencer.
+    """
+    now = timezone.now()
+    candidates = list(
+        GeocodingJob.objects
+        .filter(status__in=['pending', 'running'], available_at__lte=now)
+        .order_by('available_at', 'id')
+        .values_list('id', 'status', 'available_at')[:batch_size]
+    )
+    lease_until = now + timedelta(seconds=settings.GEOCODING_LEASE_SECONDS)
+    claimed = []
+    for job_id, status, available_at in candidates:
+        updated = GeocodingJob.objects.filter(
+            id=job_id, status=status, available_at=available_at
+        ).update(status='running', available_at=lease_until)
+        if updated:
+            claimed.append(job_id)
+    return list(GeocodingJob.objects.filter(id__in=claimed).order_by('created_at', 'id'))
+
+
+def process_job(job, service):
+    """
+    Resuelve un trabajo y guarda la dirección en su tarea.
+
+    Si la tarea ya tiene otras coordenadas (llegó una ubicación más nueva)
+    el resultado no se escribe. Un punto sin dirección termina al momento
+    (la tarea queda sin dirección); los errores se reintentan con espera
+    exponencial hasta ``GEOCODING_MAX_ATTEMPTS``.
+
+    Returns:
+        bool: True si el trabajo terminó correctamente.
+    """
+    resolved, address_info = service.resolve_address(float(job.latitude), float(job.longitude))
+    now = timezone.now()
+
+    if resolved:
+        todos = Todo.objects.filter(id=job.todo_id, latitude=job.latitude, longitude=job.longitude)
+        user_id = todos.values_list('user_id', flat=True).first()
+        if todos.update(
+            address=address_info.get('formatted_address', '') if address_info else None,
+            location_updated_at=now,
+            updated_at=now,
+        ):
+            invalidate_board(user_id)
+        job.status = 'done'
+        job.finished_at = now
+        job.attempts += 1
+        job.save(update_fields=['status', 'finished_at', 'attempts'])
+        return True
+
+    job.attempts += 1
+    job.last_error = 'No se pudo obtener la dirección'
+    if job.attempts >= settings.GEOCODING_MAX_ATTEMPTS:
+        job.status = 'failed'
+        job.finished_at = now
+    else:
+        job.status = 'pending'
+        job.available_at = now + timedelta(seconds=settings.GEOCODING_RETRY_DELAY * 2 ** (job.attempts - 1))
+    job.save(update_fields=['status', 'attempts', 'last_error', 'available_at', 'finished_at'])
+    return False
+
+
+def run_batch(service, batch_size):
+    """
+    Procesa un lote de la cola.
+
+    Returns:
+        tuple: ``(procesados, correctos)``
+    """
+    jobs = claim_jobs(batch_size)
+    succeeded = 0
+    for job in jobs:
+        try:
+            succeeded += process_job(job, service)
+        except Exception:
+            logger.exception(f"Error procesando geocodificación {job.id}")
+            GeocodingJob.objects.filter(id=job.id).update(status='pending', available_at=timezone.now())
+    return len(jobs), succeeded
+
+
+def location_status(todo_id, user):
+    """
+    Estado ligero de la ubicación de una tarea para el sondeo del cliente.
+
+    Returns:
+        dict: ``status``, ``address`` y ``location_updated_at``, o None si la
+        tarea no existe o no es del usuario.
+    """
+    todo = (
+        Todo.objects.filter(id=todo_id, user=user)
+        .values('address', 'location_updated_at', 'latitude')
+        .first()
+    )
+    if todo is None:
+        return None
+
+    job_status = (
+        GeocodingJob.objects.filter(todo_id=todo_id)
+        .order_by('-created_at', '-id')
+        .values_list('status', flat=True)
+        .first()
+    )
+    if job_status is None:
+        job_status = 'done' if todo['address'] else 'none'
+    elif job_status == 'running':
+        job_status = 'pending'
+
+    return {
+        'status': job_status,
+        'address': todo['address'] or '',
+        'location_updated_at': (
+            todo['location_updated_at'].isoformat() if todo['location_updated_at'] else None
+        ),
+    }
+
+
+BACKFILL_CHUNK_SIZE = 500
+
+
+class BackfillInterrupted(Exception):
+    """LocationIQ dejó de responder; la ejecución puede reanudarse."""
+
+    def __init__(self, stats):
+        super().__init__(f'LocationIQ no responde; reanuda con --after-id {stats["last_id"]}')
+        self.stats = stats
+
+
+def backfill_queryset(stale_before=None):
+    """
+    Tareas con coordenadas cuya dirección falta o es anterior a ``stale_before``.
+
+    Las filas ya resueltas dejan de cumplir el filtro, así que volver a
+    lanzar el relleno continúa donde se quedó.
+    """
+    needs_address = Q(address__isnull=True) | Q(address='')
+    if stale_before is not None:
+        needs_address |= Q(location_updated_at__isnull=True) | Q(location_updated_at__lt=stale_before)
+    return Todo.objects.filter(needs_address, latitude__isnull=False, longitude__isnull=False)
+
+
+def _resolve_points(service, executor, rows):
+    """
+    Resuelve las coordenadas distintas de ``rows``.
+
+    La caché se consulta y se escribe en este hilo; el pool solo hace las
+    peticiones HTTP (y el ``RateLimiter`` del servicio las reparte).
+
+    Returns:
+        tuple: ``(direcciones, peticiones, fallidas)`` con ``direcciones`` un
+        diccionario clave de caché -> ``address_info`` (None si no hay)
+    """
+    points = {}
+    for _, _, latitude, longitude in rows:
+        points.setdefault(service.cache.make_key(latitude, longitude), (float(latitude), float(longitude)))
+
+    addresses = {}
+    futures = {}
+    for key, (latitude, longitude) in points.items():
+        found, address_info = service.cache.get(latitude, longitude)
+        if found:
+            addresses[key] = address_info
+        else:
+            futures[executor.submit(service.fetch_address, latitude, longitude)] = key
+
+    failed = 0
+    for future in as_completed(futures):
+        key = futures[future]
+        resolved, address_info = future.result()
+        if resolved:
+            service.cache.set(*points[key], address_info)
+            addresses[key] = address_info
+        else:
+            failed += 1
+    return addresses, len(futures), failed
+
+
+def _write_addresses(service, rows, addresses):
+    """
+    Guarda las direcciones resueltas con un ``bulk_update``.
+
+    Las tareas cuyas coordenadas cambiaron mientras tanto se saltan. Como
+    ``bulk_update`` no dispara señales, la caché del tablero se invalida aquí
+    (la dirección no forma parte del índice de búsqueda ni de los contadores).
+
+    Returns:
+        int: Tareas actualizadas
+    """
+    expected = {}
+    for todo_id, _, latitude, longitude in rows:
+        address_info = addresses.get(service.cache.make_key(latitude, longitude))
+        if address_info:
+            expected[todo_id] = (latitude, longitude, address_info.get('formatted_address', ''))
+    if not expected:
+        return 0
+
+    now = timezone.now()
+    with transaction.atomic():
+        todos = list(
+            Todo.objects.select_for_update()
+            .filter(id__in=list(expected)).only('id', 'user_id', 'latitude', 'longitude')
+        )
+        changed = []
+        for todo in todos:
+            latitude, longitude, address = expected[todo.id]
+            if (todo.latitude, todo.longitude) != (latitude, longitude):
+                continue
+            todo.address = address
+            todo.location_updated_at = now
+            todo.updated_at = now
+            changed.append(todo)
+        Todo.objects.bulk_update(changed, ['address', 'location_updated_at', 'updated_at'])
+    for user_id in {todo.user_id for todo in changed}:
+        invalidate_board(user_id)
+    return len(changed)
+
+
+def backfill_addresses(service, workers=4, chunk_size=BACKFILL_CHUNK_SIZE, stale_before=None,
+                       after_id=0, limit=None, progress=None):
+    """
+    Rellena ``Todo.address`` de las tareas de ``backfill_queryset``.
+
+    Recorre las filas por id (``id > after_id``) en bloques de
+    ``chunk_size``; en cada bloque agrupa las coordenadas que comparten clave
+    de caché, resuelve las que no están en caché con un pool de ``workers``
+    hilos y escribe el bloque antes de leer el siguiente.
+
+    Args:
+        service (LocationIQService): Servicio con el ``RateLimiter`` global
+        progress (callable): Recibe las estadísticas tras cada bloque
+
+    Returns:
+        dict: ``rows``, ``points``, ``requests``, ``updated``, ``not_found``,
+        ``last_id`` y ``elapsed`` (segundos)
+
+    Raises:
+        BackfillInterrupted: Si fallan peticiones (red, 5xx, circuito
+        abierto); lo resuelto del bloque se guarda antes.
+    """
+    queryset = backfill_queryset(stale_before).order_by('id').values_list('id', 'user_id', 'latitude', 'longitude')
+    stats = {'rows': 0, 'points': 0, 'requests': 0, 'updated': 0, 'not_found': 0, 'last_id': after_id}
+    started = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while limit is None or stats['rows'] < limit:
+            size = chunk_size if limit is None else min(chunk_size, limit - stats['rows'])
+            rows = list(queryset.filter(id__gt=stats['last_id'])[:size])
+            if not rows:
+                break
+            addresses, requests, failed = _resolve_points(service, executor, rows)
+            stats['updated'] += _write_addresses(service, rows, addresses)
+            stats['requests'] += requests
+            stats['points'] += len(addresses) + failed
+            stats['not_found'] += sum(1 for address_info in addresses.values() if address_info is None)
+            stats['elapsed'] = time.monotonic() - started
+            if failed:
+                # No se avanza: el bloque se reintenta al reanudar
+                raise BackfillInterrupted(stats)
+            stats['rows'] += len(rows)
+            stats['last_id'] = rows[-1][0]
+            if progress:
+                progress(dict(stats))
+
+    stats['elapsed'] = time.monotonic() - started
+    return stats
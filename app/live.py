@@ -0,0 +1,295 @@
+"""
+Avisos en vivo de cambios en el tablero (Server-Sent Events).
+
+Cada vez que se invalida el tablero de un usuario (``board_cache.board_changed``,
+tras el commit) el broker avisa a las conexiones abiertas de ese usuario, que
+reciben un evento ``changed`` sin datos y piden el delta a ``/api/changes/``.
+
+El stream es una aplicación ASGI propia (``todo_list/asgi.py`` la monta
+delante de Django) para que una conexión inactiva no retenga el hilo ni la
+conexión a la base de datos que Django asocia a cada petición hasta que
+termina la respuesta. Por conexión solo quedan la corrutina y una
+``Subscription`` con un ``asyncio.Event``: los avisos se acumulan en ese
+único indicador, así que la memoria no crece con la frecuencia de cambios.
+
+Brokers (``LIVE_BROKER``):
+
+- ``LocalBroker``: solo avisa a las conexiones del mismo proceso.
+- ``CacheBroker``: además sondea cada ``LIVE_POLL_INTERVAL`` segundos las
+  versiones del tablero en la caché ``BOARD_CACHE_ALIAS``; si esa caché es
+  compartida (``BOARD_CACHE_DIR``) ve los cambios hechos en otros procesos.
+"""
+import asyncio
+import threading
+from importlib import import_module
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.db import close_old_connections
+from django.http import parse_cookie
+from django.http.request import split_domain_port, validate_host
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+from .board_cache import board_changed, get_versions
+
+
+_UNSEEN = object()
+
+
+class TooManySubscribers(Exception):
+    """El proceso ya tiene ``LIVE_MAX_CONNECTIONS`` conexiones abiertas."""
+
+
+class Subscription:
+    """Conexión abierta de un usuario; ``notify`` se puede llamar desde cualquier hilo."""
+
+    __slots__ = ('user_id', '_event', '_loop')
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self._event = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+
+    def notify(self):
+        try:
+            self._loop.call_soon_threadsafe(self._event.set)
+        except RuntimeError:
+            pass  # El bucle ya se cerró
+
+    async def wait(self, timeout):
+        """
+        Returns:
+            bool: True si hubo algún aviso, False si pasó ``timeout``
+        """
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        self._event.clear()
+        return True
+
+
+class LocalBroker:
+    """Avisos entre las conexiones de un mismo proceso."""
+
+    def __init__(self, max_subscribers):
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._subscribers = {}  # user_id -> set de Subscription
+        self._count = 0
+
+    def subscribe(self, user_id):
+        """
+        Raises:
+            TooManySubscribers: Si se alcanzó ``max_subscribers``.
+        """
+        subscription = Subscription(user_id)
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                raise TooManySubscribers()
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+            self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscribers.get(subscription.user_id)
+            if subscriptions is None or subscription not in subscriptions:
+                return
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscribers[subscription.user_id]
+            self._count -= 1
+
+    def subscriber_count(self):
+        with self._lock:
+            return self._count
+
+    def user_ids(self):
+        with self._lock:
+            return list(self._subscribers)
+
+    def publish(self, user_id):
+        with self._lock:
+            subscriptions = list(self._subscribers.get(user_id, ()))
+        for subscription in subscriptions:
+            subscription.notify()
+
+
+class CacheBroker(LocalBroker):
+    """
+    ``LocalBroker`` que también detecta cambios de otros procesos sondeando
+    las versiones del tablero de los usuarios conectados (un ``get_many``).
+    """
+
+    def __init__(self, max_subscribers, poll_interval):
+        super().__init__(max_subscribers)
+        self.poll_interval = poll_interval
+        self._versions = {}
+        self._poller = None
+
+    def subscribe(self, user_id):
+        subscription = super().subscribe(user_id)
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.get_running_loop().create_task(self._poll())
+        return subscription
+
+    def unsubscribe(self, subscription):
+        super().unsubscribe(subscription)
+        if not self.subscriber_count() and self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
+
+    async def poll_once(self):
+        user_ids = self.user_ids()
+        versions = await sync_to_async(get_versions, thread_sensitive=False)(user_ids)
+        for user_id in user_ids:
+            # Sin versión (None) también cuenta: la primera escritura la crea
+            version = versions.get(user_id)
+            seen = self._versions.get(user_id, _UNSEEN)
+            self._versions[user_id] = version
+            if seen is not _UNSEEN and version != seen:
+                self.publish(user_id)
+        for user_id in set(self._versions) - set(user_ids):
+            del self._versions[user_id]
+
+    async def _poll(self):
+        while self.subscriber_count():
+            await self.poll_once()
+            await asyncio.sleep(self.poll_interval)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            options = {'max_subscribers': settings.LIVE_MAX_CONNECTIONS}
+            broker_class = import_string(settings.LIVE_BROKER)
+            if issubclass(broker_class, CacheBroker):
+                options['poll_interval'] = settings.LIVE_POLL_INTERVAL
+            _broker = broker_class(**options)
+        return _broker
+
+
+def reset():
+    """Descarta el broker (para tests)."""
+    global _broker
+    with _broker_lock:
+        _broker = None
+
+
+def publish_board_change(sender, user_id, **kwargs):
+    if _broker is not None:
+        _broker.publish(user_id)
+
+
+board_changed.connect(publish_board_change, dispatch_uid='app.live.publish_board_change')
+
+
+# ASGI stream
+
+def _authenticate(cookies):
+    """Id del usuario de la sesión de ``cookies`` (o None), como ``AuthenticationMiddleware``."""
+    close_old_connections()
+    try:
+        engine = import_module(settings.SESSION_ENGINE)
+        request = SimpleNamespace(session=engine.SessionStore(cookies.get(settings.SESSION_COOKIE_NAME)))
+        user = get_user(request)
+        return user.pk if user.is_authenticated else None
+    finally:
+        # Nada de la conexión queda abierto mientras dura el stream
+        close_old_connections()
+
+
+async def _respond(send, status, body=b'', headers=()):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'text/plain; charset=utf-8'), *headers],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def _stream(subscription, send):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.LIVE_STREAM_MAX_AGE
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ],
+    })
+    # Tras cerrar por LIVE_STREAM_MAX_AGE el navegador reconecta solo
+    await send({'type': 'http.response.body', 'body': b'retry: 2000\n\n', 'more_body': True})
+    while (remaining := deadline - loop.time()) > 0:
+        changed = await subscription.wait(min(settings.LIVE_HEARTBEAT, remaining))
+        chunk = b'event: changed\ndata: {}\n\n' if changed else b': ping\n\n'
+        await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def board_events(scope, receive, send):
+    """Aplicación ASGI del stream SSE de avisos del tablero del usuario."""
+    headers = dict(scope['headers'])
+    host, _ = split_domain_port(headers.get(b'host', b'').decode('latin-1'))
+    allowed_hosts = settings.ALLOWED_HOSTS or (['.localhost', '127.0.0.1', '[::1]'] if settings.DEBUG else [])
+    if not validate_host(host, allowed_hosts):
+        await _respond(send, 400, 'Host no permitido'.encode())
+        return
+
+    cookies = parse_cookie(headers.get(b'cookie', b'').decode('latin-1'))
+    user_id = await sync_to_async(_authenticate)(cookies)
+    if user_id is None:
+        # EventSource no reintenta tras una respuesta que no es 200
+        await _respond(send, 401, 'No autenticado'.encode())
+        return
+
+    broker = get_broker()
+    try:
+        subscription = broker.subscribe(user_id)
+    except TooManySubscribers:
+        await _respond(send, 503, 'Demasiadas conexiones'.encode(), [(b'retry-after', b'30')])
+        return
+
+    stream = asyncio.ensure_future(_stream(subscription, send))
+    disconnect = asyncio.ensure_future(_wait_for_disconnect(receive))
+    try:
+        await asyncio.wait([stream, disconnect], return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        broker.unsubscribe(subscription)
+        for task in (stream, disconnect):
+            task.cancel()
+        await asyncio.gather(stream, disconnect, return_exceptions=True)
+    if stream.done() and not stream.cancelled() and stream.exception():
+        raise stream.exception()
+
+
+def with_board_events(application):
+    """Envuelve la aplicación ASGI de Django sirviendo ``board_events`` en su URL."""
+    path = None
+
+    async def router(scope, receive, send):
+        nonlocal path
+        if path is None:
+            path = reverse('board_events')
+        if scope['type'] == 'http' and scope['path'] == path and scope['method'] == 'GET':
+            await board_events(scope, receive, send)
+        else:
+            await application(scope, receive, send)
+
+    return router
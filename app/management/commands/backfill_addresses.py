@@ -0,0 +1,73 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from app.geocoding import BACKFILL_CHUNK_SIZE, BackfillInterrupted, backfill_addresses
+from app.services import LocationIQService, RateLimiter
+
+
+class Command(BaseCommand):
+    help = 'Rellena las direcciones de las tareas con coordenadas y sin dirección (o con una antigua)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=min(4, settings.LOCATIONIQ_POOL_SIZE),
+            help='Peticiones simultáneas a LocationIQ',
+        )
+        parser.add_argument(
+            '--rate', type=float, default=settings.LOCATIONIQ_RATE_LIMIT,
+            help='Máximo de peticiones por segundo a LocationIQ (entre todos los hilos)',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=BACKFILL_CHUNK_SIZE,
+            help='Tareas leídas y escritas por bloque',
+        )
+        parser.add_argument(
+            '--stale-days', type=int,
+            help='Vuelve a resolver también las direcciones de hace más de estos días',
+        )
+        parser.add_argument(
+            '--after-id', type=int, default=0,
+            help='Reanuda a partir de este id de tarea',
+        )
+        parser.add_argument('--limit', type=int, help='Máximo de tareas a procesar')
+
+    def handle(self, *args, **options):
+        service = LocationIQService(rate_limiter=RateLimiter(options['rate']))
+        if not service.is_api_key_valid():
+            raise CommandError('API key de LocationIQ no configurada')
+        if options['workers'] < 1 or options['chunk_size'] < 1:
+            raise CommandError('--workers y --chunk-size deben ser positivos')
+
+        stale_before = None
+        if options['stale_days'] is not None:
+            stale_before = timezone.now() - timedelta(days=options['stale_days'])
+
+        try:
+            stats = backfill_addresses(
+                service,
+                workers=options['workers'],
+                chunk_size=options['chunk_size'],
+                stale_before=stale_before,
+                after_id=options['after_id'],
+                limit=options['limit'],
+                progress=lambda stats: self.stdout.write(self._summary(stats)),
+            )
+        except BackfillInterrupted as e:
+            self.stderr.write(self._summary(e.stats))
+            raise CommandError(str(e))
+        except KeyboardInterrupt:
+            raise CommandError('Interrumpido; reanuda con --after-id del último bloque mostrado')
+
+        self.stdout.write(self.style.SUCCESS(self._summary(stats)))
+
+    def _summary(self, stats):
+        elapsed = stats['elapsed'] or 1e-9
+        return (
+            f"{stats['rows']} tareas ({stats['rows'] / elapsed:.1f}/s), "
+            f"{stats['updated']} actualizadas, {stats['points']} puntos distintos, "
+            f"{stats['requests']} peticiones ({stats['requests'] / elapsed:.1f}/s), "
+            f"{stats['not_found']} sin dirección; último id {stats['last_id']}"
+        )
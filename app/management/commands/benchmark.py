@@ -0,0 +1,69 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.benchmark import SCENARIOS, bench_users, find_regressions, run_benchmark
+
+
+class Command(BaseCommand):
+    help = 'Mide rendimiento, latencia y consultas de las vistas principales con usuarios de seed_board'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='bench', help='Prefijo de los usuarios de seed_board')
+        parser.add_argument('--users', type=int, help='Máximo de usuarios a usar')
+        parser.add_argument('--requests', type=int, default=100, help='Peticiones medidas por vista')
+        parser.add_argument('--warmup', type=int, default=10, help='Peticiones previas sin medir')
+        parser.add_argument(
+            '--views', default=','.join(SCENARIOS),
+            help=f'Vistas separadas por comas ({", ".join(SCENARIOS)})',
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Semilla aleatoria')
+        parser.add_argument('-o', '--output', help='Guarda el resultado en este JSON')
+        parser.add_argument('--baseline', help='JSON de una ejecución anterior con el que comparar')
+        parser.add_argument(
+            '--max-regression', type=float, default=0.25,
+            help='Empeoramiento de p95 tolerado frente a --baseline (0.25 = 25%%)',
+        )
+
+    def handle(self, *args, **options):
+        views = [name.strip() for name in options['views'].split(',') if name.strip()]
+        unknown = [name for name in views if name not in SCENARIOS]
+        if unknown:
+            raise CommandError(f'Vistas desconocidas: {", ".join(unknown)}')
+        if options['requests'] < 1:
+            raise CommandError('--requests debe ser positivo')
+
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as f:
+                baseline = json.load(f)
+
+        users = bench_users(options['prefix'])
+        if options['users']:
+            users = users[:options['users']]
+        try:
+            results = run_benchmark(
+                users, views, requests=options['requests'], warmup=options['warmup'],
+                random_seed=options['seed'],
+            )
+        except ValueError as e:
+            raise CommandError(f'{e}; crea datos con manage.py seed_board')
+
+        self.stdout.write(f'{"vista":<20} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"consultas":>10}')
+        for name, view in results['views'].items():
+            latency = view['latency_ms']
+            self.stdout.write(
+                f'{name:<20} {view["throughput_rps"] or 0:>8.1f} {latency["p50"]:>8.1f} '
+                f'{latency["p95"]:>8.1f} {latency["p99"]:>8.1f} {view["queries"]["mean"]:>10.1f}'
+            )
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f'Resultado guardado en {options["output"]}')
+
+        if baseline is not None:
+            problems = find_regressions(results, baseline, options['max_regression'])
+            if problems:
+                raise CommandError('Regresiones:\n' + '\n'.join(problems))
+            self.stdout.write(self.style.SUCCESS('Sin regresiones frente a la referencia'))
@@ -0,0 +1,40 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.benchmark import bench_users, measure_templates
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide el tamaño del HTML y el tiempo de render de las vistas del tablero '
+        '(Kanban, lista) para los usuarios creados con seed_board'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='bench', help='Prefijo de los usuarios de seed_board')
+        parser.add_argument('--users', type=int, default=1, help='Usuarios a medir')
+        parser.add_argument('--repeat', type=int, default=5, help='Renders por vista')
+        parser.add_argument('-o', '--output', help='Guarda el resultado en JSON')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['repeat'] < 1:
+            raise CommandError('--users y --repeat deben ser positivos')
+        users = list(bench_users(options['prefix'])[:options['users']])
+        if not users:
+            raise CommandError(f"No hay usuarios '{options['prefix']}-*': ejecuta seed_board primero")
+
+        results = {}
+        for user in users:
+            result = results[user.username] = measure_templates(user, options['repeat'])
+            for view, stats in result['views'].items():
+                self.stdout.write(
+                    f"{user.username:<16} {view:<8} {result['todos']:>6} tareas  "
+                    f"{stats['bytes'] / 1024:>9.1f} KB  p50 {stats['render_ms']['p50']:>8.1f} ms  "
+                    f"máx {stats['render_ms']['max']:.1f} ms"
+                )
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Resultado guardado en {options['output']}"))
@@ -0,0 +1,52 @@
+import sqlite3
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from app.benchmark import WRITE_TITLE_PREFIX, measure_writes
+from app.models import Todo
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide escrituras concurrentes desde varios procesos: SQLite con la configuración '
+        'por defecto de Django frente a la de settings.DATABASES'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Procesos escribiendo a la vez')
+        parser.add_argument('--seconds', type=float, default=5.0, help='Duración de cada medición')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['seconds'] <= 0:
+            raise CommandError('--workers y --seconds deben ser positivos')
+
+        configured = dict(connection.settings_dict.get('OPTIONS', {}))
+        if connection.vendor == 'sqlite':
+            if connection.is_in_memory_db():
+                raise CommandError('Hace falta una base de datos SQLite en fichero')
+            # El modo WAL se guarda en el fichero: se restablece antes de cada medición
+            modes = [('django', {}, 'DELETE'), ('configurada', configured, 'WAL')]
+        else:
+            modes = [('configurada', configured, None)]
+
+        user, _ = User.objects.get_or_create(username='db-bench')
+        try:
+            for name, mode_options, journal_mode in modes:
+                if journal_mode:
+                    self._set_journal_mode(journal_mode)
+                result = measure_writes(mode_options, user, options['workers'], options['seconds'])
+                self.stdout.write(
+                    f"{name:<12} {result['commits_per_second']:>8.1f} escrituras/s  "
+                    f"p50 {result['latency_ms']['p50'] or 0:.1f} ms  p95 {result['latency_ms']['p95'] or 0:.1f} ms  "
+                    f"{result['locked_errors']} 'database is locked'"
+                )
+        finally:
+            Todo.objects.filter(user=user, title__startswith=WRITE_TITLE_PREFIX).delete()
+
+    def _set_journal_mode(self, mode):
+        connection.close()
+        with sqlite3.connect(connection.settings_dict['NAME']) as db:
+            db.execute(f'PRAGMA journal_mode={mode}')
+        db.close()
@@ -0,0 +1,33 @@
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from app.transfer import EXPORT_FORMATS, export_lines
+
+
+class Command(BaseCommand):
+    help = 'Exporta el tablero de un usuario (categorías, tareas y notas) a JSONL o CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument(
+            '--format', choices=sorted(EXPORT_FORMATS), default='jsonl',
+            help='Formato de salida',
+        )
+        parser.add_argument(
+            '--output', '-o',
+            help='Fichero de salida (por defecto, la salida estándar)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"Usuario {options['username']} no encontrado")
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                output.writelines(export_lines(user, options['format']))
+        else:
+            sys.stdout.writelines(export_lines(user, options['format']))
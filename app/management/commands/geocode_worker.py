@@ -0,0 +1,54 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from app.geocoding import run_batch
+from app.services import LocationIQService, RateLimiter
+
+
+class Command(BaseCommand):
+    help = 'Procesa la cola de geocodificación inversa de ubicaciones de tareas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.GEOCODING_BATCH_SIZE,
+            help='Trabajos reservados por lote',
+        )
+        parser.add_argument(
+            '--rate', type=float, default=settings.LOCATIONIQ_RATE_LIMIT,
+            help='Máximo de peticiones por segundo a LocationIQ',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=2.0,
+            help='Segundos de espera cuando la cola está vacía',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Procesa la cola hasta vaciarla y termina',
+        )
+
+    def handle(self, *args, **options):
+        service = LocationIQService(rate_limiter=RateLimiter(options['rate']))
+        if not service.is_api_key_valid():
+            self.stderr.write(self.style.ERROR('API key de LocationIQ no configurada'))
+            return
+
+        total = succeeded_total = 0
+        try:
+            while True:
+                processed, succeeded = run_batch(service, options['batch_size'])
+                total += processed
+                succeeded_total += succeeded
+                if processed:
+                    self.stdout.write(f'Lote: {succeeded}/{processed} resueltos')
+                elif options['once']:
+                    break
+                else:
+                    time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{succeeded_total}/{total} trabajos de geocodificación resueltos'
+        ))
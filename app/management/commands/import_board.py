@@ -0,0 +1,45 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from app.transfer import IMPORT_BATCH_SIZE, PARSERS, ImportFormatError, import_rows
+
+
+class Command(BaseCommand):
+    help = 'Importa en el tablero de un usuario un fichero generado por export_board'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('path')
+        parser.add_argument(
+            '--format', choices=sorted(PARSERS),
+            help='Formato del fichero (por defecto, según la extensión)',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+            help='Filas por bulk_create',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"Usuario {options['username']} no encontrado")
+
+        fmt = options['format'] or options['path'].rsplit('.', 1)[-1].lower()
+        if fmt not in PARSERS:
+            raise CommandError(f'Formato no soportado: {fmt}')
+
+        started = time.monotonic()
+        try:
+            with open(options['path'], 'rb') as stream, transaction.atomic():
+                counts = import_rows(user, PARSERS[fmt](stream), options['batch_size'])
+        except ImportFormatError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{counts['categories']} categorías, {counts['todos']} tareas y {counts['notes']} notas "
+            f'importadas en {time.monotonic() - started:.1f}s'
+        ))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app.search import get_backend, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Regenera el índice de búsqueda de texto completo de tareas y notas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=2000,
+            help='Filas indexadas por lote',
+        )
+
+    def handle(self, *args, **options):
+        if get_backend() is None:
+            self.stderr.write(self.style.ERROR('El motor de base de datos no tiene índice de texto completo'))
+            return
+
+        started = time.monotonic()
+        total = rebuild_index(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} entradas indexadas en {time.monotonic() - started:.1f}s'
+        ))
@@ -0,0 +1,39 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from app.changes import prune_tombstones
+from app.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula los contadores de tareas por usuario, corrige las desviaciones '
+        'y purga las lápidas caducadas'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help='Usuarios a revisar (por defecto, todos)',
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id')
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+            missing = set(options['usernames']) - set(users.values_list('username', flat=True))
+            if missing:
+                raise CommandError(f"Usuarios no encontrados: {', '.join(sorted(missing))}")
+
+        repaired = pruned = 0
+        for user_id, username in users.values_list('id', 'username').iterator():
+            pruned += prune_tombstones(user_id)
+            drift = reconcile(user_id)
+            if drift:
+                repaired += 1
+                changes = ', '.join(f'{key}: {old} -> {new}' for key, (old, new) in sorted(drift.items()))
+                self.stdout.write(f'{username}: {changes}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{repaired} usuarios con contadores corregidos, {pruned} lápidas purgadas'
+        ))
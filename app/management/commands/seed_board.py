@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.benchmark import SEED_PASSWORD, seed
+
+
+class Command(BaseCommand):
+    help = 'Crea usuarios con tableros sintéticos para pruebas de carga'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1, help='Usuarios a crear')
+        parser.add_argument('--todos', type=int, default=1000, help='Tareas por usuario')
+        parser.add_argument('--notes', type=int, default=2, help='Notas por tarea')
+        parser.add_argument('--categories', type=int, default=5, help='Categorías por usuario')
+        parser.add_argument(
+            '--located', type=float, default=0.2,
+            help='Fracción de tareas con coordenadas (0-1)',
+        )
+        parser.add_argument('--prefix', default='bench', help='Los usuarios se llaman <prefix>-<n>')
+        parser.add_argument('--seed', type=int, default=0, help='Semilla aleatoria')
+
+    def handle(self, *args, **options):
+        if min(options['users'], options['todos'], options['notes'], options['categories']) < 0:
+            raise CommandError('Las cantidades no pueden ser negativas')
+        if not 0 <= options['located'] <= 1:
+            raise CommandError('--located debe estar entre 0 y 1')
+
+        start = time.monotonic()
+        counts = seed(
+            options['users'], options['todos'], options['notes'], options['categories'],
+            prefix=options['prefix'], located=options['located'], random_seed=options['seed'],
+        )
+        elapsed = time.monotonic() - start
+        rows = counts['todos'] + counts['notes']
+        self.stdout.write(self.style.SUCCESS(
+            f"{counts['users']} usuarios, {counts['categories']} categorías, {counts['todos']} tareas "
+            f"y {counts['notes']} notas en {elapsed:.1f} s ({rows / (elapsed or 1e-9):.0f} filas/s); "
+            f"contraseña: {SEED_PASSWORD}"
+        ))
@@ -0,0 +1,279 @@
+"""
+Métricas de rendimiento por petición en formato de texto de Prometheus.
+
+``RequestMetricsMiddleware`` abre un ``RequestMetrics`` por petición en una
+``ContextVar`` (que ``sync_to_async`` copia a sus hilos) y, al terminar,
+vuelca en los histogramas el tiempo total, las consultas SQL y su tiempo, el
+tiempo de render de plantillas y el de peticiones HTTP salientes a
+LocationIQ, con la etiqueta ``view`` (nombre de la URL de ``app.urls``).
+
+Además, ``todo_cache_lookups`` cuenta las búsquedas en la caché de
+fragmentos del tablero (``board_cache``) y en la de geocodificación
+(``GeocodingCache``) por resultado, para calcular su tasa de acierto.
+
+Las fuentes solo suman a la petición actual:
+
+- SQL: un ``execute_wrapper`` instalado en cada conexión al crearse.
+- Plantillas: el backend ``InstrumentedDjangoTemplates`` (``TEMPLATES``).
+- HTTP: ``LocationIQService`` llama a ``record_http``.
+
+Los valores son por proceso: con varios workers de gunicorn cada uno expone
+los suyos.
+"""
+from contextvars import ContextVar
+import bisect
+import threading
+import time
+
+from django.db.backends.signals import connection_created
+from django.template.backends.django import DjangoTemplates, Template, reraise
+from django.template.exceptions import TemplateDoesNotExist
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Acumuladores de una petición."""
+
+    __slots__ = ('sql_queries', 'sql_seconds', 'template_seconds', 'http_seconds')
+
+    def __init__(self):
+        self.sql_queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.http_seconds = 0.0
+
+
+def _format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+class Histogram:
+    """Histograma con etiquetas, seguro entre hilos."""
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, label_names, buckets=DURATION_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}  # valores de etiquetas -> [cuentas por cubo, suma, total]
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        """Yields: ``(sufijo, etiquetas, valor)`` con cubos acumulados."""
+        with self._lock:
+            series = {labels: (list(counts), total, count) for labels, (counts, total, count) in self._series.items()}
+        for label_values, (counts, total, count) in sorted(series.items()):
+            labels = list(zip(self.label_names, label_values))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield '_bucket', labels + [('le', _format_value(bound))], cumulative
+            yield '_bucket', labels + [('le', '+Inf')], count
+            yield '_sum', labels, total
+            yield '_count', labels, count
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Counter:
+    """Contador con etiquetas, seguro entre hilos."""
+
+    type = 'counter'
+
+    def __init__(self, name, documentation, label_names):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            yield '_total', list(zip(self.label_names, label_values)), value
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+REQUEST_DURATION = Histogram(
+    'todo_request_duration_seconds', 'Tiempo total de la vista', ['view'],
+)
+REQUEST_SQL_QUERIES = Histogram(
+    'todo_request_sql_queries', 'Consultas SQL por petición', ['view'], QUERY_COUNT_BUCKETS,
+)
+REQUEST_SQL_DURATION = Histogram(
+    'todo_request_sql_duration_seconds', 'Tiempo en consultas SQL por petición', ['view'],
+)
+REQUEST_TEMPLATE_DURATION = Histogram(
+    'todo_request_template_duration_seconds', 'Tiempo renderizando plantillas por petición', ['view'],
+)
+REQUEST_HTTP_DURATION = Histogram(
+    'todo_request_http_duration_seconds', 'Tiempo en peticiones HTTP a LocationIQ por petición', ['view'],
+)
+RESPONSES = Counter(
+    'todo_responses', 'Respuestas por vista y código de estado', ['view', 'status'],
+)
+
+CACHE_LOOKUPS = Counter(
+    'todo_cache_lookups', 'Búsquedas en caché por caché (board_fragment, geocoding) y resultado',
+    ['cache', 'result'],
+)
+GEOCODING_NEGATIVE_HITS = Counter(
+    'todo_geocoding_negative_hits',
+    'Aciertos de la caché de geocodificación sin dirección (ya contados en todo_cache_lookups)', [],
+)
+
+REGISTRY = (
+    REQUEST_DURATION, REQUEST_SQL_QUERIES, REQUEST_SQL_DURATION,
+    REQUEST_TEMPLATE_DURATION, REQUEST_HTTP_DURATION, RESPONSES,
+    CACHE_LOOKUPS, GEOCODING_NEGATIVE_HITS,
+)
+
+
+def start_request():
+    """
+    Empieza a acumular métricas en el contexto actual.
+
+    Returns:
+        tuple: ``(RequestMetrics, token)``; el token se pasa a ``finish_request``
+    """
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def finish_request(token, metrics, view=None, status=None, duration=None):
+    """
+    Deja de acumular y vuelca la petición en los histogramas de ``view``;
+    con ``view=None`` la petición se descarta.
+    """
+    _current.reset(token)
+    if view is None:
+        return
+    REQUEST_DURATION.observe(duration, view)
+    REQUEST_SQL_QUERIES.observe(metrics.sql_queries, view)
+    REQUEST_SQL_DURATION.observe(metrics.sql_seconds, view)
+    REQUEST_TEMPLATE_DURATION.observe(metrics.template_seconds, view)
+    REQUEST_HTTP_DURATION.observe(metrics.http_seconds, view)
+    RESPONSES.inc(view, status)
+
+
+def record_http(seconds):
+    """Suma una petición HTTP saliente a la petición actual (si la hay)."""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.http_seconds += seconds
+
+
+def record_cache_lookup(cache, result):
+    """Cuenta una búsqueda en ``cache`` (con o sin petición en curso)."""
+    CACHE_LOOKUPS.inc(cache, result)
+
+
+def _sql_wrapper(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.sql_queries += 1
+        metrics.sql_seconds += time.perf_counter() - start
+
+
+def install_sql_wrapper(sender, connection, **kwargs):
+    # Las conexiones reabiertas conservan sus wrappers
+    if _sql_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_sql_wrapper)
+
+
+connection_created.connect(install_sql_wrapper, dispatch_uid='app.metrics.install_sql_wrapper')
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_seconds += time.perf_counter() - start
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """
+    Backend de plantillas de Django que mide el render de cada plantilla.
+
+    Solo se miden las plantillas pedidas al backend (``render``,
+    ``render_to_string``); los ``{% include %}`` cuentan dentro de su padre.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+def render_text():
+    """
+    Returns:
+        str: Todas las métricas en el formato de texto de Prometheus 0.0.4
+    """
+    lines = []
+    for metric in REGISTRY:
+        name = metric.name + ('_total' if metric.type == 'counter' else '')
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.type}')
+        for suffix, labels, value in metric.samples():
+            lines.append(f'{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    """Vacía todas las métricas (para tests)."""
+    for metric in REGISTRY:
+        metric.clear()
@@ -0,0 +1,56 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .metrics import finish_request, start_request
+
+
+def _app_url_names():
+    from . import urls
+    return {pattern.name for pattern in urls.urlpatterns if pattern.name}
+
+
+class RequestMetricsMiddleware:
+    """
+    Mide cada petición a una vista de ``app.urls`` (ver ``app.metrics``).
+
+    Funciona en WSGI y en ASGI; en ASGI las consultas que las vistas async
+    hacen vía ``sync_to_async`` también cuentan. En respuestas en streaming
+    solo se mide hasta que la vista devuelve la respuesta.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.url_names = _app_url_names()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _view(self, request):
+        match = request.resolver_match
+        if match is not None and match.url_name in self.url_names and not match.namespace:
+            return match.url_name
+        return None
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics, token = start_request()
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self._finish(request, response, metrics, token, start)
+        return response
+
+    async def __acall__(self, request):
+        metrics, token = start_request()
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self._finish(request, response, metrics, token, start)
+        return response
+
+    def _finish(self, request, response, metrics, token, start):
+        # Fuera de app.urls (admin, login, /metrics) la petición no se registra
+        view = self._view(request)
+        finish_request(token, metrics, view, response.status_code, time.perf_counter() - start)
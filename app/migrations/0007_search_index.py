@@ -0,0 +1,76 @@
+from django.db import migrations
+
+SQLITE_CREATE = """
+CREATE VIRTUAL TABLE app_search USING fts5(
+    title, body, owner,
+    kind UNINDEXED, object_id UNINDEXED, todo_id UNINDEXED, user_id UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+INSERT INTO app_search (app_search, rank) VALUES ('rank', 'bm25(10.0, 1.0, 0.0)')
+"""
+
+SQLITE_FILL = """
+INSERT INTO app_search (rowid, title, body, owner, kind, object_id, todo_id, user_id)
+SELECT id * 2, title, COALESCE(description, ''), 'u' || user_id, 'todo', id, id, user_id FROM app_todo;
+INSERT INTO app_search (rowid, title, body, owner, kind, object_id, todo_id, user_id)
+SELECT n.id * 2 + 1, '', n.content, 'u' || t.user_id, 'note', n.id, n.todo_id, t.user_id
+FROM app_note n JOIN app_todo t ON t.id = n.todo_id;
+"""
+
+POSTGRESQL_CREATE = """
+CREATE TABLE app_search (
+    id bigint PRIMARY KEY,
+    kind varchar(10) NOT NULL,
+    object_id bigint NOT NULL,
+    todo_id bigint NOT NULL,
+    user_id integer NOT NULL,
+    title text NOT NULL,
+    body text NOT NULL,
+    document tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('spanish', title), 'A') || setweight(to_tsvector('spanish', body), 'B')
+    ) STORED
+);
+CREATE INDEX app_search_document_idx ON app_search USING GIN (document);
+CREATE INDEX app_search_user_idx ON app_search (user_id);
+"""
+
+POSTGRESQL_FILL = """
+INSERT INTO app_search (id, kind, object_id, todo_id, user_id, title, body)
+SELECT id * 2, 'todo', id, id, user_id, title, COALESCE(description, '') FROM app_todo;
+INSERT INTO app_search (id, kind, object_id, todo_id, user_id, title, body)
+SELECT n.id * 2 + 1, 'note', n.id, n.todo_id, t.user_id, '', n.content
+FROM app_note n JOIN app_todo t ON t.id = n.todo_id;
+"""
+
+SCHEMA = {
+    'sqlite': (SQLITE_CREATE, SQLITE_FILL),
+    'postgresql': (POSTGRESQL_CREATE, POSTGRESQL_FILL),
+}
+
+
+def create_search_index(apps, schema_editor):
+    # Otros motores no tienen índice: app.search recurre a LIKE
+    statements = SCHEMA.get(schema_editor.connection.vendor)
+    if statements is None:
+        return
+    for sql in statements:
+        for statement in sql.split(';'):
+            if statement.strip():
+                schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in SCHEMA:
+        schema_editor.execute('DROP TABLE IF EXISTS app_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_category_updated_at_tombstone'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
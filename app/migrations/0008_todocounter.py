@@ -0,0 +1,64 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_counters(apps, schema_editor):
+    # Mismas claves que app.counters.compute_counters, con los modelos históricos
+    from collections import Counter
+
+    from django.db.models import Count
+    from django.db.models.functions import TruncDate
+    from django.utils import timezone
+
+    Todo = apps.get_model('app', 'Todo')
+    TodoCounter = apps.get_model('app', 'TodoCounter')
+    todos = Todo.objects.order_by()
+    counters = Counter()
+    for user_id in Todo.objects.values_list('user_id', flat=True).distinct().order_by():
+        counters[user_id, 'total'] = 0
+    for user_id, status, count in todos.values_list('user_id', 'status').annotate(count=Count('id')):
+        counters[user_id, f'status:{status}'] += count
+        counters[user_id, 'total'] += count
+    for user_id, priority, count in todos.values_list('user_id', 'priority').annotate(count=Count('id')):
+        counters[user_id, f'priority:{priority}'] += count
+    for user_id, count in todos.filter(completed=True).values_list('user_id').annotate(count=Count('id')):
+        counters[user_id, 'completed'] += count
+    due_days = (
+        todos.filter(completed=False, due_date__isnull=False)
+        .annotate(day=TruncDate('due_date', tzinfo=timezone.get_current_timezone()))
+        .values_list('user_id', 'day').annotate(count=Count('id'))
+    )
+    for user_id, day, count in due_days:
+        counters[user_id, f'due:{day.isoformat()}'] += count
+
+    TodoCounter.objects.bulk_create(
+        [TodoCounter(user_id=user_id, key=key, value=value) for (user_id, key), value in counters.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TodoCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=40)),
+                ('value', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='todo_counters', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'key'), name='todocounter_user_key_uniq')],
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
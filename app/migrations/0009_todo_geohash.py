@@ -0,0 +1,40 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_geohash(apps, schema_editor):
+    from app.geo import geohash_for
+
+    Todo = apps.get_model('app', 'Todo')
+    located = Todo.objects.filter(latitude__isnull=False, longitude__isnull=False).order_by()
+    batch = []
+    for todo in located.only('id', 'latitude', 'longitude').iterator(chunk_size=2000):
+        todo.geohash = geohash_for(todo.latitude, todo.longitude)
+        batch.append(todo)
+        if len(batch) >= 2000:
+            Todo.objects.bulk_update(batch, ['geohash'])
+            batch = []
+    Todo.objects.bulk_update(batch, ['geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_todocounter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='todo',
+            name='geohash',
+            field=models.CharField(blank=True, editable=False, max_length=12, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(fields=['user', 'geohash'], name='todo_user_geohash_idx'),
+        ),
+        migrations.RunPython(fill_geohash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_todo_geohash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['updated_at'], name='note_updated_idx'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinLengthValidator
+from django.utils import timezone
 
 # Create your models here.
 
@@ -9,6 +10,7 @@ class Category(models.Model):
     color = models.CharField(max_length=7, default='#3B82F6')  # Hex color
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='categories')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return self.name
@@ -16,6 +18,9 @@ class Category(models.Model):
     class Meta:
         verbose_name_plural = "Categories"
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['user', 'name'], name='category_user_name_idx'),
+        ]
 
 class Todo(models.Model):
     STATUS_CHOICES = [
@@ -49,12 +54,23 @@ class Todo(models.Model):
     longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     address = models.TextField(blank=True, null=True)
     location_updated_at = models.DateTimeField(null=True, blank=True)
+    geohash = models.CharField(max_length=12, null=True, blank=True, editable=False)  # See app/geo.py
     
     def __str__(self):
         return self.title
     
     class Meta:
         ordering = ['todo_order', '-created_at']
+        indexes = [
+            # Board/list: filter by user, ordered like Meta.ordering
+            models.Index(fields=['user', 'todo_order', '-created_at'], name='todo_user_order_idx'),
+            # Kanban columns: filter by user and status
+            models.Index(fields=['user', 'status', 'todo_order', '-created_at'], name='todo_user_status_order_idx'),
+            # Freshness checks and "changed since" queries
+            models.Index(fields=['user', 'updated_at'], name='todo_user_updated_idx'),
+            # "Near me": geohash prefix ranges per user
+            models.Index(fields=['user', 'geohash'], name='todo_user_geohash_idx'),
+        ]
 
 class Note(models.Model):
     todo = models.ForeignKey(Todo, on_delete=models.CASCADE, related_name='notes')
@@ -67,3 +83,92 @@ class Note(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['todo', '-created_at'], name='note_todo_created_idx'),
+            # "Changed since" queries (app/changes.py)
+            models.Index(fields=['updated_at'], name='note_updated_idx'),
+        ]
+
+class Tombstone(models.Model):
+    """Registro de un objeto borrado, para detectar cambios por borrado"""
+    MODEL_CHOICES = [
+        ('todo', 'Tarea'),
+        ('category', 'Categoría'),
+        ('note', 'Nota'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tombstones')
+    model = models.CharField(max_length=10, choices=MODEL_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        return f"{self.model} {self.object_id} borrado"
+    
+    class Meta:
+        ordering = ['deleted_at']
+        indexes = [
+            models.Index(fields=['user', 'deleted_at'], name='tombstone_user_deleted_idx'),
+        ]
+
+class TodoCounter(models.Model):
+    """Contador desnormalizado de tareas por usuario (ver app/counters.py)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='todo_counters')
+    key = models.CharField(max_length=40)  # total, status:<s>, priority:<p>, completed, due:<fecha>
+    value = models.IntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.user_id} {self.key}={self.value}"
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='todocounter_user_key_uniq'),
+        ]
+
+class SyncBatch(models.Model):
+    """Resultado de un lote de sincronización, por clave de idempotencia (ver app/sync.py)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sync_batches')
+    key = models.CharField(max_length=100)
+    fingerprint = models.CharField(max_length=64)  # sha256 del cuerpo de la petición
+    response = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"Lote {self.key} de {self.user_id}"
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='syncbatch_user_key_uniq'),
+        ]
+        indexes = [
+            # Limpieza de lotes viejos por usuario
+            models.Index(fields=['user', 'created_at'], name='syncbatch_user_created_idx'),
+        ]
+
+class GeocodingJob(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('running', 'En curso'),
+        ('done', 'Completado'),
+        ('failed', 'Fallido'),
+    ]
+    
+    todo = models.ForeignKey(Todo, on_delete=models.CASCADE, related_name='geocoding_jobs')
+    latitude = models.DecimalField(max_digits=9, decimal_places=6)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    available_at = models.DateTimeField(default=timezone.now)  # No se procesa antes de esta fecha
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"Geocodificación de {self.todo_id} ({self.status})"
+    
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            # Cola: trabajos pendientes listos para procesar, en orden de llegada
+            models.Index(fields=['status', 'available_at'], name='geocodingjob_queue_idx'),
+        ]
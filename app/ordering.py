@@ -0,0 +1,104 @@
+"""
+Claves de orden dispersas para el tablero Kanban.
+
+Las tareas de una columna se ordenan por ``todo_order`` ascendente. Las claves
+se asignan con huecos de ``ORDER_GAP`` para que mover una tarjeta solo requiera
+darle una clave entre sus vecinas; la columna completa solo se renumera cuando
+ya no queda hueco entre dos claves.
+"""
+
+ORDER_GAP = 1024
+
+# Rango de models.IntegerField
+MIN_ORDER = -2 ** 31
+MAX_ORDER = 2 ** 31 - 1
+
+
+def _longest_increasing(keys):
+    """
+    Índices de la subsecuencia estrictamente creciente más larga de ``keys``.
+
+    Las posiciones con ``None`` (tarjetas que llegan de otra columna) nunca
+    forman parte de la subsecuencia.
+    """
+    tails = []  # tails[k]: índice del menor final de una subsecuencia de largo k+1
+    previous = [None] * len(keys)
+    for i, key in enumerate(keys):
+        if key is None:
+            continue
+        lo, hi = 0, len(tails)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if keys[tails[mid]] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo > 0:
+            previous[i] = tails[lo - 1]
+        if lo == len(tails):
+            tails.append(i)
+        else:
+            tails[lo] = i
+
+    result = set()
+    i = tails[-1] if tails else None
+    while i is not None:
+        result.add(i)
+        i = previous[i]
+    return result
+
+
+def _keys_between(lower, upper, count):
+    """Reparte ``count`` claves enteras entre ``lower`` y ``upper`` (exclusivos)."""
+    if lower is None and upper is None:
+        lower = 0
+    if lower is None:
+        lower = upper - ORDER_GAP * (count + 1)
+    if upper is None:
+        upper = lower + ORDER_GAP * (count + 1)
+
+    step = (upper - lower) // (count + 1)
+    if step < 1 or lower < MIN_ORDER or upper > MAX_ORDER:
+        return None
+    return [lower + step * (k + 1) for k in range(count)]
+
+
+def rebalanced_keys(count):
+    """Claves equiespaciadas para una columna de ``count`` tarjetas."""
+    return [ORDER_GAP * (k + 1) for k in range(count)]
+
+
+def compute_order_keys(current_keys):
+    """
+    Calcula las nuevas claves de una columna a partir de su orden deseado.
+
+    Args:
+        current_keys (list): Clave actual de cada tarjeta en el nuevo orden,
+            o ``None`` si la tarjeta no pertenecía a la columna.
+
+    Returns:
+        list: Nueva clave de cada tarjeta, estrictamente creciente. Las
+        tarjetas que ya estaban bien ordenadas conservan su clave, así que
+        un movimiento normal solo cambia una fila.
+    """
+    keep = _longest_increasing(current_keys)
+    result = list(current_keys)
+    n = len(result)
+
+    i = 0
+    while i < n:
+        if i in keep:
+            i += 1
+            continue
+        j = i
+        while j < n and j not in keep:
+            j += 1
+        lower = result[i - 1] if i > 0 else None
+        upper = result[j] if j < n else None
+        keys = _keys_between(lower, upper, j - i)
+        if keys is None:
+            return rebalanced_keys(n)
+        result[i:j] = keys
+        i = j
+
+    return result
@@ -0,0 +1,80 @@
+"""
+Paginación por cursor (keyset) sobre el orden del tablero.
+
+Las tareas se recorren por ``(todo_order ASC, created_at DESC, id ASC)``,
+el mismo orden que ``Todo.Meta.ordering`` con ``id`` como desempate. El
+cursor codifica la última fila servida, así que cada página es una búsqueda
+por índice en lugar de un OFFSET que recorre todas las filas anteriores.
+"""
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+KEYSET_ORDERING = ('todo_order', '-created_at', 'id')
+
+
+class InvalidCursor(ValueError):
+    """El cursor recibido no se puede decodificar."""
+
+
+def encode_cursor(todo_order, created_at, todo_id):
+    payload = json.dumps([todo_order, created_at.isoformat(), todo_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Returns:
+        tuple: ``(todo_order, created_at, id)``
+
+    Raises:
+        InvalidCursor: Si el cursor no es válido.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        todo_order, created_at, todo_id = json.loads(base64.urlsafe_b64decode(padded))
+        created_at = parse_datetime(created_at)
+        if created_at is None:
+            raise ValueError(created_at)
+        return int(todo_order), created_at, int(todo_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(str(e)) from e
+
+
+def after_cursor(cursor):
+    """
+    Filtro con las filas que van después de ``cursor`` en ``KEYSET_ORDERING``.
+
+    El ``todo_order >= ...`` inicial permite al motor empezar la búsqueda en
+    el índice directamente en el cursor.
+    """
+    todo_order, created_at, todo_id = decode_cursor(cursor)
+    return Q(todo_order__gte=todo_order) & (
+        Q(todo_order__gt=todo_order)
+        | Q(created_at__lt=created_at)
+        | Q(created_at=created_at, id__gt=todo_id)
+    )
+
+
+def paginate(queryset, cursor, limit):
+    """
+    Devuelve una página de ``queryset`` (de ``values()`` con ``todo_order``,
+    ``created_at`` e ``id``) a partir de ``cursor``.
+
+    Returns:
+        tuple: ``(filas, siguiente_cursor)``; ``siguiente_cursor`` es None en
+        la última página.
+    """
+    queryset = queryset.order_by(*KEYSET_ORDERING)
+    if cursor:
+        queryset = queryset.filter(after_cursor(cursor))
+
+    rows = list(queryset[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last['todo_order'], last['created_at'], last['id'])
+    return rows, next_cursor
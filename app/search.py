@@ -0,0 +1,282 @@
+"""
+Búsqueda de texto completo sobre tareas y notas.
+
+El índice vive en la tabla ``app_search``: una tabla virtual FTS5 en SQLite
+y una tabla con columna ``tsvector`` e índice GIN en PostgreSQL (ver la
+migración ``0007_search_index``). Cada tarea y cada nota es una fila cuyo
+``id``/``rowid`` se deriva del tipo y de la clave primaria, así que
+actualizar o borrar una entrada es una búsqueda por clave, no un recorrido.
+
+Las señales de ``Todo`` y ``Note`` mantienen el índice al día fila a fila;
+las escrituras masivas (``bulk_create``, ``update()``) no disparan señales
+y deben llamar a ``index_todos``/``index_notes`` o ``rebuild_index``.
+"""
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Note, Todo
+
+SEARCH_MAX_RESULTS = 50
+
+# Con términos muy frecuentes puntuar todas las coincidencias de un usuario
+# con 100k filas cuesta cientos de ms: solo se puntúan las coincidencias más
+# recientes, que en un tablero de tareas son las que interesan.
+SEARCH_RANK_CANDIDATES = 1000
+
+# Marcadores para resaltar coincidencias: se sustituyen por <mark> después de
+# escapar el texto, para no inyectar HTML de los usuarios.
+_START, _STOP = '\x02', '\x03'
+_TOKEN_RE = re.compile(r'(\w+)(\*?)', re.UNICODE)
+
+_KINDS = {'todo': 0, 'note': 1}
+
+
+def _entry_id(kind, object_id):
+    return object_id * 2 + _KINDS[kind]
+
+
+def _tokens(query):
+    """Palabras de ``query`` como ``(palabra, es_prefijo)``; ``palabra*`` busca por prefijo."""
+    return [(word, bool(star)) for word, star in _TOKEN_RE.findall(query.lower())[:16]]
+
+
+def _highlight(text):
+    return mark_safe(escape(text).replace(_START, '<mark>').replace(_STOP, '</mark>'))
+
+
+class SQLiteBackend:
+    """FTS5 con ranking bm25; el título pesa más que la descripción o la nota."""
+
+    def upsert(self, cursor, rows):
+        cursor.executemany('DELETE FROM app_search WHERE rowid = %s', [(row[0],) for row in rows])
+        cursor.executemany(
+            'INSERT INTO app_search (rowid, title, body, owner, kind, object_id, todo_id, user_id) '
+            'VALUES (%s, %s, %s, %s, %s, %s, %s, %s)',
+            [(entry_id, title, body, f'u{user_id}', kind, object_id, todo_id, user_id)
+             for entry_id, kind, object_id, todo_id, user_id, title, body in rows],
+        )
+
+    def delete(self, cursor, entry_ids):
+        cursor.executemany('DELETE FROM app_search WHERE rowid = %s', [(i,) for i in entry_ids])
+
+    def clear(self, cursor):
+        cursor.execute('DELETE FROM app_search')
+
+    def query(self, user_id, tokens):
+        terms = ' '.join(f'"{word}"' + ('*' if prefix else '') for word, prefix in tokens)
+        # ``owner`` restringe la búsqueda al usuario dentro del propio índice
+        return f'owner : u{user_id} AND {{title body}} : ({terms})'
+
+    def search(self, cursor, user_id, tokens, limit):
+        # ``rank`` es bm25(10, 1, 0) (configurado en la migración); ordenar
+        # por él deja que FTS5 ordene y calcule highlight/snippet solo para
+        # las filas devueltas. Un JOIN o seleccionar ``rank`` rompería eso,
+        # de ahí la subconsulta para el título de la tarea y que no se
+        # devuelva la puntuación.
+        query = self.query(user_id, tokens)
+        cursor.execute(
+            'SELECT s.kind, s.object_id, s.todo_id, (SELECT title FROM app_todo WHERE id = s.todo_id), '
+            'highlight(app_search, 0, %s, %s), snippet(app_search, 1, %s, %s, %s, 16) '
+            'FROM app_search s '
+            'WHERE app_search MATCH %s AND s.rowid >= COALESCE(('
+            '  SELECT MIN(rowid) FROM ('
+            '    SELECT rowid FROM app_search WHERE app_search MATCH %s ORDER BY rowid DESC LIMIT %s'
+            '  )'
+            '), 0) '
+            'ORDER BY s.rank LIMIT %s',
+            [_START, _STOP, _START, _STOP, '…', query, query, SEARCH_RANK_CANDIDATES, limit],
+        )
+        return cursor.fetchall()
+
+
+class PostgreSQLBackend:
+    """``tsvector`` generado con pesos A (título) y B (cuerpo) e índice GIN."""
+
+    config = 'spanish'
+
+    def upsert(self, cursor, rows):
+        cursor.executemany(
+            'INSERT INTO app_search (id, kind, object_id, todo_id, user_id, title, body) '
+            'VALUES (%s, %s, %s, %s, %s, %s, %s) '
+            'ON CONFLICT (id) DO UPDATE SET todo_id = EXCLUDED.todo_id, '
+            'user_id = EXCLUDED.user_id, title = EXCLUDED.title, body = EXCLUDED.body',
+            rows,
+        )
+
+    def delete(self, cursor, entry_ids):
+        cursor.execute('DELETE FROM app_search WHERE id = ANY(%s)', [list(entry_ids)])
+
+    def clear(self, cursor):
+        cursor.execute('TRUNCATE app_search')
+
+    def query(self, user_id, tokens):
+        return ' & '.join(f"'{word}'" + (':*' if prefix else '') for word, prefix in tokens)
+
+    def search(self, cursor, user_id, tokens, limit):
+        options = f'StartSel={_START}, StopSel={_STOP}, HighlightAll=true'
+        snippet_options = f'StartSel={_START}, StopSel={_STOP}, MaxWords=24, MinWords=8'
+        query = self.query(user_id, tokens)
+        # ts_headline es caro: solo se calcula para las filas de la página
+        cursor.execute(
+            'SELECT s.kind, s.object_id, s.todo_id, t.title, '
+            'ts_headline(%s, s.title, q, %s), ts_headline(%s, s.body, q, %s) '
+            'FROM ('
+            '  SELECT c.*, ts_rank(c.document, q) AS rank FROM ('
+            '    SELECT a.* FROM app_search a, to_tsquery(%s, %s) q'
+            '    WHERE a.user_id = %s AND a.document @@ q ORDER BY a.id DESC LIMIT %s'
+            '  ) c, to_tsquery(%s, %s) q ORDER BY rank DESC LIMIT %s'
+            ') s JOIN app_todo t ON t.id = s.todo_id, to_tsquery(%s, %s) q '
+            'ORDER BY s.rank DESC',
+            [self.config, options, self.config, snippet_options,
+             self.config, query, user_id, SEARCH_RANK_CANDIDATES,
+             self.config, query, limit, self.config, query],
+        )
+        return cursor.fetchall()
+
+
+BACKENDS = {
+    'sqlite': SQLiteBackend(),
+    'postgresql': PostgreSQLBackend(),
+}
+
+
+def get_backend():
+    """
+    Returns:
+        Backend del motor de base de datos actual, o None si no hay índice
+        de texto completo para él.
+    """
+    return BACKENDS.get(connection.vendor)
+
+
+def _todo_rows(todos):
+    return [
+        (_entry_id('todo', todo_id), 'todo', todo_id, todo_id, user_id, title, description or '')
+        for todo_id, user_id, title, description in todos
+    ]
+
+
+def _note_rows(notes):
+    return [
+        (_entry_id('note', note_id), 'note', note_id, todo_id, user_id, '', content)
+        for note_id, todo_id, user_id, content in notes
+    ]
+
+
+def index_todos(todo_ids):
+    """Indexa (o reindexa) las tareas con los ids dados."""
+    backend = get_backend()
+    if backend is None or not todo_ids:
+        return
+    todos = Todo.objects.filter(id__in=todo_ids).values_list('id', 'user_id', 'title', 'description')
+    with connection.cursor() as cursor:
+        backend.upsert(cursor, _todo_rows(todos))
+
+
+def index_notes(note_ids):
+    """Indexa (o reindexa) las notas con los ids dados."""
+    backend = get_backend()
+    if backend is None or not note_ids:
+        return
+    notes = Note.objects.filter(id__in=note_ids).values_list('id', 'todo_id', 'todo__user_id', 'content')
+    with connection.cursor() as cursor:
+        backend.upsert(cursor, _note_rows(notes))
+
+
+def unindex(kind, object_ids):
+    """Quita del índice las tareas (``kind='todo'``) o notas (``'note'``) dadas."""
+    backend = get_backend()
+    if backend is None or not object_ids:
+        return
+    with connection.cursor() as cursor:
+        backend.delete(cursor, [_entry_id(kind, object_id) for object_id in object_ids])
+
+
+def rebuild_index(batch_size=2000):
+    """
+    Regenera el índice completo por lotes.
+
+    Returns:
+        int: Número de entradas indexadas
+    """
+    backend = get_backend()
+    if backend is None:
+        return 0
+    total = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        backend.clear(cursor)
+        todos = Todo.objects.order_by().values_list('id', 'user_id', 'title', 'description')
+        notes = Note.objects.order_by().values_list('id', 'todo_id', 'todo__user_id', 'content')
+        for queryset, to_rows in ((todos, _todo_rows), (notes, _note_rows)):
+            batch = []
+            for row in queryset.iterator(chunk_size=batch_size):
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    backend.upsert(cursor, to_rows(batch))
+                    total += len(batch)
+                    batch = []
+            if batch:
+                backend.upsert(cursor, to_rows(batch))
+                total += len(batch)
+    return total
+
+
+def _fallback_search(user, tokens, limit):
+    # Sin índice de texto completo: LIKE sin ranking ni resaltado
+    todos = Todo.objects.filter(user=user)
+    notes = Note.objects.filter(todo__user=user)
+    for word, _ in tokens:
+        todos = todos.filter(Q(title__icontains=word) | Q(description__icontains=word))
+        notes = notes.filter(content__icontains=word)
+    rows = [
+        ('todo', t.id, t.id, t.title, t.title, (t.description or '')[:120]) for t in todos[:limit]
+    ] + [
+        ('note', n.id, n.todo_id, n.todo.title, '', n.content[:120])
+        for n in notes.select_related('todo')[:limit]
+    ]
+    return rows[:limit]
+
+
+def search(user, query, limit=20):
+    """
+    Busca ``query`` en las tareas y notas de ``user``.
+
+    Deben aparecer todas las palabras; ``palabra*`` busca por prefijo.
+
+    Args:
+        user (User): Dueño de las tareas
+        query (str): Texto libre
+        limit (int): Máximo de resultados
+
+    Returns:
+        list: Diccionarios con ``type``, ``todo_id``, ``note_id``, ``title``,
+        ``title_html`` y ``snippet_html``, del más relevante al menos
+        relevante.
+    """
+    tokens = _tokens(query)
+    if not tokens:
+        return []
+    limit = max(1, min(limit, SEARCH_MAX_RESULTS))
+
+    backend = get_backend()
+    if backend is None:
+        rows = _fallback_search(user, tokens, limit)
+    else:
+        with connection.cursor() as cursor:
+            rows = backend.search(cursor, user.pk, tokens, limit)
+
+    results = []
+    for kind, object_id, todo_id, todo_title, title, snippet in rows:
+        results.append({
+            'type': kind,
+            'todo_id': todo_id,
+            'note_id': object_id if kind == 'note' else None,
+            'title': todo_title,
+            'title_html': _highlight(title) if kind == 'todo' else escape(todo_title),
+            'snippet_html': _highlight(snippet or ''),
+        })
+    return results
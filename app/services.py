@@ -1,88 +1,573 @@
+import asyncio
+import httpx
 import requests
+from asgiref.sync import sync_to_async
+from collections import OrderedDict
 from django.conf import settings
+from django.core.cache import caches
 from django.utils import timezone
+from requests.adapters import HTTPAdapter
+from .metrics import GEOCODING_NEGATIVE_HITS, record_cache_lookup, record_http
 import logging
+import random
+import threading
+import time
+import weakref
 
 logger = logging.getLogger(__name__)
 
+# Marca guardada en caché cuando LocationIQ no encuentra dirección
+_NOT_FOUND = '__not_found__'
+
+# Contador de GeocodingCache -> resultado en todo_cache_lookups{cache="geocoding"}
+_LOOKUP_RESULTS = {'local_hits': 'local_hit', 'shared_hits': 'shared_hit', 'misses': 'miss'}
+
+
+class GeocodingCache:
+    """
+    Caché de dos niveles para reverse geocoding.
+
+    El primer nivel es un LRU en memoria del proceso; el segundo es el backend
+    de caché de Django configurado en ``LOCATIONIQ_CACHE_ALIAS`` y compartido
+    entre procesos. Las claves usan las coordenadas redondeadas a
+    ``LOCATIONIQ_CACHE_PRECISION`` decimales, así que puntos a pocos metros
+    comparten resultado.
+    """
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or settings.LOCATIONIQ_CACHE_LRU_SIZE
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {
+            'local_hits': 0,
+            'shared_hits': 0,
+            'negative_hits': 0,
+            'misses': 0,
+        }
+
+    @property
+    def shared(self):
+        return caches[settings.LOCATIONIQ_CACHE_ALIAS]
+
+    def make_key(self, latitude, longitude):
+        precision = settings.LOCATIONIQ_CACHE_PRECISION
+        # + 0.0 evita claves distintas para -0.0 y 0.0
+        lat = round(float(latitude), precision) + 0.0
+        lon = round(float(longitude), precision) + 0.0
+        return f'geocode:{lat:.{precision}f}:{lon:.{precision}f}'
+
+    def _count(self, name):
+        # Los de /metrics suman todas las instancias del proceso
+        if name == 'negative_hits':
+            GEOCODING_NEGATIVE_HITS.inc()
+        else:
+            record_cache_lookup('geocoding', _LOOKUP_RESULTS[name])
+        with self._lock:
+            self.counters[name] += 1
+
+    def get(self, latitude, longitude):
+        """
+        Busca una dirección en caché.
+
+        Returns:
+            tuple: ``(encontrado, address_info)``. ``address_info`` es None
+            cuando lo guardado es un resultado negativo.
+        """
+        key = self.make_key(latitude, longitude)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._local.move_to_end(key)
+                else:
+                    del self._local[key]
+                    entry = None
+
+        if entry is None:
+            value = self.shared.get(key)
+            if value is None:
+                self._count('misses')
+                return False, None
+            self._store_local(key, value, self._ttl_for(value))
+            self._count('shared_hits')
+        else:
+            self._count('local_hits')
+
+        if value == _NOT_FOUND:
+            self._count('negative_hits')
+            return True, None
+        return True, value
+
+    def set(self, latitude, longitude, address_info):
+        """Guarda un resultado; ``address_info=None`` guarda un negativo."""
+        key = self.make_key(latitude, longitude)
+        value = _NOT_FOUND if address_info is None else address_info
+        ttl = self._ttl_for(value)
+        self._store_local(key, value, ttl)
+        self.shared.set(key, value, ttl)
+
+    async def aget(self, latitude, longitude):
+        """Versión async de ``get`` (el nivel compartido puede tocar la BD)."""
+        return await sync_to_async(self.get)(latitude, longitude)
+
+    async def aset(self, latitude, longitude, address_info):
+        """Versión async de ``set``."""
+        await sync_to_async(self.set)(latitude, longitude, address_info)
+
+    def _ttl_for(self, value):
+        if value == _NOT_FOUND:
+            return settings.LOCATIONIQ_CACHE_NEGATIVE_TTL
+        return settings.LOCATIONIQ_CACHE_TTL
+
+    def _store_local(self, key, value, ttl):
+        with self._lock:
+            self._local[key] = (time.monotonic() + ttl, value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def clear(self):
+        """Vacía el nivel local y reinicia los contadores."""
+        with self._lock:
+            self._local.clear()
+            for name in self.counters:
+                self.counters[name] = 0
+
+    def stats(self):
+        """Contadores de aciertos/fallos y tasa de acierto."""
+        with self._lock:
+            stats = dict(self.counters)
+            stats['local_size'] = len(self._local)
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_ratio'] = (
+            (stats['local_hits'] + stats['shared_hits']) / lookups if lookups else 0.0
+        )
+        return stats
+
+
+geocoding_cache = GeocodingCache()
+
+
+class CircuitOpenError(Exception):
+    """La API externa se considera caída y no se intenta la petición."""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker sencillo para una API externa.
+
+    Tras ``failure_threshold`` fallos consecutivos el circuito se abre y las
+    llamadas fallan al instante durante ``reset_timeout`` segundos. Después
+    se deja pasar una sola petición de prueba (half-open): si funciona el
+    circuito se cierra, si falla vuelve a abrirse.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=None, reset_timeout=None):
+        self.failure_threshold = failure_threshold or settings.LOCATIONIQ_BREAKER_THRESHOLD
+        self.reset_timeout = reset_timeout or settings.LOCATIONIQ_BREAKER_RESET_TIMEOUT
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def before_call(self):
+        """Lanza CircuitOpenError si la llamada no debe intentarse."""
+        with self._lock:
+            state = self._state()
+            if state == self.OPEN:
+                raise CircuitOpenError('LocationIQ no disponible temporalmente')
+            if state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    raise CircuitOpenError('LocationIQ en prueba de recuperación')
+                self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release(self):
+        """Libera la petición de prueba sin contar fallo (la llamada no llegó a terminar)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def reset(self):
+        self.record_success()
+
+
+locationiq_breaker = CircuitBreaker()
+
+
+class RateLimiter:
+    """
+    Limita las peticiones a ``rate`` por segundo, compartido entre hilos.
+
+    Reparte las peticiones a intervalos regulares: ``acquire()`` bloquea hasta
+    que toca el siguiente turno.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self._lock = threading.Lock()
+        self._next_slot = time.monotonic()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """
+    Sesión HTTP compartida (keep-alive) para LocationIQ.
+
+    El pool está acotado a ``LOCATIONIQ_POOL_SIZE`` conexiones y bloquea en
+    lugar de abrir conexiones extra cuando todas están ocupadas.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=settings.LOCATIONIQ_POOL_SIZE,
+                    pool_block=True,
+                    max_retries=0,  # Los reintentos los gestiona LocationIQService
+                )
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
+# Un AsyncClient por event loop: no se puede compartir entre loops
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_http_client():
+    """
+    Cliente httpx async compartido por el event loop actual.
+
+    Mismo límite de conexiones y timeouts que la sesión síncrona.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.LOCATIONIQ_POOL_SIZE,
+                max_keepalive_connections=settings.LOCATIONIQ_POOL_SIZE,
+            ),
+            timeout=httpx.Timeout(
+                settings.LOCATIONIQ_READ_TIMEOUT,
+                connect=settings.LOCATIONIQ_CONNECT_TIMEOUT,
+            ),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+class _RetryableStatus(requests.exceptions.RequestException):
+    """Respuesta 429/5xx que merece reintento."""
+
+
 class LocationIQService:
     """Servicio para interactuar con la API de LocationIQ"""
     
-    def __init__(self):
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    
+    def __init__(self, cache=None, session=None, breaker=None, rate_limiter=None, async_client=None):
         self.api_key = settings.LOCATIONIQ_API_KEY
         self.base_url = settings.LOCATIONIQ_BASE_URL
+        self.cache = cache or geocoding_cache
+        self.session = session or get_http_session()
+        self.async_client = async_client
+        self.breaker = breaker or locationiq_breaker
+        self.rate_limiter = rate_limiter
+        self.timeout = (settings.LOCATIONIQ_CONNECT_TIMEOUT, settings.LOCATIONIQ_READ_TIMEOUT)
+    
+    def _backoff(self, attempt):
+        """Espera exponencial con jitter completo para el reintento ``attempt``."""
+        cap = settings.LOCATIONIQ_BACKOFF_MAX
+        return random.uniform(0, min(cap, settings.LOCATIONIQ_BACKOFF_BASE * 2 ** attempt))
+    
+    def _get(self, url, params):
+        """
+        GET con reintentos, presupuesto de tiempo total y circuit breaker.
         
-    def get_address_from_coordinates(self, latitude, longitude):
+        Reintenta errores de conexión, timeouts y respuestas 429/5xx hasta
+        ``LOCATIONIQ_MAX_RETRIES`` veces, sin pasar de
+        ``LOCATIONIQ_TIME_BUDGET`` segundos en total.
+        
+        Raises:
+            CircuitOpenError: Si el circuito está abierto.
+            requests.exceptions.RequestException: Si se agotan los reintentos.
+        """
+        self.breaker.before_call()
+        try:
+            response = self._get_with_retries(url, params)
+        except (requests.exceptions.RequestException, _RetryableStatus):
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # No es un fallo de LocationIQ, pero una petición de prueba
+            # (half-open) sin liberar dejaría el circuito bloqueado
+            self.breaker.release()
+            raise
+        self.breaker.record_success()
+        return response
+    
+    def _get_with_retries(self, url, params):
+        deadline = time.monotonic() + settings.LOCATIONIQ_TIME_BUDGET
+        attempt = 0
+        
+        while True:
+            try:
+                if self.rate_limiter:
+                    self.rate_limiter.acquire()
+                start = time.perf_counter()
+                try:
+                    response = self.session.get(url, params=params, timeout=self.timeout)
+                finally:
+                    record_http(time.perf_counter() - start)
+                if response.status_code in self.RETRY_STATUSES:
+                    raise _RetryableStatus(f"LocationIQ respondió {response.status_code}")
+                return response
+            except (requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout,
+                    _RetryableStatus) as e:
+                delay = self._backoff(attempt)
+                attempt += 1
+                if attempt > settings.LOCATIONIQ_MAX_RETRIES or time.monotonic() + delay >= deadline:
+                    raise
+                logger.warning(f"Reintentando LocationIQ ({attempt}) tras error: {str(e)}")
+                time.sleep(delay)
+    
+    async def _aget(self, url, params):
+        """Versión async de ``_get`` sobre el cliente httpx compartido."""
+        self.breaker.before_call()
+        try:
+            response = await self._aget_with_retries(url, params)
+        except (httpx.HTTPError, _RetryableStatus):
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # Incluye la cancelación por asyncio.wait_for en update_todo_location:
+            # que quien llama deje de esperar no dice nada de LocationIQ
+            self.breaker.release()
+            raise
+        self.breaker.record_success()
+        return response
+    
+    async def _aget_with_retries(self, url, params):
+        client = self.async_client or get_async_http_client()
+        deadline = time.monotonic() + settings.LOCATIONIQ_TIME_BUDGET
+        attempt = 0
+        
+        while True:
+            try:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(url, params=params)
+                finally:
+                    record_http(time.perf_counter() - start)
+                if response.status_code in self.RETRY_STATUSES:
+                    raise _RetryableStatus(f"LocationIQ respondió {response.status_code}")
+                return response
+            except (httpx.TransportError, _RetryableStatus) as e:
+                delay = self._backoff(attempt)
+                attempt += 1
+                if attempt > settings.LOCATIONIQ_MAX_RETRIES or time.monotonic() + delay >= deadline:
+                    raise
+                logger.warning(f"Reintentando LocationIQ ({attempt}) tras error: {str(e)}")
+                await asyncio.sleep(delay)
+    
+    def _params(self, latitude, longitude):
+        return {
+            'key': self.api_key,
+            'lat': latitude,
+            'lon': longitude,
+            'format': 'json',
+            'accept-language': 'es'  # Para obtener direcciones en español
+        }
+    
+    @staticmethod
+    def _build_address_info(data):
+        """Extrae la información relevante de la respuesta de LocationIQ"""
+        address_info = {
+            'display_name': data.get('display_name', ''),
+            'address': {
+                'road': data.get('address', {}).get('road', ''),
+                'house_number': data.get('address', {}).get('house_number', ''),
+                'suburb': data.get('address', {}).get('suburb', ''),
+                'city': data.get('address', {}).get('city', ''),
+                'state': data.get('address', {}).get('state', ''),
+                'country': data.get('address', {}).get('country', ''),
+                'postcode': data.get('address', {}).get('postcode', '')
+            }
+        }
+        
+        # Crear dirección legible
+        address_parts = []
+        if address_info['address']['house_number']:
+            address_parts.append(address_info['address']['house_number'])
+        if address_info['address']['road']:
+            address_parts.append(address_info['address']['road'])
+        if address_info['address']['suburb']:
+            address_parts.append(address_info['address']['suburb'])
+        if address_info['address']['city']:
+            address_parts.append(address_info['address']['city'])
+        if address_info['address']['state']:
+            address_parts.append(address_info['address']['state'])
+        if address_info['address']['postcode']:
+            address_parts.append(address_info['address']['postcode'])
+        if address_info['address']['country']:
+            address_parts.append(address_info['address']['country'])
+            
+        address_info['formatted_address'] = ', '.join(address_parts)
+        return address_info
+        
+    def fetch_address(self, latitude, longitude):
+        """
+        Consulta LocationIQ sin pasar por la caché.
+        
+        No toca la base de datos, así que puede llamarse desde hilos de un
+        pool (ver ``manage.py backfill_addresses``).
+        
+        Returns:
+            tuple: ``(resuelto, address_info)``. ``resuelto`` es False si hubo
+            un error y el resultado no debe guardarse; ``address_info`` es
+            None si LocationIQ no tiene dirección para el punto.
+        """
+        try:
+            url = f"{self.base_url}/reverse.php"
+            response = self._get(url, self._params(latitude, longitude))
+            if response.status_code == 404:
+                # LocationIQ responde 404 cuando no hay dirección para el punto
+                logger.info(f"LocationIQ sin dirección para {latitude}, {longitude}")
+                return True, None
+            response.raise_for_status()
+            return True, self._build_address_info(response.json())
+            
+        except CircuitOpenError as e:
+            logger.warning(f"LocationIQ omitido: {str(e)}")
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error en la API de LocationIQ: {str(e)}")
+        except Exception as e:
+            logger.error(f"Error inesperado en LocationIQ: {str(e)}")
+        return False, None
+    
+    def resolve_address(self, latitude, longitude):
         """
         Obtiene la dirección a partir de coordenadas usando reverse geocoding
         
+        Los resultados (incluidos los "sin dirección") se guardan en caché por
+        coordenadas redondeadas, así que repetir la consulta no llama a la API.
+        
         Args:
             latitude (float): Latitud
             longitude (float): Longitud
             
         Returns:
-            dict: Información de la dirección o None si hay error
+            tuple: ``(resuelto, address_info)`` como ``fetch_address``: un
+            "sin dirección" (de LocationIQ o de la caché) está resuelto y
+            no tiene sentido reintentarlo; un error no.
         """
         if not self.api_key:
             logger.error("LocationIQ API key no configurada")
-            return None
-            
+            return False, None
+        
+        found, address_info = self.cache.get(latitude, longitude)
+        if found:
+            return True, address_info
+        
+        resolved, address_info = self.fetch_address(latitude, longitude)
+        if resolved:
+            self.cache.set(latitude, longitude, address_info)
+        return resolved, address_info
+    
+    def get_address_from_coordinates(self, latitude, longitude):
+        """
+        Returns:
+            dict: Información de la dirección o None si no hay o hubo un error
+        """
+        return self.resolve_address(latitude, longitude)[1]
+    
+    async def aresolve_address(self, latitude, longitude):
+        """
+        Versión async de ``resolve_address``.
+        
+        Usa el cliente httpx compartido, así que un solo proceso ASGI puede
+        esperar muchas respuestas de LocationIQ a la vez.
+        """
+        if not self.api_key:
+            logger.error("LocationIQ API key no configurada")
+            return False, None
+        
+        found, address_info = await self.cache.aget(latitude, longitude)
+        if found:
+            return True, address_info
+        
         try:
             url = f"{self.base_url}/reverse.php"
-            params = {
-                'key': self.api_key,
-                'lat': latitude,
-                'lon': longitude,
-                'format': 'json',
-                'accept-language': 'es'  # Para obtener direcciones en español
-            }
-            
-            response = requests.get(url, params=params, timeout=10)
+            response = await self._aget(url, self._params(latitude, longitude))
+            if response.status_code == 404:
+                logger.info(f"LocationIQ sin dirección para {latitude}, {longitude}")
+                await self.cache.aset(latitude, longitude, None)
+                return True, None
             response.raise_for_status()
             
-            data = response.json()
-            
-            # Extraer información relevante
-            address_info = {
-                'display_name': data.get('display_name', ''),
-                'address': {
-                    'road': data.get('address', {}).get('road', ''),
-                    'house_number': data.get('address', {}).get('house_number', ''),
-                    'suburb': data.get('address', {}).get('suburb', ''),
-                    'city': data.get('address', {}).get('city', ''),
-                    'state': data.get('address', {}).get('state', ''),
-                    'country': data.get('address', {}).get('country', ''),
-                    'postcode': data.get('address', {}).get('postcode', '')
-                }
-            }
-            
-            # Crear dirección legible
-            address_parts = []
-            if address_info['address']['house_number']:
-                address_parts.append(address_info['address']['house_number'])
-            if address_info['address']['road']:
-                address_parts.append(address_info['address']['road'])
-            if address_info['address']['suburb']:
-                address_parts.append(address_info['address']['suburb'])
-            if address_info['address']['city']:
-                address_parts.append(address_info['address']['city'])
-            if address_info['address']['state']:
-                address_parts.append(address_info['address']['state'])
-            if address_info['address']['postcode']:
-                address_parts.append(address_info['address']['postcode'])
-            if address_info['address']['country']:
-                address_parts.append(address_info['address']['country'])
-                
-            address_info['formatted_address'] = ', '.join(address_parts)
+            address_info = self._build_address_info(response.json())
+            await self.cache.aset(latitude, longitude, address_info)
+            return True, address_info
             
-            return address_info
-            
-        except requests.exceptions.RequestException as e:
+        except CircuitOpenError as e:
+            logger.warning(f"LocationIQ omitido: {str(e)}")
+        except (httpx.HTTPError, _RetryableStatus) as e:
             logger.error(f"Error en la API de LocationIQ: {str(e)}")
-            return None
         except Exception as e:
             logger.error(f"Error inesperado en LocationIQ: {str(e)}")
-            return None
+        return False, None
+    
+    async def aget_address_from_coordinates(self, latitude, longitude):
+        """Versión async de ``get_address_from_coordinates``."""
+        return (await self.aresolve_address(latitude, longitude))[1]
     
     def is_api_key_valid(self):
         """Verifica si la API key es válida"""
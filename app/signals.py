@@ -0,0 +1,141 @@
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_out
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .auth import forget_user
+from .board_cache import invalidate_board
+from .counters import apply_deltas, key_deltas, todo_keys
+from .geo import geohash_for
+from .models import Category, Note, Todo, Tombstone
+from .search import index_notes, index_todos, unindex
+
+
+def _deleting_user(origin):
+    """True si el borrado viene en cascada del borrado de un usuario."""
+    if isinstance(origin, QuerySet):
+        return origin.model is User
+    return isinstance(origin, User)
+
+
+def _record_tombstone(user_id, model, object_id, origin):
+    if not _deleting_user(origin):
+        Tombstone.objects.create(user_id=user_id, model=model, object_id=object_id)
+
+
+@receiver([post_save, post_delete], sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    # Contraseña, is_active, etc.: la siguiente petición relee el usuario
+    forget_user(instance.pk)
+
+
+@receiver(user_logged_out)
+def forget_logged_out_user(sender, request, user, **kwargs):
+    if user is not None:
+        forget_user(user.pk)
+
+
+@receiver(pre_save, sender=Todo)
+def sync_geohash(sender, instance, **kwargs):
+    instance.geohash = geohash_for(instance.latitude, instance.longitude)
+
+
+@receiver([post_save, post_delete], sender=Todo)
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_owner_board(sender, instance, **kwargs):
+    invalidate_board(instance.user_id)
+
+
+@receiver(pre_delete, sender=Category)
+def touch_category_todos(sender, instance, origin=None, **kwargs):
+    # SET_NULL vacía la categoría con un UPDATE que no toca updated_at; sin
+    # esto las tareas no aparecerían en app/changes.py
+    if not _deleting_user(origin):
+        Todo.objects.filter(category=instance).update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=Todo)
+@receiver(post_delete, sender=Category)
+def record_owner_tombstone(sender, instance, origin=None, **kwargs):
+    _record_tombstone(instance.user_id, sender._meta.model_name, instance.pk, origin)
+
+
+def _note_owner(note, origin=None):
+    user_id = Todo.objects.filter(id=note.todo_id).values_list('user_id', flat=True).first()
+    if user_id is None and isinstance(origin, Todo):
+        # Borrado en cascada: la tarea ya no está en la BD
+        user_id = origin.user_id
+    return user_id
+
+
+@receiver(post_save, sender=Note)
+def invalidate_note_board(sender, instance, **kwargs):
+    user_id = _note_owner(instance)
+    if user_id is not None:
+        invalidate_board(user_id)
+
+
+@receiver(post_delete, sender=Note)
+def record_note_deletion(sender, instance, origin=None, **kwargs):
+    user_id = _note_owner(instance, origin)
+    if user_id is not None:
+        invalidate_board(user_id)
+        _record_tombstone(user_id, 'note', instance.pk, origin)
+
+
+@receiver(post_save, sender=Todo)
+def index_todo(sender, instance, **kwargs):
+    index_todos([instance.pk])
+
+
+@receiver(post_save, sender=Note)
+def index_note(sender, instance, **kwargs):
+    index_notes([instance.pk])
+
+
+@receiver(post_delete, sender=Todo)
+@receiver(post_delete, sender=Note)
+def unindex_deleted(sender, instance, **kwargs):
+    unindex(sender._meta.model_name, [instance.pk])
+
+
+# Counters: each instance remembers the keys it counted for when loaded, so
+# a save only has to apply the difference
+COUNTED_FIELDS = {'status', 'priority', 'completed', 'due_date'}
+
+
+@receiver(post_init, sender=Todo)
+def remember_counter_keys(sender, instance, **kwargs):
+    if instance.pk is not None and not COUNTED_FIELDS & instance.get_deferred_fields():
+        instance._counter_keys = todo_keys(instance)
+
+
+@receiver(pre_save, sender=Todo)
+def load_counter_keys(sender, instance, update_fields=None, **kwargs):
+    if instance._state.adding or hasattr(instance, '_counter_keys'):
+        return
+    if update_fields is not None and not COUNTED_FIELDS & set(update_fields):
+        return
+    # Cargada con campos diferidos: se lee el estado anterior de la BD
+    old = Todo.objects.filter(pk=instance.pk).values(*COUNTED_FIELDS).first()
+    if old is not None:
+        instance._counter_keys = todo_keys(Todo(**old))
+
+
+@receiver(post_save, sender=Todo)
+def update_todo_counters(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not COUNTED_FIELDS & set(update_fields):
+        return
+    old_keys = [] if created else getattr(instance, '_counter_keys', [])
+    new_keys = todo_keys(instance)
+    apply_deltas(instance.user_id, key_deltas(old_keys, new_keys))
+    instance._counter_keys = new_keys
+
+
+@receiver(post_delete, sender=Todo)
+def discount_deleted_todo(sender, instance, origin=None, **kwargs):
+    if not _deleting_user(origin):
+        old_keys = getattr(instance, '_counter_keys', None) or todo_keys(instance)
+        apply_deltas(instance.user_id, key_deltas(old_keys, []))
@@ -0,0 +1,329 @@
+"""
+Sincronización por lotes para clientes que trabajan sin conexión.
+
+El cliente envía en un solo POST la cola de mutaciones pendientes::
+
+    {"op": "create", "type": "todo", "client_id": "t1", "fields": {"title": "...", "category": "c1"}}
+    {"op": "update", "type": "todo", "id": 42, "fields": {"completed": true}}
+    {"op": "delete", "type": "note", "id": "n1"}
+
+``type`` es ``category``, ``todo`` o ``note``. En ``id`` y en las
+referencias (``category`` de una tarea, ``todo`` de una nota) vale el id del
+servidor o el ``client_id`` de un alta del mismo lote.
+
+El lote se aplica en una transacción y con escrituras masivas
+(``app/bulk.py``): primero las altas (categorías, tareas, notas), luego los
+cambios y por último las bajas, cada grupo con unas pocas consultas sea cual
+sea su tamaño. Si una mutación no es válida no se aplica ninguna. Si su
+objeto (o uno al que hace referencia) ya no existe, por ejemplo porque se
+borró desde otro dispositivo, se omite con estado ``missing`` y el resto
+sigue adelante.
+
+Cada lote lleva una clave de idempotencia. El resultado se guarda en
+``SyncBatch`` en la misma transacción, así que reintentar con la misma
+clave devuelve ese resultado sin volver a aplicar nada.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.utils import timezone
+
+from . import bulk
+from .board_cache import invalidate_board
+from .models import Category, Note, SyncBatch, Todo
+
+SYNC_MAX_MUTATIONS = 500
+# Tiempo durante el que un reintento con la misma clave devuelve el resultado guardado
+SYNC_IDEMPOTENCY_TTL = timedelta(days=1)
+
+SYNC_MODELS = {'category': Category, 'todo': Todo, 'note': Note}
+SYNC_FIELDS = {
+    'category': ('name', 'color'),
+    'todo': ('title', 'description', 'status', 'priority', 'completed', 'due_date', 'todo_order'),
+    'note': ('content',),
+}
+# Referencias a otros objetos (campo -> tipo); una nota no cambia de tarea
+SYNC_REFERENCES = {
+    'todo': {'category': 'category'},
+    'note': {'todo': 'todo'},
+}
+SYNC_UPDATE_REFERENCES = {
+    'todo': {'category': 'category'},
+}
+SYNC_OPS = ('create', 'update', 'delete')
+
+
+class SyncError(ValueError):
+    """Una mutación del lote no es válida."""
+
+    def __init__(self, index, message):
+        super().__init__(f'Mutación {index}: {message}')
+        self.index = index
+
+
+class IdempotencyConflict(Exception):
+    """La clave de idempotencia ya se usó con un lote distinto."""
+
+
+def fingerprint(body):
+    return hashlib.sha256(body).hexdigest()
+
+
+def _is_reference(value):
+    return (isinstance(value, int) and not isinstance(value, bool)) or (isinstance(value, str) and value != '')
+
+
+def _optional(field):
+    return field.has_default() or field.null or field.blank
+
+
+def _clean_fields(index, kind, fields, creating):
+    model = SYNC_MODELS[kind]
+    references = (SYNC_REFERENCES if creating else SYNC_UPDATE_REFERENCES).get(kind, {})
+    values, refs = {}, {}
+    for name, value in fields.items():
+        if name in references:
+            if value is not None and not _is_reference(value):
+                raise SyncError(index, f'{name} inválido')
+            if value is None and not model._meta.get_field(name).null:
+                raise SyncError(index, f'falta el campo {name}')
+            refs[name] = value
+            continue
+        if name not in SYNC_FIELDS[kind]:
+            raise SyncError(index, f'campo desconocido: {name}')
+        field = model._meta.get_field(name)
+        try:
+            value = None if value is None and field.null else field.clean(value, None)
+        except ValidationError as e:
+            raise SyncError(index, f'{name}: {" ".join(e.messages)}') from e
+        if isinstance(field, models.DateTimeField) and value is not None and timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        values[name] = value
+
+    if creating:
+        required = [
+            name for name in (*SYNC_FIELDS[kind], *references)
+            if name not in values and name not in refs and not _optional(model._meta.get_field(name))
+        ]
+        if required:
+            raise SyncError(index, f'falta el campo {required[0]}')
+    return values, refs
+
+
+def parse_mutations(mutations):
+    """
+    Valida la forma de cada mutación y limpia sus campos.
+
+    Returns:
+        list: Diccionarios con ``index``, ``op``, ``type``, ``target``
+        (``id`` o ``client_id``), ``values`` y ``refs``
+
+    Raises:
+        SyncError: Si alguna mutación no es válida.
+    """
+    if not isinstance(mutations, list):
+        raise SyncError(0, 'se esperaba una lista de mutaciones')
+    if len(mutations) > SYNC_MAX_MUTATIONS:
+        raise SyncError(SYNC_MAX_MUTATIONS, f'como máximo {SYNC_MAX_MUTATIONS} mutaciones por lote')
+
+    parsed = []
+    client_ids = set()
+    for index, mutation in enumerate(mutations):
+        if not isinstance(mutation, dict):
+            raise SyncError(index, 'se esperaba un objeto')
+        op, kind = mutation.get('op'), mutation.get('type')
+        if op not in SYNC_OPS:
+            raise SyncError(index, f'operación desconocida: {op!r}')
+        if kind not in SYNC_MODELS:
+            raise SyncError(index, f'tipo desconocido: {kind!r}')
+
+        if op == 'create':
+            target = mutation.get('client_id')
+            if not isinstance(target, str) or not target:
+                raise SyncError(index, 'falta client_id')
+            if target in client_ids:
+                raise SyncError(index, f'client_id repetido: {target}')
+            client_ids.add(target)
+        else:
+            target = mutation.get('id')
+            if not _is_reference(target):
+                raise SyncError(index, 'falta id')
+
+        fields = {} if op == 'delete' else mutation.get('fields', {})
+        if not isinstance(fields, dict):
+            raise SyncError(index, 'fields debe ser un objeto')
+        values, refs = _clean_fields(index, kind, fields, creating=op == 'create')
+        parsed.append({'index': index, 'op': op, 'type': kind, 'target': target, 'values': values, 'refs': refs})
+    return parsed
+
+
+class BatchApplier:
+    """Aplica las mutaciones de ``parse_mutations`` al tablero de ``user``."""
+
+    def __init__(self, user):
+        self.user = user
+        self.client_ids = {kind: {} for kind in SYNC_MODELS}  # client_id -> id del servidor
+        self.results = {}
+        self.written = False
+
+    def _resolve(self, kind, reference):
+        """Id del servidor de ``reference`` (id o client_id), o None si es un client_id desconocido."""
+        if isinstance(reference, str):
+            return self.client_ids[kind].get(reference)
+        return reference
+
+    def _owned(self, kind, ids):
+        """Ids de ``ids`` que existen y son del usuario."""
+        if not ids:
+            return set()
+        owner = {'note': 'todo__user'}.get(kind, 'user')
+        return set(SYNC_MODELS[kind].objects.filter(**{owner: self.user, 'id__in': ids}).values_list('id', flat=True))
+
+    def _resolve_refs(self, mutations):
+        """
+        Sustituye las referencias de ``mutations`` por ids del servidor.
+
+        Returns:
+            list: Las mutaciones cuyas referencias existen; el resto quedan como ``missing``
+        """
+        wanted = {kind: set() for kind in SYNC_MODELS}
+        for mutation in mutations:
+            for name, reference in mutation['refs'].items():
+                if isinstance(reference, int):
+                    wanted[SYNC_REFERENCES[mutation['type']][name]].add(reference)
+        owned = {kind: self._owned(kind, ids) for kind, ids in wanted.items()}
+
+        valid = []
+        for mutation in mutations:
+            resolved = {}
+            for name, reference in mutation['refs'].items():
+                kind = SYNC_REFERENCES[mutation['type']][name]
+                server_id = self._resolve(kind, reference)
+                if reference is not None and (server_id is None or (isinstance(reference, int) and server_id not in owned[kind])):
+                    self.results[mutation['index']] = {'status': 'missing'}
+                    break
+                resolved[f'{name}_id'] = server_id
+            else:
+                mutation['values'].update(resolved)
+                valid.append(mutation)
+        return valid
+
+    def _create(self, mutations):
+        for kind in ('category', 'todo', 'note'):
+            pending = self._resolve_refs([m for m in mutations if m['type'] == kind])
+            objects = [SYNC_MODELS[kind](**mutation['values']) for mutation in pending]
+            if kind == 'category':
+                for category in objects:
+                    category.user = self.user
+                created = Category.objects.bulk_create(objects)
+            elif kind == 'todo':
+                created = bulk.create_todos(self.user.id, objects)
+            else:
+                created = bulk.create_notes(objects)
+            for mutation, obj in zip(pending, created):
+                self.client_ids[kind][mutation['target']] = obj.id
+                self.results[mutation['index']] = {'status': 'ok', 'id': obj.id}
+            self.written |= bool(created)
+
+    def _targets(self, mutations):
+        """Resuelve el objetivo de cada mutación y marca como ``missing`` los que no existen."""
+        for mutation in mutations:
+            mutation['target'] = self._resolve(mutation['type'], mutation['target'])
+        owned = {
+            kind: self._owned(kind, {m['target'] for m in mutations if m['type'] == kind and m['target'] is not None})
+            for kind in SYNC_MODELS
+        }
+        found = []
+        for mutation in mutations:
+            if mutation['target'] in owned[mutation['type']]:
+                found.append(mutation)
+            else:
+                self.results[mutation['index']] = {'status': 'missing'}
+        return found
+
+    def _update(self, mutations):
+        for kind in ('category', 'todo', 'note'):
+            pending = self._resolve_refs(self._targets([m for m in mutations if m['type'] == kind]))
+            if not pending:
+                continue
+            objects = SYNC_MODELS[kind].objects.select_for_update().in_bulk({m['target'] for m in pending})
+            fields = set()
+            for mutation in pending:
+                obj = objects[mutation['target']]
+                for name, value in mutation['values'].items():
+                    setattr(obj, name, value)
+                fields.update(mutation['values'])
+                self.results[mutation['index']] = {'status': 'ok', 'id': obj.id}
+            changed = [objects[object_id] for object_id in dict.fromkeys(m['target'] for m in pending)]
+            if kind == 'category':
+                bulk.update_categories(changed, fields)
+            elif kind == 'todo':
+                bulk.update_todos(self.user.id, changed, fields)
+            else:
+                bulk.update_notes(changed, fields)
+            self.written = True
+
+    def _delete(self, mutations):
+        deleters = {'note': bulk.delete_notes, 'todo': bulk.delete_todos, 'category': bulk.delete_categories}
+        for kind, delete in deleters.items():
+            pending = [m for m in mutations if m['type'] == kind]
+            for mutation in pending:
+                mutation['target'] = self._resolve(kind, mutation['target'])
+            deleted = set(delete(self.user.id, {m['target'] for m in pending if m['target'] is not None}))
+            for mutation in pending:
+                # Borrar dos veces lo mismo en un lote no es un error
+                ok = mutation['target'] in deleted
+                self.results[mutation['index']] = {'status': 'ok', 'id': mutation['target']} if ok else {'status': 'missing'}
+            self.written |= bool(deleted)
+
+    def apply(self, mutations):
+        """
+        Returns:
+            dict: ``results`` (uno por mutación, en orden) e ``ids``
+            (``client_id`` -> id del servidor por tipo)
+        """
+        for op, step in (('create', self._create), ('update', self._update), ('delete', self._delete)):
+            step([m for m in mutations if m['op'] == op])
+        return {
+            'results': [self.results[index] for index in range(len(mutations))],
+            'ids': self.client_ids,
+        }
+
+
+def apply_batch(user, key, body, mutations):
+    """
+    Aplica un lote o devuelve el resultado guardado para ``key``. Debe
+    llamarse dentro de una transacción.
+
+    Args:
+        user (User): Dueño del tablero
+        key (str): Clave de idempotencia
+        body (bytes): Cuerpo de la petición, para detectar claves reutilizadas
+        mutations (list): Mutaciones sin validar
+
+    Returns:
+        tuple: ``(resultado, repetido)``, con ``resultado`` como en
+        ``BatchApplier.apply`` y ``repetido`` True si ya se había aplicado
+
+    Raises:
+        SyncError: Si alguna mutación no es válida.
+        IdempotencyConflict: Si ``key`` ya se usó con otro cuerpo.
+    """
+    digest = fingerprint(body)
+    stored = SyncBatch.objects.filter(user=user, key=key).first()
+    if stored is not None:
+        if stored.fingerprint != digest:
+            raise IdempotencyConflict(key)
+        return stored.response, True
+
+    parsed = parse_mutations(mutations)
+    applier = BatchApplier(user)
+    outcome = applier.apply(parsed)
+    if applier.written:
+        invalidate_board(user.id)
+
+    SyncBatch.objects.filter(user=user, created_at__lt=timezone.now() - SYNC_IDEMPOTENCY_TTL).delete()
+    SyncBatch.objects.create(user=user, key=key, fingerprint=digest, response=outcome)
+    return outcome, False
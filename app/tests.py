@@ -1,3 +1,2225 @@
-from django.test import TestCase
+import asyncio
+import importlib.util
+import json
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+import requests
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.core.serializers.json import DjangoJSONEncoder
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from todo_list.asgi import application as asgi_application
+from todo_list.database import database_from_env
+
+from .auth import check_shared_cache
+from .benchmark import find_regressions, measure_templates, run_benchmark, seed
+from . import live
+from .board_cache import BOARD_VIEW_COOKIE, bump_version, fragment_stats, get_version
+from .changes import changes_since, decode_cursor, encode_cursor
+from .geo import bounding_boxes, covering_cells, encode_geohash
+from .geocoding import backfill_addresses, claim_jobs, enqueue_location, process_job, run_batch
+from . import metrics
+from .counters import compute_counters, reconcile
+from .models import GeocodingJob, SyncBatch, Todo, TodoCounter, Category, Note, Tombstone
+from .ordering import ORDER_GAP, compute_order_keys
+from .transfer import export_rows, import_rows, parse_jsonl
+from .views import BOARD_COLUMNS, board_context
+from .services import (
+    CircuitBreaker, CircuitOpenError, GeocodingCache, LocationIQService, RateLimiter, geocoding_cache,
+    get_async_http_client, get_http_session, locationiq_breaker,
+)
+
+
+class DashboardQueryTests(TestCase):
+    def setUp(self):
+        caches['board'].clear()
+        self.user = User.objects.create_user(username='alice', password='secret-pass-123')
+        self.client.force_login(self.user)
+
+    def _create_todos(self, count):
+        categories = [
+            Category.objects.create(name=f'Cat {i}', user=self.user) for i in range(3)
+        ]
+        statuses = [status for status, _ in Todo.STATUS_CHOICES]
+        Todo.objects.bulk_create([
+            Todo(
+                user=self.user,
+                title=f'Tarea {i}',
+                status=statuses[i % len(statuses)],
+                category=categories[i % len(categories)],
+                todo_order=i,
+            )
+            for i in range(count)
+        ])
+
+    def _dashboard_query_count(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_query_count_does_not_grow_with_todos(self):
+        self._create_todos(4)
+        small, _ = self._dashboard_query_count()
+
+        self._create_todos(60)
+        large, _ = self._dashboard_query_count()
+
+        self.assertEqual(small, large)
+
+    def test_query_budget(self):
+        self._create_todos(40)
+        # session + user + freshness check + todos (with categories joined)
+        with self.assertNumQueries(4):
+            self.client.get(reverse('dashboard'))
+
+    def test_todos_grouped_by_status(self):
+        self._create_todos(8)
+        groups = board_context(self.user)['status_groups']
+        self.assertEqual(set(groups), {'todo', 'in_progress', 'review', 'done'})
+        for status, todos in groups.items():
+            self.assertEqual(len(todos), 2)
+            self.assertTrue(all(todo.status == status for todo in todos))
+        self.assertEqual(
+            [todo.todo_order for todo in groups['todo']],
+            sorted(todo.todo_order for todo in groups['todo']),
+        )
+
+
+class IndexUsageTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='bob', password='secret-pass-123')
+        category = Category.objects.create(name='Trabajo', user=self.user)
+        todo = Todo.objects.create(user=self.user, title='Tarea', category=category)
+        Note.objects.create(todo=todo, content='Nota')
+        self.todo = todo
+
+    def _plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                return ' '.join(str(row[-1]) for row in cursor.fetchall())
+            cursor.execute(f'EXPLAIN {sql}', params)
+            return ' '.join(str(row[0]) for row in cursor.fetchall())
+
+    def _assert_uses_index(self, queryset, index_name):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.skipTest(f'No query plan check for {connection.vendor}')
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+        plan = self._plan(queryset)
+        self.assertIn(index_name, plan)
+        if connection.vendor == 'sqlite':
+            self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', plan)
+
+    def test_board_query_uses_user_order_index(self):
+        self._assert_uses_index(
+            Todo.objects.filter(user=self.user).order_by('todo_order', '-created_at'),
+            'todo_user_order_idx',
+        )
+
+    def test_status_query_uses_user_status_index(self):
+        self._assert_uses_index(
+            Todo.objects.filter(user=self.user, status='todo'),
+            'todo_user_status_order_idx',
+        )
+
+    def test_notes_query_uses_todo_created_index(self):
+        self._assert_uses_index(self.todo.notes.all(), 'note_todo_created_idx')
+
+    def test_categories_query_uses_user_name_index(self):
+        self._assert_uses_index(
+            Category.objects.filter(user=self.user), 'category_user_name_idx'
+        )
+
+    def test_changes_query_uses_user_updated_index(self):
+        self._assert_uses_index(
+            Todo.objects.filter(user=self.user, updated_at__gt=timezone.now()).order_by('updated_at', 'id'),
+            'todo_user_updated_idx',
+        )
+
+
+class OrderKeyTests(SimpleTestCase):
+    def assertIncreasing(self, keys):
+        self.assertEqual(keys, sorted(set(keys)))
+
+    def test_single_move_changes_one_key(self):
+        keys = [1024, 2048, 3072, 4096]
+        moved = [keys[0], keys[3], keys[1], keys[2]]
+        new_keys = compute_order_keys(moved)
+        self.assertIncreasing(new_keys)
+        self.assertEqual(sum(a != b for a, b in zip(moved, new_keys)), 1)
+
+    def test_card_from_other_column_gets_key_between_neighbours(self):
+        new_keys = compute_order_keys([1024, None, 2048])
+        self.assertEqual(new_keys, [1024, 1536, 2048])
+
+    def test_moves_to_edges(self):
+        self.assertEqual(compute_order_keys([None, 1024]), [0, 1024])
+        self.assertEqual(compute_order_keys([1024, None]), [1024, 1024 + ORDER_GAP])
+        self.assertEqual(compute_order_keys([None, None]), [ORDER_GAP, 2 * ORDER_GAP])
+
+    def test_rebalances_when_gap_exhausted(self):
+        new_keys = compute_order_keys([5, None, 6])
+        self.assertEqual(new_keys, [ORDER_GAP, 2 * ORDER_GAP, 3 * ORDER_GAP])
+
+    def test_ties_are_spread_out(self):
+        new_keys = compute_order_keys([0, 0, 0, 0])
+        self.assertIncreasing(new_keys)
+
+
+class ReorderColumnTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='carol', password='secret-pass-123')
+        self.client.force_login(self.user)
+        self.todos = [
+            Todo.objects.create(user=self.user, title=f'Tarea {i}', status='todo', todo_order=(i + 1) * ORDER_GAP)
+            for i in range(5)
+        ]
+
+    def _reorder(self, status, ids):
+        return self.client.post(
+            reverse('reorder_column'),
+            data=json.dumps({'status': status, 'order': ids}),
+            content_type='application/json',
+        )
+
+    def _column(self, status):
+        return list(
+            Todo.objects.filter(user=self.user, status=status).values_list('id', flat=True)
+        )
+
+    def test_move_within_column_updates_one_row(self):
+        ids = [todo.id for todo in self.todos]
+        new_order = [ids[4]] + ids[:4]
+        response = self._reorder('todo', new_order)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['updated'], 1)
+        self.assertEqual(self._column('todo'), new_order)
+
+    def test_move_across_columns(self):
+        other = Todo.objects.create(user=self.user, title='Otra', status='review', todo_order=ORDER_GAP)
+        ids = [todo.id for todo in self.todos]
+        new_order = ids[:2] + [other.id] + ids[2:]
+        response = self._reorder('todo', new_order)
+        self.assertEqual(response.json()['updated'], 1)
+        self.assertEqual(self._column('todo'), new_order)
+        self.assertEqual(self._column('review'), [])
+
+    def test_move_across_columns_updates_counters(self):
+        done = Todo.objects.create(user=self.user, title='Hecha', status='done', todo_order=ORDER_GAP)
+        response = self._reorder('done', [self.todos[0].id, done.id])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(reconcile(self.user.id), {})
+        self.assertEqual(self.client.get(reverse('todo_stats')).json()['by_status']['done'], 2)
+
+    def test_rejects_foreign_todos(self):
+        stranger = User.objects.create_user(username='mallory', password='secret-pass-123')
+        foreign = Todo.objects.create(user=stranger, title='Ajena', status='done')
+        response = self._reorder('todo', [self.todos[0].id, foreign.id])
+        self.assertEqual(response.status_code, 404)
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.status, 'done')
+
+    def test_rejects_invalid_status(self):
+        response = self._reorder('archived', [self.todos[0].id])
+        self.assertEqual(response.status_code, 400)
+
+
+def _locationiq_response(status_code=200, payload=None):
+    response = mock.Mock(status_code=status_code)
+    response.json.return_value = payload or {
+        'display_name': 'Calle Mayor 1, Madrid, España',
+        'address': {'road': 'Calle Mayor', 'house_number': '1', 'city': 'Madrid', 'country': 'España'},
+    }
+    response.raise_for_status.return_value = None
+    return response
+
+
+@override_settings(LOCATIONIQ_API_KEY='test-key', LOCATIONIQ_CACHE_PRECISION=4)
+class GeocodingCacheTests(TestCase):
+    def setUp(self):
+        caches['geocoding'].clear()
+        self.cache = GeocodingCache(max_entries=2)
+        self.session = mock.Mock()
+        self.session.get.return_value = _locationiq_response()
+        self.service = LocationIQService(cache=self.cache, session=self.session, breaker=CircuitBreaker())
+
+    def test_nearby_coordinates_hit_cache(self):
+        first = self.service.get_address_from_coordinates(40.416775, -3.703790)
+        second = self.service.get_address_from_coordinates(40.416781, -3.703788)
+        self.assertEqual(first, second)
+        self.assertEqual(self.session.get.call_count, 1)
+        self.assertEqual(self.cache.stats()['local_hits'], 1)
+        self.assertEqual(self.cache.stats()['misses'], 1)
+
+    def test_shared_tier_serves_other_processes(self):
+        self.service.get_address_from_coordinates(40.4168, -3.7038)
+        other = LocationIQService(cache=GeocodingCache(), session=self.session, breaker=CircuitBreaker())
+        self.assertIsNotNone(other.get_address_from_coordinates(40.4168, -3.7038))
+        self.assertEqual(self.session.get.call_count, 1)
+        self.assertEqual(other.cache.stats()['shared_hits'], 1)
+
+    def test_not_found_is_cached(self):
+        self.session.get.return_value = _locationiq_response(status_code=404)
+        self.assertIsNone(self.service.get_address_from_coordinates(0, 0))
+        self.assertIsNone(self.service.get_address_from_coordinates(0, 0))
+        self.assertEqual(self.session.get.call_count, 1)
+        self.assertEqual(self.cache.stats()['negative_hits'], 1)
+
+    def test_lru_evicts_oldest_entry(self):
+        for lat in (1, 2, 3):
+            self.service.get_address_from_coordinates(lat, 0)
+        self.assertEqual(self.cache.stats()['local_size'], 2)
+        self.assertNotIn(self.cache.make_key(1, 0), self.cache._local)
+
+    @override_settings(LOCATIONIQ_CACHE_TTL=0)
+    def test_expired_entries_are_refetched(self):
+        self.service.get_address_from_coordinates(10, 10)
+        self.service.get_address_from_coordinates(10, 10)
+        self.assertEqual(self.session.get.call_count, 2)
+
+
+class FakeLocationIQServer:
+    """
+    Servidor HTTP local que imita /reverse.php de LocationIQ.
+
+    ``script`` es una lista de ``(status, delay)`` que se consume por
+    petición; cuando se agota se responde 200 con una dirección.
+    """
+
+    def __init__(self, script=None):
+        self.script = list(script or [])
+        self.requests = []
+        self.lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                with fake.lock:
+                    fake.requests.append(self.path)
+                    status, delay = fake.script.pop(0) if fake.script else (200, 0)
+                if delay:
+                    time.sleep(delay)
+                if status == 200:
+                    body = json.dumps({
+                        'display_name': 'Calle Falsa 123, Springfield',
+                        'address': {'road': 'Calle Falsa', 'house_number': '123', 'city': 'Springfield'},
+                    }).encode()
+                else:
+                    body = json.dumps({'error': 'fake'}).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # El cliente ya cortó por timeout
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.base_url = f'http://127.0.0.1:{self.httpd.server_port}/v1'
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@override_settings(
+    LOCATIONIQ_API_KEY='test-key',
+    LOCATIONIQ_CACHE_TTL=0,
+    LOCATIONIQ_CACHE_NEGATIVE_TTL=0,
+    LOCATIONIQ_READ_TIMEOUT=0.3,
+    LOCATIONIQ_BACKOFF_BASE=0.01,
+    LOCATIONIQ_MAX_RETRIES=2,
+)
+class LocationIQClientTests(TestCase):
+    def _service(self, server, breaker=None):
+        with override_settings(LOCATIONIQ_BASE_URL=server.base_url):
+            return LocationIQService(
+                cache=GeocodingCache(), breaker=breaker or CircuitBreaker(failure_threshold=2, reset_timeout=60)
+            )
+
+    def test_retries_server_errors(self):
+        with FakeLocationIQServer([(503, 0), (502, 0)]) as server, self.assertLogs('app.services', 'WARNING'):
+            result = self._service(server).get_address_from_coordinates(1, 1)
+        self.assertEqual(result['formatted_address'], '123, Calle Falsa, Springfield')
+        self.assertEqual(len(server.requests), 3)
+
+    def test_read_timeout_is_retried(self):
+        with FakeLocationIQServer([(200, 0.6)]) as server, self.assertLogs('app.services', 'WARNING'):
+            result = self._service(server).get_address_from_coordinates(1, 1)
+        self.assertIsNotNone(result)
+        self.assertEqual(len(server.requests), 2)
+
+    async def test_cancelled_half_open_trial_releases_breaker(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.3)
+        breaker.record_failure()
+        await asyncio.sleep(0.35)
+        with FakeLocationIQServer([(200, 1.0)]) as server:
+            service = LocationIQService(cache=GeocodingCache(), breaker=breaker)
+            # Como update_todo_location con GEOCODING_INLINE_TIMEOUT
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(service._aget(f'{server.base_url}/reverse.php', {}), timeout=0.1)
+            # The caller gave up; that is not an upstream failure
+            self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+            breaker.before_call()  # Not stuck "en prueba de recuperación"
+
+    async def test_inline_timeouts_do_not_open_breaker(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        with FakeLocationIQServer([(200, 1.0)]) as server:
+            service = LocationIQService(cache=GeocodingCache(), breaker=breaker)
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(service._aget(f'{server.base_url}/reverse.php', {}), timeout=0.1)
+            self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_client_errors_are_not_retried(self):
+        with FakeLocationIQServer([(401, 0)]) as server, self.assertLogs('app.services', 'ERROR'):
+            self.assertIsNone(self._service(server).get_address_from_coordinates(1, 1))
+        self.assertEqual(len(server.requests), 1)
+
+    def test_circuit_opens_and_fails_fast(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        with FakeLocationIQServer([(500, 0)] * 6) as server, self.assertLogs('app.services', 'WARNING'):
+            service = self._service(server, breaker)
+            service.get_address_from_coordinates(1, 1)
+            service.get_address_from_coordinates(2, 2)
+            self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+            sent = len(server.requests)
+            self.assertIsNone(service.get_address_from_coordinates(3, 3))
+            self.assertEqual(len(server.requests), sent)
+
+    def test_half_open_trial_closes_circuit(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        breaker.record_failure()
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+        time.sleep(0.06)
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        with FakeLocationIQServer() as server:
+            self.assertIsNotNone(self._service(server, breaker).get_address_from_coordinates(1, 1))
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_unexpected_error_releases_half_open_trial(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+        session = mock.Mock()
+        session.get.side_effect = ValueError('respuesta rara')
+        service = LocationIQService(cache=GeocodingCache(), session=session, breaker=breaker)
+        with self.assertRaises(ValueError):
+            service._get('http://locationiq.invalid/reverse', {})
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        breaker.before_call()  # A new trial is allowed
+
+    def test_session_is_shared_and_pooled(self):
+        session = get_http_session()
+        self.assertIs(session, get_http_session())
+        adapter = session.get_adapter('https://us1.locationiq.com/v1')
+        self.assertTrue(adapter._pool_block)
+
+
+@override_settings(
+    LOCATIONIQ_API_KEY='test-key',
+    GEOCODING_MAX_ATTEMPTS=2,
+    GEOCODING_RETRY_DELAY=0,
+)
+class GeocodingQueueTests(TestCase):
+    def setUp(self):
+        caches['geocoding'].clear()
+        geocoding_cache.clear()
+        self.user = User.objects.create_user(username='dave', password='secret-pass-123')
+        self.client.force_login(self.user)
+        self.todo = Todo.objects.create(user=self.user, title='Con ubicación')
+        self.session = mock.Mock()
+        self.session.get.return_value = _locationiq_response()
+        self.service = LocationIQService(cache=GeocodingCache(), session=self.session, breaker=CircuitBreaker())
+
+    def _post_location(self, latitude, longitude):
+        return self.client.post(
+            reverse('update_todo_location', args=[self.todo.id]),
+            data=json.dumps({'latitude': latitude, 'longitude': longitude}),
+            content_type='application/json',
+        )
+
+    def _status(self):
+        return self.client.get(reverse('todo_location_status', args=[self.todo.id])).json()
+
+    def test_location_is_saved_and_queued(self):
+        with mock.patch('app.services.requests.Session.get') as http_get:
+            response = self._post_location(40.4168, -3.7038)
+        http_get.assert_not_called()
+        self.assertEqual(response.status_code, 202)
+        self.todo.refresh_from_db()
+        self.assertEqual(float(self.todo.latitude), 40.4168)
+        self.assertEqual(GeocodingJob.objects.get().status, 'pending')
+        self.assertEqual(self._status()['status'], 'pending')
+
+    def test_worker_fills_address(self):
+        self._post_location(40.4168, -3.7038)
+        self.assertEqual(run_batch(self.service, 10), (1, 1))
+        self.todo.refresh_from_db()
+        self.assertEqual(self.todo.address, '1, Calle Mayor, Madrid, España')
+        self.assertIsNotNone(self.todo.location_updated_at)
+        status = self._status()
+        self.assertEqual(status['status'], 'done')
+        self.assertEqual(status['address'], self.todo.address)
+
+    def test_cached_address_returns_immediately(self):
+        self._post_location(40.4168, -3.7038)
+        run_batch(self.service, 10)
+        response = self._post_location(40.41681, -3.70381)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['address'], '1, Calle Mayor, Madrid, España')
+
+    def test_newer_location_supersedes_pending_job(self):
+        self._post_location(1, 1)
+        self._post_location(2, 2)
+        self.assertEqual(GeocodingJob.objects.count(), 1)
+        self.assertEqual(float(GeocodingJob.objects.get().latitude), 2)
+
+    def test_stale_result_is_not_written(self):
+        self._post_location(1, 1)
+        job = claim_jobs(10)[0]
+        Todo.objects.filter(id=self.todo.id).update(latitude=3, longitude=3)
+        process_job(job, self.service)
+        self.todo.refresh_from_db()
+        self.assertIsNone(self.todo.address)
+
+    def test_failed_jobs_are_retried_then_marked_failed(self):
+        self.session.get.side_effect = requests.exceptions.ConnectionError('sin red')
+        self._post_location(1, 1)
+        with override_settings(LOCATIONIQ_MAX_RETRIES=0), self.assertLogs('app.services', 'ERROR'):
+            self.assertEqual(run_batch(self.service, 10), (1, 0))
+            self.assertEqual(GeocodingJob.objects.get().status, 'pending')
+            self.assertEqual(run_batch(self.service, 10), (1, 0))
+        self.assertEqual(GeocodingJob.objects.get().status, 'failed')
+        self.assertEqual(self._status()['status'], 'failed')
+
+    def test_point_without_address_finishes_at_once(self):
+        self.session.get.return_value = _locationiq_response(status_code=404)
+        self._post_location(1, 1)
+        with self.assertLogs('app.services', 'INFO'):
+            self.assertEqual(run_batch(self.service, 10), (1, 1))
+        job = GeocodingJob.objects.get()
+        self.assertEqual((job.status, job.attempts), ('done', 1))
+        self.todo.refresh_from_db()
+        self.assertIsNone(self.todo.address)
+        self.assertEqual(self._status(), {
+            'success': True, 'status': 'done', 'address': '',
+            'location_updated_at': self.todo.location_updated_at.isoformat(),
+        })
+
+        # Con el negativo en caché no se vuelve a encolar
+        with mock.patch('app.views.LocationIQService', return_value=self.service):
+            response = self._post_location(1, 1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'done')
+        self.assertIsNone(response.json()['address'])
+        self.assertEqual(list(GeocodingJob.objects.values_list('status', flat=True)), ['done'])
+        self.assertEqual(self.session.get.call_count, 1)
+
+    def test_finished_jobs_are_not_kept(self):
+        self._post_location(1, 1)
+        run_batch(self.service, 10)
+        self.todo.refresh_from_db()
+        running = enqueue_location(self.todo)
+        claim_jobs(10)
+        self.todo.latitude, self.todo.longitude = 2, 2
+        job = enqueue_location(self.todo)
+        self.assertEqual(set(GeocodingJob.objects.values_list('id', flat=True)), {running.id, job.id})
+
+    def test_worker_command_drains_queue(self):
+        self._post_location(1, 1)
+        with FakeLocationIQServer() as server, override_settings(LOCATIONIQ_BASE_URL=server.base_url):
+            call_command('geocode_worker', '--once', '--rate', '0', stdout=mock.Mock())
+        self.todo.refresh_from_db()
+        self.assertEqual(self.todo.address, '123, Calle Falsa, Springfield')
+        self.assertEqual(len(server.requests), 1)
+
+    def test_status_of_foreign_todo_is_404(self):
+        stranger = User.objects.create_user(username='eve', password='secret-pass-123')
+        foreign = Todo.objects.create(user=stranger, title='Ajena')
+        response = self.client.get(reverse('todo_location_status', args=[foreign.id]))
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(
+    LOCATIONIQ_API_KEY='test-key',
+    LOCATIONIQ_BACKOFF_BASE=0.01,
+    LOCATIONIQ_MAX_RETRIES=0,
+)
+class AddressBackfillTests(TestCase):
+    def setUp(self):
+        caches['geocoding'].clear()
+        geocoding_cache.clear()
+        locationiq_breaker.reset()
+        self.addCleanup(locationiq_breaker.reset)
+        self.user = User.objects.create_user(username='fran', password='secret-pass-123')
+        self.todos = [
+            Todo.objects.create(user=self.user, title='Sol', latitude=40.416775, longitude=-3.703790),
+            # A menos de la precisión de la caché: comparte petición con Sol
+            Todo.objects.create(user=self.user, title='Sol 2', latitude=40.416780, longitude=-3.703795),
+            Todo.objects.create(user=self.user, title='Retiro', latitude=40.415260, longitude=-3.684440),
+            Todo.objects.create(user=self.user, title='Atocha', latitude=40.406950, longitude=-3.691170),
+        ]
+        self.resolved = Todo.objects.create(
+            user=self.user, title='Resuelta', latitude=41.3874, longitude=2.1686, address='Barcelona',
+            location_updated_at=timezone.now() - timedelta(days=90),
+        )
+        Todo.objects.create(user=self.user, title='Sin ubicación')
+
+    def _backfill(self, server, *args):
+        stdout = StringIO()
+        with override_settings(LOCATIONIQ_BASE_URL=server.base_url):
+            call_command('backfill_addresses', '--rate', '0', *args, stdout=stdout, stderr=StringIO())
+        return stdout.getvalue()
+
+    def _addresses(self):
+        return dict(Todo.objects.values_list('title', 'address'))
+
+    def test_fills_missing_addresses_once_per_point(self):
+        version = caches['board'].get(f'board:{self.user.id}:version')
+        with FakeLocationIQServer() as server:
+            output = self._backfill(server, '--workers', '3')
+        self.assertEqual(len(server.requests), 3)
+        addresses = self._addresses()
+        for title in ('Sol', 'Sol 2', 'Retiro', 'Atocha'):
+            self.assertEqual(addresses[title], '123, Calle Falsa, Springfield')
+        self.assertEqual(addresses['Resuelta'], 'Barcelona')
+        self.assertIsNone(addresses['Sin ubicación'])
+        self.assertIsNotNone(Todo.objects.get(title='Sol').location_updated_at)
+        self.assertNotEqual(caches['board'].get(f'board:{self.user.id}:version'), version)
+        self.assertIn('4 tareas', output)
+        self.assertIn('3 peticiones', output)
+
+    def test_writes_each_chunk_with_bulk_update(self):
+        with FakeLocationIQServer() as server, override_settings(LOCATIONIQ_BASE_URL=server.base_url):
+            service = LocationIQService(cache=GeocodingCache(), breaker=CircuitBreaker())
+            with CaptureQueriesContext(connection) as ctx:
+                stats = backfill_addresses(service, chunk_size=2)
+        self.assertEqual((stats['rows'], stats['updated']), (4, 4))
+        updates = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "app_todo"')]
+        self.assertEqual(len(updates), 2)
+
+    def test_stale_addresses_are_refreshed(self):
+        with FakeLocationIQServer() as server:
+            self._backfill(server, '--stale-days', '30')
+        self.resolved.refresh_from_db()
+        self.assertEqual(self.resolved.address, '123, Calle Falsa, Springfield')
+
+    def test_moved_todo_is_not_overwritten(self):
+        todo = self.todos[2]
+        service = LocationIQService(cache=GeocodingCache(), breaker=CircuitBreaker())
+
+        def move_todo(*args):
+            # La tarea cambia de ubicación mientras se resolvía la anterior
+            Todo.objects.filter(id=todo.id).update(latitude=1, longitude=1)
+
+        with mock.patch.object(service, 'fetch_address', return_value=(True, {'formatted_address': 'Vieja'})), \
+                mock.patch.object(service.cache, 'set', side_effect=move_todo):
+            stats = backfill_addresses(service, workers=1, after_id=todo.id - 1, limit=1)
+        self.assertEqual(stats['updated'], 0)
+        todo.refresh_from_db()
+        self.assertIsNone(todo.address)
+
+    def test_failure_stops_and_run_resumes(self):
+        with FakeLocationIQServer([(200, 0), (200, 0), (500, 0)]) as server:
+            with self.assertRaisesMessage(CommandError, f'--after-id {self.todos[1].id}'), \
+                    self.assertLogs('app.services', 'ERROR'):
+                self._backfill(server, '--chunk-size', '2', '--workers', '1')
+        addresses = self._addresses()
+        self.assertEqual(addresses['Retiro'], '123, Calle Falsa, Springfield')
+        self.assertIsNone(addresses['Atocha'])
+
+        with FakeLocationIQServer() as server:
+            self._backfill(server, '--after-id', str(self.todos[1].id))
+        # Retiro ya se guardó: solo falta Atocha
+        self.assertEqual(len(server.requests), 1)
+        self.assertEqual(self._addresses()['Atocha'], '123, Calle Falsa, Springfield')
+
+
+class RateLimiterTests(SimpleTestCase):
+    def test_spaces_out_requests(self):
+        limiter = RateLimiter(50)
+        start = time.monotonic()
+        for _ in range(6):
+            limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 5 / 50 * 0.9)
+
+
+@override_settings(
+    LOCATIONIQ_API_KEY='test-key',
+    LOCATIONIQ_CACHE_TTL=0,
+    LOCATIONIQ_CACHE_NEGATIVE_TTL=0,
+    LOCATIONIQ_BACKOFF_BASE=0.01,
+)
+class AsyncEndpointTests(TestCase):
+    def setUp(self):
+        caches['geocoding'].clear()
+        geocoding_cache.clear()
+        self.user = User.objects.create_user(username='frank', password='secret-pass-123')
+        self.todo = Todo.objects.create(user=self.user, title='Async')
+
+    async def test_update_todo_order_async(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.post(
+            reverse('update_todo_order'),
+            data=json.dumps({'todo_id': self.todo.id, 'status': 'review', 'order': 7}),
+            content_type='application/json',
+        )
+        self.assertTrue(response.json()['success'])
+        todo = await Todo.objects.aget(id=self.todo.id)
+        self.assertEqual((todo.status, todo.todo_order), ('review', 7))
+
+    async def test_location_resolved_inline_when_enabled(self):
+        await self.async_client.aforce_login(self.user)
+        with FakeLocationIQServer() as server, override_settings(
+            LOCATIONIQ_BASE_URL=server.base_url, GEOCODING_INLINE_TIMEOUT=2
+        ):
+            response = await self.async_client.post(
+                reverse('update_todo_location', args=[self.todo.id]),
+                data=json.dumps({'latitude': 1.5, 'longitude': 2.5}),
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['address'], '123, Calle Falsa, Springfield')
+        self.assertFalse(await GeocodingJob.objects.aexists())
+
+    async def test_location_queued_when_upstream_is_slow(self):
+        await self.async_client.aforce_login(self.user)
+        with FakeLocationIQServer([(200, 1)]) as server, override_settings(
+            LOCATIONIQ_BASE_URL=server.base_url, GEOCODING_INLINE_TIMEOUT=0.2
+        ):
+            response = await self.async_client.post(
+                reverse('update_todo_location', args=[self.todo.id]),
+                data=json.dumps({'latitude': 1.5, 'longitude': 2.5}),
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 202)
+        self.assertTrue(await GeocodingJob.objects.filter(todo_id=self.todo.id).aexists())
+        todo = await Todo.objects.aget(id=self.todo.id)
+        self.assertEqual(todo.geohash, encode_geohash(1.5, 2.5))
+
+    async def test_async_client_handles_concurrent_lookups(self):
+        with FakeLocationIQServer([(200, 0.3)] * 8) as server, override_settings(
+            LOCATIONIQ_BASE_URL=server.base_url
+        ):
+            service = LocationIQService(cache=GeocodingCache(), breaker=CircuitBreaker())
+            get_async_http_client()  # El cliente (y su contexto TLS) se crea una vez por proceso
+            start = time.monotonic()
+            results = await asyncio.gather(*[
+                service.aget_address_from_coordinates(lat, 0) for lat in range(8)
+            ])
+            elapsed = time.monotonic() - start
+        self.assertTrue(all(results))
+        # En serie serían 8 * 0.3 s
+        self.assertLess(elapsed, 1.5)
+
+    async def test_async_client_retries_server_errors(self):
+        with FakeLocationIQServer([(503, 0)]) as server, override_settings(
+            LOCATIONIQ_BASE_URL=server.base_url
+        ), self.assertLogs('app.services', 'WARNING'):
+            service = LocationIQService(cache=GeocodingCache(), breaker=CircuitBreaker())
+            result = await service.aget_address_from_coordinates(1, 1)
+        self.assertIsNotNone(result)
+        self.assertEqual(len(server.requests), 2)
+
+
+class TodoApiTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='grace', password='secret-pass-123')
+        self.client.force_login(self.user)
+        self.category = Category.objects.create(name='Casa', user=self.user)
+        statuses = [status for status, _ in Todo.STATUS_CHOICES]
+        Todo.objects.bulk_create([
+            Todo(
+                user=self.user,
+                title=f'Tarea {i}',
+                status=statuses[i % 4],
+                completed=i % 3 == 0,
+                category=self.category if i % 2 else None,
+                todo_order=i // 5,  # Empates en todo_order para probar el desempate
+            )
+            for i in range(23)
+        ])
+
+    def _get(self, **params):
+        response = self.client.get(reverse('api_todos'), params)
+        return response
+
+    def _all_pages(self, **params):
+        ids, cursor = [], None
+        while True:
+            if cursor:
+                params['cursor'] = cursor
+            data = self._get(**params).json()
+            ids += [row['id'] for row in data['results']]
+            cursor = data['next_cursor']
+            if not cursor:
+                return ids
+
+    def test_pages_cover_all_rows_in_board_order(self):
+        expected = list(
+            Todo.objects.filter(user=self.user)
+            .order_by('todo_order', '-created_at', 'id')
+            .values_list('id', flat=True)
+        )
+        self.assertEqual(self._all_pages(limit=4), expected)
+
+    def test_filters(self):
+        ids = self._all_pages(limit=3, status='todo', completed='true')
+        expected = set(
+            Todo.objects.filter(user=self.user, status='todo', completed=True).values_list('id', flat=True)
+        )
+        self.assertEqual(set(ids), expected)
+        ids = self._all_pages(category=self.category.id)
+        self.assertEqual(len(ids), 11)
+
+    def test_records_are_compact(self):
+        row = self._get(limit=1).json()['results'][0]
+        self.assertEqual(
+            set(row),
+            {'id', 'title', 'status', 'priority', 'completed', 'category_id',
+             'todo_order', 'due_date', 'created_at', 'updated_at'},
+        )
+
+    def test_page_query_budget_is_constant(self):
+        first = self._get(limit=5).json()
+        # session + user + page
+        with self.assertNumQueries(3):
+            self._get(limit=5, cursor=first['next_cursor'])
+
+    def test_only_own_todos(self):
+        stranger = User.objects.create_user(username='heidi', password='secret-pass-123')
+        Todo.objects.create(user=stranger, title='Ajena')
+        self.assertEqual(len(self._all_pages(limit=50)), 23)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self._get(cursor='no-es-un-cursor').status_code, 400)
+
+
+class BoardFragmentCacheTests(TestCase):
+    def setUp(self):
+        caches['board'].clear()
+        fragment_stats.reset()
+        self.user = User.objects.create_user(username='ivan', password='secret-pass-123')
+        self.client.force_login(self.user)
+        self.category = Category.objects.create(name='Oficina', user=self.user)
+        self.todo = Todo.objects.create(user=self.user, title='Primera', category=self.category)
+
+    def _dashboard(self):
+        return self.client.get(reverse('dashboard')).content.decode()
+
+    def test_second_hit_is_served_from_cache(self):
+        self._dashboard()
+        # session + user + frescura: ni consulta de tareas ni render del fragmento
+        with self.assertNumQueries(3), mock.patch('app.views.board_context') as board_data:
+            html = self._dashboard()
+        board_data.assert_not_called()
+        self.assertIn('Primera', html)
+        self.assertEqual(fragment_stats.stats()['hits'], 1)
+        self.assertEqual(fragment_stats.stats()['hit_ratio'], 0.5)
+
+    def test_todo_save_invalidates(self):
+        self._dashboard()
+        self.todo.title = 'Renombrada'
+        self.todo.save()
+        self.assertIn('Renombrada', self._dashboard())
+
+    def test_todo_delete_invalidates(self):
+        self._dashboard()
+        self.todo.delete()
+        self.assertNotIn('Primera', self._dashboard())
+
+    def test_category_change_invalidates(self):
+        self._dashboard()
+        self.category.name = 'Hogar'
+        self.category.save()
+        self.assertIn('Hogar', self._dashboard())
+
+    def test_note_invalidates(self):
+        self._dashboard()
+        misses = fragment_stats.stats()['misses']
+        Note.objects.create(todo=self.todo, content='Nota')
+        self._dashboard()
+        self.assertEqual(fragment_stats.stats()['misses'], misses + 1)
+
+    def test_bulk_reorder_invalidates(self):
+        other = Todo.objects.create(user=self.user, title='Segunda', status='done')
+        self._dashboard()
+        self.client.post(
+            reverse('reorder_column'),
+            data=json.dumps({'status': 'todo', 'order': [self.todo.id, other.id]}),
+            content_type='application/json',
+        )
+        html = self._dashboard()
+        self.assertIn('data-count-for="todo-column">2<', html)
+        self.assertIn('Segunda', html)
+
+    def test_boards_are_per_user(self):
+        self._dashboard()
+        other = User.objects.create_user(username='judy', password='secret-pass-123')
+        self.client.force_login(other)
+        self.assertNotIn('Primera', self._dashboard())
+
+    def test_file_based_backend(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            board_cache = {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': cache_dir,
+            }
+            with override_settings(CACHES={**settings.CACHES, 'board': board_cache}):
+                self._dashboard()
+                self.todo.title = 'En disco'
+                self.todo.save()
+                self.assertIn('En disco', self._dashboard())
+                self._dashboard()
+        self.assertEqual(fragment_stats.stats()['hits'], 1)
+
+    def test_only_active_view_is_rendered(self):
+        html = self._dashboard()
+        self.assertIn('id="todo-column"', html)
+        self.assertNotIn('id="list-rows"', html)
+        self.assertEqual(html.count('class="todo-card '), 1)
+        self.assertNotIn('class="todo-row ', html)
+
+        self.client.cookies[BOARD_VIEW_COOKIE] = 'list'
+        html = self._dashboard()
+        self.assertIn('id="list-rows"', html)
+        self.assertNotIn('id="todo-column"', html)
+
+    def test_kanban_columns(self):
+        Todo.objects.create(user=self.user, title='Revisando', status='review')
+        response = self.client.get(reverse('board_view', args=['kanban']))
+        html = response.content.decode()
+        for status, column_id, _ in BOARD_COLUMNS:
+            self.assertIn(f'id="{column_id}"', html)
+        self.assertIn('data-count-for="review-column">1<', html)
+        self.assertIn('data-count-for="done-column">0<', html)
+        self.assertIn('En Revisión', html)
+
+    def test_view_fragment(self):
+        self._dashboard()
+        response = self.client.get(reverse('board_view', args=['list']))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('id="list-rows"', response.content.decode())
+        self.assertIn('Primera', response.content.decode())
+        # The kanban fragment was cached by the dashboard
+        self.client.get(reverse('board_view', args=['kanban']))
+        self.assertEqual(fragment_stats.stats()['hits'], 1)
+
+        self.assertEqual(self.client.get(reverse('board_view', args=['calendar'])).status_code, 404)
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('board_view', args=['list'])).status_code, 302)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        caches['board'].clear()
+        self.user = User.objects.create_user(username='kate', password='secret-pass-123')
+        self.client.force_login(self.user)
+        self.category = Category.objects.create(name='Oficina', user=self.user)
+        self.todo = Todo.objects.create(user=self.user, title='Primera', category=self.category)
+
+    def _get(self, url, **headers):
+        return self.client.get(url, headers=headers)
+
+    def test_dashboard_not_modified(self):
+        first = self._get(reverse('dashboard'))
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('no-cache', first['Cache-Control'])
+        self.assertIn('private', first['Cache-Control'])
+
+        with mock.patch('app.views.board_context') as board_data:
+            second = self._get(reverse('dashboard'), if_none_match=first['ETag'])
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.templates, [])
+        board_data.assert_not_called()
+
+    def test_etag_depends_on_view(self):
+        etag = self._get(reverse('dashboard'))['ETag']
+        self.client.cookies[BOARD_VIEW_COOKIE] = 'list'
+        self.assertEqual(self._get(reverse('dashboard'), if_none_match=etag).status_code, 200)
+
+    def test_etag_changes_on_todo_delete(self):
+        etag = self._get(reverse('dashboard'))['ETag']
+        self.todo.delete()
+        self.assertTrue(Tombstone.objects.filter(user=self.user, model='todo').exists())
+        self.assertEqual(self._get(reverse('dashboard'), if_none_match=etag).status_code, 200)
+
+    def test_etag_changes_on_category_rename(self):
+        etag = self._get(reverse('dashboard'))['ETag']
+        self.category.name = 'Hogar'
+        self.category.save()
+        self.assertEqual(self._get(reverse('dashboard'), if_none_match=etag).status_code, 200)
+
+    def test_last_modified_moves_on_delete(self):
+        past = timezone.now() - timedelta(days=1)
+        Todo.objects.filter(user=self.user).update(updated_at=past)
+        Category.objects.filter(user=self.user).update(updated_at=past)
+        other = Todo.objects.create(user=self.user, title='Segunda')
+        Todo.objects.filter(id=other.id).update(updated_at=past)
+
+        last_modified = self._get(reverse('dashboard'))['Last-Modified']
+        self.assertEqual(
+            self._get(reverse('dashboard'), if_modified_since=last_modified).status_code, 304
+        )
+        other.delete()
+        self.assertEqual(
+            self._get(reverse('dashboard'), if_modified_since=last_modified).status_code, 200
+        )
+
+    def test_pruned_tombstones_keep_validators(self):
+        for title in ('Segunda', 'Tercera'):
+            todo = Todo.objects.create(user=self.user, title=title)
+            Note.objects.create(todo=todo, content=title)
+            todo.delete()
+        expired = timezone.now() - timedelta(days=settings.TOMBSTONE_RETENTION_DAYS + 1)
+        Tombstone.objects.filter(user=self.user).update(deleted_at=expired)
+        first = self._get(reverse('dashboard'))
+
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('2 lápidas purgadas', out.getvalue())
+        self.assertEqual(
+            sorted(Tombstone.objects.filter(user=self.user).values_list('model', flat=True)), ['note', 'todo']
+        )
+        self.assertEqual(self._get(reverse('dashboard'), if_none_match=first['ETag']).status_code, 304)
+        self.assertEqual(
+            self._get(reverse('dashboard'), if_modified_since=first['Last-Modified']).status_code, 304
+        )
+
+        self.todo.delete()
+        self.assertEqual(self._get(reverse('dashboard'), if_none_match=first['ETag']).status_code, 200)
+
+    def test_todo_detail_etag_tracks_notes(self):
+        url = reverse('todo_detail', args=[self.todo.id])
+        self._get(url)  # La primera respuesta fija la cookie CSRF, que entra en el ETag
+        etag = self._get(url)['ETag']
+        self.assertEqual(self._get(url, if_none_match=etag).status_code, 304)
+
+        note = Note.objects.create(todo=self.todo, content='Nota')
+        response = self._get(url, if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response['ETag']
+        note.delete()
+        self.assertEqual(self._get(url, if_none_match=etag).status_code, 200)
+
+    def test_todo_detail_of_other_user_is_404(self):
+        other = User.objects.create_user(username='leo', password='secret-pass-123')
+        todo = Todo.objects.create(user=other, title='Ajena')
+        self.assertEqual(self._get(reverse('todo_detail', args=[todo.id])).status_code, 404)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='mia', password='secret-pass-123')
+        self.client.force_login(self.user)
+        self.todo = Todo.objects.create(
+            user=self.user, title='Comprar leche', description='En el mercado del barrio',
+        )
+        self.other = Todo.objects.create(
+            user=self.user, title='Llamar al fontanero', description='Preguntar por la leche de la nevera',
+        )
+        self.note = Note.objects.create(todo=self.other, content='Dejó la factura de la canción <b>pendiente</b>')
+
+    def _search(self, q, **params):
+        response = self.client.get(reverse('search_todos'), {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_title_match_ranks_first(self):
+        results = self._search('leche')
+        self.assertEqual([r['todo_id'] for r in results], [self.todo.id, self.other.id])
+        self.assertEqual(results[0]['title_html'], 'Comprar <mark>leche</mark>')
+        self.assertIn('<mark>leche</mark>', results[1]['snippet_html'])
+        self.assertEqual(results[0]['url'], reverse('todo_detail', args=[self.todo.id]))
+
+    def test_notes_are_searchable_and_escaped(self):
+        results = self._search('factura')
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['type'], 'note')
+        self.assertEqual(results[0]['note_id'], self.note.id)
+        self.assertEqual(results[0]['title'], 'Llamar al fontanero')
+        self.assertIn('&lt;b&gt;pendiente&lt;/b&gt;', results[0]['snippet_html'])
+
+    def test_prefix_and_accents(self):
+        self.assertEqual(self._search('fonta'), [])
+        self.assertEqual(len(self._search('fonta*')), 1)
+        self.assertEqual(len(self._search('cancion')), 1)
+
+    def test_all_words_must_match(self):
+        self.assertEqual(len(self._search('leche mercado')), 1)
+        self.assertEqual(self._search('leche inexistente'), [])
+
+    def test_scoped_to_user(self):
+        stranger = User.objects.create_user(username='noa', password='secret-pass-123')
+        Todo.objects.create(user=stranger, title='Leche ajena')
+        self.assertEqual(len(self._search('leche')), 2)
+
+    def test_index_follows_updates_and_deletes(self):
+        self.todo.title = 'Comprar pan'
+        self.todo.save()
+        self.assertEqual([r['todo_id'] for r in self._search('pan')], [self.todo.id])
+        self.assertEqual([r['todo_id'] for r in self._search('leche')], [self.other.id])
+
+        self.other.delete()  # Borra también su nota
+        self.assertEqual(self._search('leche'), [])
+        self.assertEqual(self._search('factura'), [])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(self._search('"leche" OR NEAR('), [])
+        self.assertEqual(self._search('  '), [])
+
+    def test_single_query(self):
+        # session + user + search
+        with self.assertNumQueries(3):
+            self._search('leche')
+
+    def test_rebuild_command_indexes_bulk_rows(self):
+        Todo.objects.bulk_create([Todo(user=self.user, title=f'Importada {i}') for i in range(5)])
+        self.assertEqual(self._search('importada'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(self._search('importada')), 5)
+        self.assertEqual(len(self._search('leche')), 2)
+
+    def test_fallback_without_full_text_index(self):
+        Todo.objects.create(user=self.user, title='Leche sin descripción', description=None)
+        with mock.patch('app.search.get_backend', return_value=None):
+            results = self._search('leche')
+        self.assertEqual(len(results), 3)
+        self.assertIn('', [r['snippet_html'] for r in results])
+
+
+class BoardTransferTests(TestCase):
+    def setUp(self):
+        caches['board'].clear()
+        self.user = User.objects.create_user(username='olga', password='secret-pass-123')
+        self.client.force_login(self.user)
+        self.work = Category.objects.create(name='Trabajo', color='#FF0000', user=self.user)
+        self.home = Category.objects.create(name='Casa', user=self.user)
+        self.todos = []
+        for i in range(5):
+            todo = Todo.objects.create(
+                user=self.user, title=f'Tarea {i}', status='in_progress' if i % 2 else 'todo',
+                category=[self.work, self.home, None][i % 3], todo_order=i * 10,
+                latitude='40.416775' if i == 0 else None, longitude='-3.703790' if i == 0 else None,
+            )
+            Note.objects.create(todo=todo, content=f'Nota {i}, con "comillas"')
+            self.todos.append(todo)
+        self.target = User.objects.create_user(username='pablo', password='secret-pass-123')
+
+    def _export(self, fmt):
+        response = self.client.get(reverse('export_board'), {'format': fmt})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def _import(self, content, filename, user=None):
+        self.client.force_login(user or self.target)
+        return self.client.post(reverse('import_board'), {'file': SimpleUploadedFile(filename, content)})
+
+    def _assert_copied(self):
+        todos = Todo.objects.filter(user=self.target).select_related('category').order_by('todo_order')
+        self.assertEqual(
+            [(t.title, t.status, t.category.name if t.category else None) for t in todos],
+            [(t.title, t.status, t.category.name if t.category else None) for t in self.todos],
+        )
+        self.assertEqual(str(todos[0].latitude), '40.416775')
+        self.assertEqual(
+            [n.content for t in todos for n in t.notes.all()],
+            [f'Nota {i}, con "comillas"' for i in range(5)],
+        )
+        self.assertEqual(Category.objects.get(user=self.target, name='Trabajo').color, '#FF0000')
+
+    def test_jsonl_round_trip(self):
+        content = self._export('jsonl')
+        lines = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([line['type'] for line in lines[:2]], ['category', 'category'])
+        self.assertEqual(len(lines), 2 + 5 + 5)
+
+        response = self._import(content, 'tablero.jsonl')
+        self.assertEqual(response.json(), {
+            'success': True, 'imported': {'categories': 2, 'todos': 5, 'notes': 5},
+        })
+        self._assert_copied()
+
+    def test_csv_round_trip(self):
+        response = self._import(self._export('csv'), 'tablero.csv')
+        self.assertEqual(response.json()['imported'], {'categories': 2, 'todos': 5, 'notes': 5})
+        self._assert_copied()
+
+    def test_import_is_searchable_and_shown_on_board(self):
+        content = self._export('jsonl')
+        self.client.force_login(self.target)
+        self.client.get(reverse('dashboard'))
+        self._import(content, 'tablero.jsonl')
+        self.assertIn('Tarea 3', self.client.get(reverse('dashboard')).content.decode())
+        results = self.client.get(reverse('search_todos'), {'q': 'comillas'}).json()['results']
+        self.assertEqual(len(results), 5)
+
+    def test_existing_categories_are_reused(self):
+        Category.objects.create(name='Trabajo', user=self.target)
+        response = self._import(self._export('jsonl'), 'tablero.jsonl')
+        self.assertEqual(response.json()['imported']['categories'], 1)
+        self.assertEqual(Category.objects.filter(user=self.target).count(), 2)
+        self.assertEqual(Todo.objects.filter(user=self.target, category__name='Trabajo').count(), 2)
+
+    def test_invalid_row_imports_nothing(self):
+        content = self._export('jsonl') + b'{"type":"todo","title":"Mala","status":"perdida"}\n'
+        response = self._import(content, 'tablero.jsonl')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Línea 13', response.json()['error'])
+        self.assertFalse(Todo.objects.filter(user=self.target).exists())
+        self.assertFalse(Category.objects.filter(user=self.target).exists())
+
+    def test_unsupported_format(self):
+        self.assertEqual(self.client.get(reverse('export_board'), {'format': 'xml'}).status_code, 400)
+        self.assertEqual(self._import(b'', 'tablero.xml').status_code, 400)
+
+    def test_small_batches(self):
+        content = ''.join(
+            line for line in export_lines_chunked(self.user, chunk_size=2)
+        ).encode()
+        with transaction.atomic():
+            counts = import_rows(self.target, parse_jsonl(BytesIO(content)), batch_size=2)
+        self.assertEqual(counts, {'categories': 2, 'todos': 5, 'notes': 5})
+        self._assert_copied()
+
+    def test_export_queries_do_not_grow_per_row(self):
+        # categories + todos (one cursor) + notes per chunk of todos
+        with self.assertNumQueries(2 + 3):
+            list(export_rows(self.user, chunk_size=2))
+
+    def test_management_commands(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = f'{tmp}/tablero.csv'
+            call_command('export_board', 'olga', format='csv', output=path)
+            call_command('import_board', 'pablo', path, stdout=StringIO())
+        self._assert_copied()
+
+
+def export_lines_chunked(user, chunk_size):
+    for kind, row in export_rows(user, chunk_size=chunk_size):
+        yield json.dumps({'type': kind, **row}, cls=DjangoJSONEncoder) + '\n'
+
+
+class TodoCounterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='quim', password='secret-pass-123')
+        self.client.force_login(self.user)
+        self.todo = Todo.objects.create(user=self.user, title='Primera', priority='high')
+        Todo.objects.create(user=self.user, title='Segunda', status='review')
+
+    def _stats(self):
+        response = self.client.get(reverse('todo_stats'))
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def assertCountersMatch(self):
+        self.assertEqual(
+            dict(TodoCounter.objects.filter(user=self.user).exclude(value=0).values_list('key', 'value')),
+            {k: v for k, v in compute_counters(self.user.id).items() if v},
+        )
+
+    def test_create_and_delete(self):
+        stats = self._stats()
+        self.assertEqual(stats['total'], 2)
+        self.assertEqual(stats['by_status'], {'todo': 1, 'in_progress': 0, 'review': 1, 'done': 0})
+        self.assertEqual(stats['by_priority']['high'], 1)
+        self.assertEqual(stats['by_priority']['medium'], 1)
+
+        self.todo.delete()
+        stats = self._stats()
+        self.assertEqual(stats['total'], 1)
+        self.assertEqual(stats['by_priority']['high'], 0)
+        self.assertCountersMatch()
+
+    def test_status_change_through_board(self):
+        self.client.post(
+            reverse('update_todo_order'),
+            data=json.dumps({'todo_id': self.todo.id, 'status': 'done', 'order': 0}),
+            content_type='application/json',
+        )
+        self.assertEqual(self._stats()['by_status']['done'], 1)
+        self.assertCountersMatch()
+
+    def test_toggle_and_overdue(self):
+        self.todo.due_date = timezone.now() - timedelta(days=2)
+        self.todo.save()
+        stats = self._stats()
+        self.assertEqual(stats['overdue'], 1)
+        self.assertEqual(stats['completed'], 0)
+
+        self.client.post(reverse('toggle_todo', args=[self.todo.id]))
+        stats = self._stats()
+        self.assertEqual(stats['overdue'], 0)
+        self.assertEqual(stats['completed'], 1)
+        self.assertEqual(stats['completion_rate'], 0.5)
+        self.assertCountersMatch()
+
+    def test_due_today_is_not_overdue(self):
+        Todo.objects.create(user=self.user, title='Hoy', due_date=timezone.now())
+        stats = self._stats()
+        self.assertEqual(stats['due_today'], 1)
+        self.assertEqual(stats['overdue'], 0)
+
+    def test_save_with_deferred_fields(self):
+        todo = Todo.objects.only('id', 'title', 'user').get(id=self.todo.id)
+        todo.status = 'in_progress'
+        todo.save()
+        self.assertEqual(self._stats()['by_status']['in_progress'], 1)
+        self.assertCountersMatch()
+
+    def test_save_touches_counters_once(self):
+        todo = Todo.objects.get(id=self.todo.id)
+        todo.status = 'review'
+        with CaptureQueriesContext(connection) as ctx:
+            todo.save()
+        counter_queries = [q for q in ctx.captured_queries if 'app_todocounter' in q['sql']]
+        self.assertEqual(len(counter_queries), 1)
+        self.assertIn('UPDATE', counter_queries[0]['sql'])
+
+    def test_stats_read_only_counters(self):
+        # session + user + counters
+        with self.assertNumQueries(3):
+            self._stats()
+
+    def test_reconcile_repairs_drift(self):
+        Todo.objects.filter(id=self.todo.id).update(status='done', completed=True)
+        self.assertEqual(self._stats()['completed'], 0)
+
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('completed: 0 -> 1', out.getvalue())
+        self.assertEqual(self._stats()['completed'], 1)
+        self.assertCountersMatch()
+        self.assertEqual(reconcile(self.user.id), {})
+
+    def test_import_updates_counters(self):
+        rows = [
+            (1, {'type': 'todo', 'id': 1, 'title': 'Importada', 'status': 'done', 'completed': True}),
+            (2, {'type': 'todo', 'id': 2, 'title': 'Otra importada'}),
+        ]
+        import_rows(self.user, rows)
+        self.assertEqual(self._stats()['total'], 4)
+        self.assertCountersMatch()
+
+    def test_deleting_user(self):
+        self.user.delete()
+        self.assertFalse(TodoCounter.objects.exists())
+
+
+class GeohashTests(SimpleTestCase):
+    def test_encode(self):
+        self.assertEqual(encode_geohash(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertEqual(encode_geohash(-25.382708, -49.265506, 8), '6gkzwgjz')
+
+    def test_cover_contains_box_corners(self):
+        box = (40.40, -3.72, 40.43, -3.68)
+        cells = covering_cells(box)
+        self.assertLessEqual(len(cells), 16)
+        for lat, lon in [(40.40, -3.72), (40.43, -3.68), (40.40, -3.68), (40.43, -3.72), (40.415, -3.7)]:
+            self.assertTrue(any(encode_geohash(lat, lon).startswith(cell) for cell in cells))
+
+    def test_boxes_split_at_antimeridian(self):
+        boxes = bounding_boxes(-17.7, 179.95, 20)
+        self.assertEqual(len(boxes), 2)
+        self.assertEqual(boxes[0][3], 180.0)
+        self.assertEqual(boxes[1][1], -180.0)
+
+    def test_boxes_over_pole(self):
+        self.assertEqual(bounding_boxes(89.9, 10, 50)[0][1:4:2], (-180.0, 180.0))
+
+
+class NearbyTodosTests(TestCase):
+    PLACES = {
+        'Sol': (40.416775, -3.703790),
+        'Retiro': (40.415260, -3.684440),
+        'Atocha': (40.406950, -3.691170),
+        'Barcelona': (41.387400, 2.168600),
+        'Suva': (-18.124100, 178.450100),
+        'Taveuni': (-16.850000, -179.950000),
+    }
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='rita', password='secret-pass-123')
+        self.client.force_login(self.user)
+        for title, (lat, lon) in self.PLACES.items():
+            Todo.objects.create(user=self.user, title=title, latitude=lat, longitude=lon)
+        Todo.objects.create(user=self.user, title='Sin ubicación')
+        stranger = User.objects.create_user(username='saul', password='secret-pass-123')
+        Todo.objects.create(user=stranger, title='Ajena', latitude=40.4168, longitude=-3.7038)
+
+    def _nearby(self, **params):
+        response = self.client.get(reverse('nearby_todos'), params)
+        self.assertEqual(response.status_code, 200)
+        return [(r['title'], r['distance_km']) for r in response.json()['results']]
+
+    def test_geohash_follows_coordinates(self):
+        todo = Todo.objects.get(title='Sol')
+        self.assertEqual(todo.geohash, encode_geohash(40.416775, -3.703790))
+        todo.latitude = todo.longitude = None
+        todo.save()
+        self.assertIsNone(Todo.objects.get(id=todo.id).geohash)
+
+    def test_radius(self):
+        results = self._nearby(lat=40.4168, lon=-3.7038, radius=2)
+        self.assertEqual([title for title, _ in results], ['Sol', 'Atocha', 'Retiro'])
+        self.assertLess(results[0][1], 0.01)
+        self.assertAlmostEqual(results[2][1], 1.65, delta=0.01)
+
+    def test_k_nearest_expands_search(self):
+        results = self._nearby(lat=40.4168, lon=-3.7038, k=4)
+        self.assertEqual([title for title, _ in results], ['Sol', 'Atocha', 'Retiro', 'Barcelona'])
+        self.assertAlmostEqual(results[3][1], 505, delta=5)
+
+    def test_across_antimeridian(self):
+        results = self._nearby(lat=-17.0, lon=179.9, radius=300)
+        self.assertEqual([title for title, _ in results], ['Taveuni', 'Suva'])
+
+    def test_invalid_parameters(self):
+        for params in ({}, {'lat': 'x', 'lon': 1}, {'lat': 91, 'lon': 0}, {'lat': 0, 'lon': 0, 'radius': -1}):
+            response = self.client.get(reverse('nearby_todos'), params)
+            self.assertEqual(response.status_code, 400)
+
+    def test_candidates_come_from_geohash_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Query plan check for SQLite')
+        with CaptureQueriesContext(connection) as ctx:
+            self._nearby(lat=40.4168, lon=-3.7038, radius=2)
+        sql = next(q['sql'] for q in ctx.captured_queries if 'geohash' in q['sql'])
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertIn('todo_user_geohash_idx', plan)
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        caches['board'].clear()
+        metrics.reset()
+        self.user = User.objects.create_user(username='tere', password='secret-pass-123')
+        self.client.force_login(self.user)
+        self.todo = Todo.objects.create(user=self.user, title='Medida')
+
+    def _sample(self, name, **labels):
+        wanted = name + metrics._format_labels(list(labels.items()))
+        for line in metrics.render_text().splitlines():
+            if line.startswith(wanted + ' '):
+                return float(line.rsplit(' ', 1)[1])
+        return None
+
+    def test_records_view_sql_and_templates(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('dashboard'))
+        self.assertEqual(self._sample('todo_request_duration_seconds_count', view='dashboard'), 1)
+        self.assertEqual(self._sample('todo_request_sql_queries_sum', view='dashboard'), len(ctx.captured_queries))
+        self.assertGreater(self._sample('todo_request_sql_duration_seconds_sum', view='dashboard'), 0)
+        self.assertGreater(self._sample('todo_request_template_duration_seconds_sum', view='dashboard'), 0)
+        self.assertEqual(self._sample('todo_request_http_duration_seconds_sum', view='dashboard'), 0)
+        self.assertEqual(self._sample('todo_responses_total', view='dashboard', status=200), 1)
+
+    def test_async_view_queries_are_counted(self):
+        self.client.post(
+            reverse('update_todo_order'),
+            data=json.dumps({'todo_id': self.todo.id, 'status': 'done', 'order': 0}),
+            content_type='application/json',
+        )
+        self.assertGreater(self._sample('todo_request_sql_queries_sum', view='update_todo_order'), 0)
+        self.assertEqual(self._sample('todo_request_template_duration_seconds_sum', view='update_todo_order'), 0)
+
+    def test_cache_lookups_are_exported(self):
+        self.client.get(reverse('dashboard'))
+        self.client.get(reverse('dashboard'))
+        self.assertEqual(self._sample('todo_cache_lookups_total', cache='board_fragment', result='miss'), 1)
+        self.assertEqual(self._sample('todo_cache_lookups_total', cache='board_fragment', result='hit'), 1)
+
+        caches[settings.LOCATIONIQ_CACHE_ALIAS].clear()
+        cache = GeocodingCache()
+        cache.get(40.1, -3.1)
+        cache.set(40.1, -3.1, None)
+        cache.get(40.1, -3.1)
+        self.assertEqual(self._sample('todo_cache_lookups_total', cache='geocoding', result='miss'), 1)
+        self.assertEqual(self._sample('todo_cache_lookups_total', cache='geocoding', result='local_hit'), 1)
+        self.assertEqual(self._sample('todo_geocoding_negative_hits_total'), 1)
+        self.assertIn('# TYPE todo_cache_lookups_total counter', metrics.render_text())
+
+    def test_only_app_views_are_recorded(self):
+        self.client.get(reverse('landing_page'))
+        self.assertNotIn('landing_page', metrics.render_text())
+
+    def test_histogram_buckets_are_cumulative(self):
+        metrics.REQUEST_SQL_QUERIES.observe(3, 'x')
+        metrics.REQUEST_SQL_QUERIES.observe(30, 'x')
+        metrics.REQUEST_SQL_QUERIES.observe(300, 'x')
+        self.assertEqual(self._sample('todo_request_sql_queries_bucket', view='x', le='2'), 0)
+        self.assertEqual(self._sample('todo_request_sql_queries_bucket', view='x', le='3'), 1)
+        self.assertEqual(self._sample('todo_request_sql_queries_bucket', view='x', le='50'), 2)
+        self.assertEqual(self._sample('todo_request_sql_queries_bucket', view='x', le='+Inf'), 3)
+        self.assertEqual(self._sample('todo_request_sql_queries_sum', view='x'), 333)
+
+    @override_settings(LOCATIONIQ_API_KEY='test-key', LOCATIONIQ_CACHE_TTL=0)
+    def test_locationiq_time_is_recorded(self):
+        request_metrics, token = metrics.start_request()
+        with FakeLocationIQServer([(200, 0.05)]) as server, override_settings(LOCATIONIQ_BASE_URL=server.base_url):
+            LocationIQService(cache=GeocodingCache(), breaker=CircuitBreaker()).get_address_from_coordinates(1, 1)
+        metrics.finish_request(token, request_metrics, 'geocode', 200, 0.1)
+        self.assertGreaterEqual(self._sample('todo_request_http_duration_seconds_sum', view='geocode'), 0.05)
+
+    def test_endpoint_requires_token_or_debug(self):
+        self.client.get(reverse('dashboard'))
+        with override_settings(METRICS_TOKEN='s3cret'):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+            response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer s3cret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn(b'# TYPE todo_request_duration_seconds histogram', response.content)
+        self.assertIn(b'todo_request_duration_seconds_count{view="dashboard"} 1', response.content)
+        with override_settings(METRICS_TOKEN='', DEBUG=False):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+
+
+class BenchmarkTests(TestCase):
+    def test_seed_keeps_derived_data_consistent(self):
+        counts = seed(2, 30, 2, 3, prefix='carga', located=1.0)
+        self.assertEqual(counts, {'users': 2, 'categories': 6, 'todos': 60, 'notes': 120})
+        user = User.objects.get(username='carga-1')
+        self.assertTrue(user.check_password('bench-pass-123'))
+        self.assertEqual(Todo.objects.filter(user=user).count(), 30)
+        self.assertFalse(Todo.objects.filter(user=user, geohash__isnull=True).exists())
+        self.assertEqual(reconcile(user.id), {})
+        word = Todo.objects.filter(user=user).first().title.split()[0].lower()
+        self.client.force_login(user)
+        self.assertTrue(self.client.get(reverse('search_todos'), {'q': word}).json()['results'])
+
+        seed(1, 1, 0, 0, prefix='carga')
+        self.assertTrue(User.objects.filter(username='carga-2').exists())
+
+    def test_run_reports_each_view(self):
+        seed(2, 20, 1, 2)
+        before = Todo.objects.count()
+        results = run_benchmark(User.objects.all(), requests=4, warmup=1)
+        self.assertEqual(
+            set(results['views']),
+            {'dashboard', 'todo_detail', 'add_todo', 'update_todo_order', 'list', 'board_list'},
+        )
+        for view in results['views'].values():
+            self.assertEqual((view['requests'], view['errors']), (4, 0))
+            self.assertLessEqual(view['latency_ms']['p50'], view['latency_ms']['p99'])
+            self.assertGreater(view['queries']['mean'], 0)
+        self.assertEqual(Todo.objects.count(), before)
+
+    def test_template_render_sizes(self):
+        seed(1, 40, 0, 2)
+        user = User.objects.get(username='bench-0')
+        result = measure_templates(user, repeat=2)
+        self.assertEqual(result['todos'], 40)
+        self.assertEqual(set(result['views']), {'kanban', 'list'})
+        for view in result['views'].values():
+            self.assertGreater(view['bytes'], 40 * 100)
+            self.assertLessEqual(view['render_ms']['min'], view['render_ms']['max'])
+
+        out = StringIO()
+        call_command('benchmark_templates', '--repeat', '1', stdout=out)
+        self.assertIn('bench-0', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('benchmark_templates', '--prefix', 'nadie', stdout=StringIO())
+
+    def test_regressions_against_baseline(self):
+        def result(p95, queries, errors=0):
+            return {'views': {'dashboard': {
+                'errors': errors, 'latency_ms': {'p95': p95}, 'queries': {'mean': queries},
+            }}}
+
+        baseline = result(10.0, 3)
+        self.assertEqual(find_regressions(result(12.0, 3.2), baseline), [])
+        self.assertEqual(len(find_regressions(result(13.0, 3), baseline)), 1)
+        self.assertEqual(len(find_regressions(result(10.0, 4), baseline)), 1)
+        self.assertEqual(len(find_regressions(result(10.0, 3, errors=1), baseline)), 1)
+
+    def test_command_saves_json_and_fails_on_regression(self):
+        seed(1, 10, 0, 1)
+        with tempfile.TemporaryDirectory() as tmp:
+            output = f'{tmp}/bench.json'
+            call_command('benchmark', '--requests', '2', '--warmup', '0', '--views', 'list', '-o', output,
+                         stdout=StringIO())
+            with open(output) as f:
+                saved = json.load(f)
+            self.assertEqual(list(saved['views']), ['list'])
+
+            saved['views']['list']['latency_ms']['p95'] = 0.0001
+            with open(output, 'w') as f:
+                json.dump(saved, f)
+            with self.assertRaisesMessage(CommandError, 'list: p95'):
+                call_command('benchmark', '--requests', '2', '--views', 'list', '--baseline', output,
+                             stdout=StringIO())
+
+
+class DatabaseConfigTests(SimpleTestCase):
+    databases = {'default'}
+
+    def test_sqlite_without_database_url(self):
+        config = database_from_env({}, '/tmp/app.sqlite3')
+        self.assertEqual(config['ENGINE'], 'django.db.backends.sqlite3')
+        self.assertEqual(config['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+        for pragma in ('journal_mode=WAL', 'synchronous=NORMAL', 'mmap_size=', 'cache_size=', 'busy_timeout=5000'):
+            self.assertIn(f'PRAGMA {pragma}', config['OPTIONS']['init_command'])
+
+    def test_pragmas_are_applied_to_connections(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+
+    @skipUnless(importlib.util.find_spec('dj_database_url'), 'dj-database-url no instalado')
+    def test_database_url_uses_persistent_connections(self):
+        config = database_from_env({'DATABASE_URL': 'postgres://u:p@db:5432/todo'}, None)
+        self.assertEqual(config['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual(config['CONN_MAX_AGE'], 600)
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+
+    @skipUnless(importlib.util.find_spec('dj_database_url'), 'dj-database-url no instalado')
+    def test_pool_disables_persistent_connections(self):
+        environ = {'DATABASE_URL': 'postgres://u:p@db:5432/todo', 'DB_POOL_MAX_SIZE': '10'}
+        if importlib.util.find_spec('psycopg_pool') is None:
+            with self.assertRaises(ImproperlyConfigured):
+                database_from_env(environ, None)
+            return
+        config = database_from_env(environ, None)
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        self.assertEqual(config['OPTIONS']['pool']['max_size'], 10)
+
+
+CACHED_AUTH = {
+    'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db',
+    'AUTHENTICATION_BACKENDS': ['app.auth.CachedModelBackend'],
+    'AUTH_USER_CACHE_TTL': 300,
+}
+
+
+class CachedAuthTests(TestCase):
+    def setUp(self):
+        caches['auth'].clear()
+        caches['board'].clear()
+        self.user = User.objects.create_user(username='ursula', password='secret-pass-123')
+        self.todo = Todo.objects.create(user=self.user, title='Sesión')
+
+    def _client(self):
+        client = Client()
+        self.assertTrue(client.login(username='ursula', password='secret-pass-123'))
+        client.get(reverse('dashboard'))  # Calienta fragmentos, sesión y usuario
+        return client
+
+    def _auth_queries(self, client, *args, **kwargs):
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(*args, **kwargs)
+        # Cargar el usuario es la única consulta que lee la contraseña (el
+        # ETag del tablero también consulta auth_user, pero solo agregados)
+        auth = [
+            q['sql'] for q in ctx.captured_queries
+            if '"django_session"' in q['sql'] or '"auth_user"."password"' in q['sql']
+        ]
+        return response, len(ctx.captured_queries), auth
+
+    def test_query_count_by_mode(self):
+        counts = {}
+        for mode, overrides in (
+            ('db', {}),
+            ('cached_db', CACHED_AUTH),
+            ('signed_cookies', {**CACHED_AUTH, 'SESSION_ENGINE': 'django.contrib.sessions.backends.signed_cookies'}),
+        ):
+            with self.subTest(mode=mode), override_settings(**overrides):
+                response, counts[mode], auth = self._auth_queries(self._client(), reverse('dashboard'))
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(auth), 2 if mode == 'db' else 0)
+        self.assertEqual(counts['cached_db'], counts['db'] - 2)
+        self.assertEqual(counts['signed_cookies'], counts['db'] - 2)
+
+    @override_settings(**CACHED_AUTH)
+    def test_async_view_uses_cached_user(self):
+        client = self._client()
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.post(
+                reverse('update_todo_order'),
+                data=json.dumps({'todo_id': self.todo.id, 'status': 'done', 'order': 0}),
+                content_type='application/json',
+            )
+        self.assertTrue(response.json()['success'])
+        self.assertFalse([q for q in ctx.captured_queries if '"auth_user"."password"' in q['sql']])
+
+    @override_settings(**CACHED_AUTH)
+    def test_logout_ends_session(self):
+        client = self._client()
+        client.post(reverse('logout'))
+        self.assertIsNone(caches['auth'].get(f'auth:user:{self.user.id}'))
+        response = client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('login'), response['Location'])
+
+    @override_settings(**CACHED_AUTH)
+    def test_password_change_invalidates_other_sessions(self):
+        other = self._client()
+        self.user.set_password('new-secret-pass-456')
+        self.user.save()
+        self.assertEqual(other.get(reverse('dashboard')).status_code, 302)
+
+    @override_settings(**CACHED_AUTH)
+    def test_deactivated_user_is_logged_out(self):
+        client = self._client()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(client.get(reverse('dashboard')).status_code, 302)
+
+    def test_cached_modes_require_shared_cache(self):
+        check_shared_cache()  # SESSION_MODE=db
+        with override_settings(**CACHED_AUTH), self.assertRaises(ImproperlyConfigured):
+            check_shared_cache()
+        shared = {**settings.CACHES, 'auth': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': tempfile.gettempdir(),
+        }}
+        with override_settings(**CACHED_AUTH, CACHES=shared):
+            check_shared_cache()
+
+
+class StaticAssetsTests(TestCase):
+    def setUp(self):
+        caches['board'].clear()
+        self.user = User.objects.create_user(username='sofia', password='secret-pass-123')
+        self.todo = Todo.objects.create(user=self.user, title='Estáticos')
+        self.client.force_login(self.user)
+
+    def test_pages_load_scripts_instead_of_inlining_them(self):
+        dashboard = self.client.get(reverse('dashboard')).content.decode()
+        self.assertIn('app/js/board.js', dashboard)
+        self.assertIn(f'data-reorder-url="{reverse("reorder_column")}"', dashboard)
+        self.assertNotIn('function reorderColumn', dashboard)
+
+        detail = self.client.get(reverse('todo_detail', args=[self.todo.id])).content.decode()
+        self.assertIn('app/js/todo_detail.js', detail)
+        self.assertIn(f'data-todo-id="{self.todo.id}"', detail)
+        self.assertNotIn('function getCookie', detail)
+
+    def test_collectstatic_serves_hashed_precompressed_files(self):
+        with tempfile.TemporaryDirectory() as static_root, override_settings(
+            STATIC_ROOT=static_root,
+            STORAGES={**settings.STORAGES, 'staticfiles': {
+                'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+            }},
+        ):
+            call_command('collectstatic', interactive=False, verbosity=0, ignore_patterns=['admin'])
+            client = Client()
+            client.force_login(self.user)
+            page = client.get(reverse('dashboard')).content.decode()
+            url = next(
+                part.split('"')[1] for part in page.split('<script')
+                if 'app/js/board.' in part
+            )
+            self.assertRegex(url, r'^/static/app/js/board\.[0-9a-f]{12}\.js$')
+
+            response = client.get(url, HTTP_ACCEPT_ENCODING='br, gzip')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Encoding'], 'br')
+            self.assertIn('immutable', response['Cache-Control'])
+            response.close()
+            response = client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            response.close()
+
+
+class BoardChangesTests(TestCase):
+    def setUp(self):
+        caches['board'].clear()
+        self.user = User.objects.create_user(username='carla', password='secret-pass-123')
+        self.category = Category.objects.create(name='Casa', user=self.user)
+        self.todo = Todo.objects.create(user=self.user, title='Barrer', category=self.category)
+        self.other = Todo.objects.create(user=self.user, title='Fregar')
+        self.client.force_login(self.user)
+
+    def _changes(self, since, **params):
+        response = self.client.get(reverse('board_changes'), {'since': encode_cursor(since), **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_returns_only_changes_since_cursor(self):
+        since = timezone.now()
+        self.todo.status = 'done'
+        self.todo.save()
+        other_id = self.other.id
+        self.other.delete()
+        note = Note.objects.create(todo=self.todo, content='Con lejía')
+
+        data = self._changes(since)
+        self.assertFalse(data['reset'])
+        self.assertEqual([todo['id'] for todo in data['todos']], [self.todo.id])
+        self.assertEqual(data['todos'][0]['status'], 'done')
+        self.assertNotIn('html', data['todos'][0])
+        self.assertEqual(data['deleted']['todo'], [other_id])
+        self.assertEqual([n['id'] for n in data['notes']], [note.id])
+        self.assertEqual(data['categories'], [])
+        self.assertLess(decode_cursor(data['cursor']), timezone.now())
+
+    def test_reorder_shows_up_as_change(self):
+        since = timezone.now()
+        self.client.post(
+            reverse('reorder_column'),
+            data=json.dumps({'status': 'review', 'order': [self.other.id]}),
+            content_type='application/json',
+        )
+        data = self._changes(since, render='board')
+        self.assertEqual([todo['id'] for todo in data['todos']], [self.other.id])
+        html = data['todos'][0]['html']
+        self.assertIn(f'data-id="{self.other.id}"', html['card'])
+        self.assertIn(f'data-row-id="{self.other.id}"', html['row'])
+
+    def test_category_changes_include_their_todos(self):
+        since = timezone.now()
+        self.category.name = 'Hogar'
+        self.category.save()
+        data = self._changes(since, render='board')
+        self.assertEqual([c['name'] for c in data['categories']], ['Hogar'])
+        self.assertEqual([todo['id'] for todo in data['todos']], [self.todo.id])
+        self.assertIn('Hogar', data['todos'][0]['html']['card'])
+
+        since = timezone.now()
+        category_id = self.category.id
+        self.category.delete()
+        data = self._changes(since)
+        self.assertEqual(data['deleted']['category'], [category_id])
+        self.assertEqual([(t['id'], t['category_id']) for t in data['todos']], [(self.todo.id, None)])
+
+    def test_detail_location_partial(self):
+        since = timezone.now()
+        Todo.objects.filter(id=self.todo.id).update(
+            latitude='40.416800', longitude='-3.703800', address='Puerta del Sol', updated_at=timezone.now(),
+        )
+        data = self._changes(since, render='detail')
+        self.assertIn('Puerta del Sol', data['todos'][0]['html']['location'])
+        self.assertEqual(data['todos'][0]['latitude'], 40.4168)
+
+    def test_too_many_changes_ask_for_reload(self):
+        since = timezone.now()
+        self.todo.save()
+        self.other.save()
+        with mock.patch('app.changes.CHANGES_MAX_ROWS', 1):
+            data = self._changes(since)
+        self.assertTrue(data['reset'])
+        self.assertEqual(data['todos'], [])
+
+    def test_cursor_older_than_tombstone_retention_asks_for_reload(self):
+        since = timezone.now() - timedelta(days=settings.TOMBSTONE_RETENTION_DAYS + 1)
+        self.assertTrue(self._changes(since)['reset'])
+
+    def test_other_users_changes_are_hidden(self):
+        since = timezone.now()
+        stranger = User.objects.create_user(username='mallory', password='secret-pass-123')
+        Todo.objects.create(user=stranger, title='Ajena')
+        data = self._changes(since)
+        self.assertEqual(data['todos'], [])
+
+    def test_invalid_cursor(self):
+        for since in ('', 'no-es-un-cursor', encode_cursor(timezone.now().replace(tzinfo=None))):
+            response = self.client.get(reverse('board_changes'), {'since': since})
+            self.assertEqual(response.status_code, 400)
+
+    def test_pages_carry_initial_cursor(self):
+        before = timezone.now()
+        for url in (reverse('dashboard'), reverse('todo_detail', args=[self.todo.id])):
+            page = self.client.get(url).content.decode()
+            cursor = page.split('data-changes-cursor="')[1].split('"')[0]
+            self.assertLess(decode_cursor(cursor), before)
+
+
+@mock.patch('app.live.close_old_connections', lambda: None)  # Cerraría la transacción del test
+class LiveBoardTests(TestCase):
+    def setUp(self):
+        caches['board'].clear()
+        live.reset()
+        self.addCleanup(live.reset)
+        self.user = User.objects.create_user(username='dora', password='secret-pass-123')
+        self.todo = Todo.objects.create(user=self.user, title='Planchar')
+        self.client.force_login(self.user)
+
+    def _scope(self, logged_in=True):
+        headers = [(b'host', b'testserver')]
+        if logged_in:
+            session = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+            headers.append((b'cookie', f'{settings.SESSION_COOKIE_NAME}={session}'.encode()))
+        return {'type': 'http', 'method': 'GET', 'path': reverse('board_events'), 'headers': headers}
+
+    async def _open(self, logged_in=True):
+        sent = asyncio.Queue()
+        disconnected = asyncio.Event()
+
+        async def receive():
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        task = asyncio.ensure_future(asgi_application(self._scope(logged_in), receive, sent.put))
+        start = await asyncio.wait_for(sent.get(), 2)
+        return task, sent, disconnected, start
+
+    async def _next_chunk(self, sent):
+        return (await asyncio.wait_for(sent.get(), 2))['body']
+
+    def _complete_todo(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.todo.completed = True
+            self.todo.save()
+
+    async def test_requires_login(self):
+        task, sent, _, start = await self._open(logged_in=False)
+        await task
+        self.assertEqual(start['status'], 401)
+
+    async def test_pushes_own_changes_only(self):
+        task, sent, disconnected, start = await self._open()
+        self.assertEqual(start['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream'), start['headers'])
+        self.assertTrue((await self._next_chunk(sent)).startswith(b'retry:'))
+
+        stranger = await User.objects.acreate_user(username='mallory', password='secret-pass-123')
+        live.get_broker().publish(stranger.id)
+        await sync_to_async(self._complete_todo)()
+        self.assertEqual(await self._next_chunk(sent), b'event: changed\ndata: {}\n\n')
+        self.assertTrue(sent.empty())
+
+        disconnected.set()
+        await task
+        self.assertEqual(live.get_broker().subscriber_count(), 0)
+
+    @override_settings(LIVE_HEARTBEAT=0.05, LIVE_STREAM_MAX_AGE=0.3)
+    async def test_heartbeat_and_max_age(self):
+        task, sent, _, start = await self._open()
+        await asyncio.wait_for(task, 2)
+        chunks = []
+        while not sent.empty():
+            chunks.append(sent.get_nowait())
+        self.assertIn(b': ping\n\n', [chunk['body'] for chunk in chunks])
+        self.assertFalse(chunks[-1].get('more_body'))
+        self.assertEqual(live.get_broker().subscriber_count(), 0)
+
+    @override_settings(LIVE_MAX_CONNECTIONS=1)
+    async def test_connection_limit(self):
+        task, _, disconnected, _ = await self._open()
+        second, _, _, start = await self._open()
+        await second
+        self.assertEqual(start['status'], 503)
+        self.assertIn((b'retry-after', b'30'), start['headers'])
+        disconnected.set()
+        await task
+
+    async def test_cache_broker_sees_other_processes(self):
+        broker = live.CacheBroker(max_subscribers=10, poll_interval=60)
+        subscription = broker.subscribe(self.user.id)
+        await broker.poll_once()
+        self.assertFalse(await subscription.wait(0.01))
+
+        # Otro proceso invalida el tablero en la caché compartida
+        bump_version(self.user.id)
+        await broker.poll_once()
+        self.assertTrue(await subscription.wait(1))
+        get_version(self.user.id)
+        await broker.poll_once()
+        self.assertFalse(await subscription.wait(0.01))
+        bump_version(self.user.id)
+        await broker.poll_once()
+        self.assertTrue(await subscription.wait(1))
+        broker.unsubscribe(subscription)
+
+    def test_wsgi_fallback_stops_event_source(self):
+        response = self.client.get(reverse('board_events'))
+        self.assertEqual(response.status_code, 204)
+        page = self.client.get(reverse('dashboard')).content.decode()
+        self.assertIn(f'data-events-url="{reverse("board_events")}"', page)
+
+
+class SyncBoardTests(TestCase):
+    def setUp(self):
+        caches['board'].clear()
+        self.user = User.objects.create_user(username='elena', password='secret-pass-123')
+        self.category = Category.objects.create(name='Casa', user=self.user)
+        self.todo = Todo.objects.create(user=self.user, title='Barrer', category=self.category)
+        self.note = Note.objects.create(todo=self.todo, content='Con escoba')
+        self.client.force_login(self.user)
+
+    def _sync(self, mutations, key='lote-1', since=None, status=200):
+        body = {'mutations': mutations}
+        if since is not None:
+            body['since'] = encode_cursor(since)
+        response = self.client.post(
+            reverse('sync_board'), data=json.dumps(body), content_type='application/json',
+            headers={'Idempotency-Key': key},
+        )
+        self.assertEqual(response.status_code, status, response.content)
+        return response.json()
+
+    def assertCountersMatch(self):
+        self.assertEqual(
+            dict(TodoCounter.objects.filter(user=self.user).exclude(value=0).values_list('key', 'value')),
+            {k: v for k, v in compute_counters(self.user.id).items() if v},
+        )
+
+    def test_creates_with_client_ids(self):
+        since = timezone.now()
+        data = self._sync([
+            {'op': 'create', 'type': 'category', 'client_id': 'c1', 'fields': {'name': 'Jardín'}},
+            {'op': 'create', 'type': 'todo', 'client_id': 't1',
+             'fields': {'title': 'Regar plantas', 'category': 'c1', 'priority': 'high'}},
+            {'op': 'create', 'type': 'note', 'client_id': 'n1', 'fields': {'todo': 't1', 'content': 'Por la tarde'}},
+            {'op': 'update', 'type': 'todo', 'id': 't1', 'fields': {'status': 'done', 'completed': True}},
+        ], since=since)
+
+        self.assertFalse(data['replayed'])
+        self.assertEqual([r['status'] for r in data['results']], ['ok'] * 4)
+        todo = Todo.objects.get(id=data['ids']['todo']['t1'])
+        self.assertEqual((todo.category_id, todo.status, todo.completed), (data['ids']['category']['c1'], 'done', True))
+        self.assertEqual(todo.notes.get().id, data['ids']['note']['n1'])
+        self.assertEqual([t['id'] for t in data['changes']['todos']], [todo.id])
+        self.assertLess(decode_cursor(data['cursor']), timezone.now())
+        self.assertCountersMatch()
+        results = self.client.get(reverse('search_todos'), {'q': 'regar'}).json()['results']
+        self.assertEqual([r['todo_id'] for r in results], [todo.id])
+        self.assertEqual(self.client.get(reverse('todo_stats')).json()['completed'], 1)
+
+    def test_updates_and_deletes(self):
+        other = Todo.objects.create(user=self.user, title='Fregar', due_date=timezone.now() - timedelta(days=1))
+        since = timezone.now()
+        data = self._sync([
+            {'op': 'update', 'type': 'todo', 'id': other.id, 'fields': {'completed': True, 'category': self.category.id}},
+            {'op': 'update', 'type': 'category', 'id': self.category.id, 'fields': {'color': '#FF0000'}},
+            {'op': 'update', 'type': 'note', 'id': self.note.id, 'fields': {'content': 'Con fregona'}},
+            {'op': 'delete', 'type': 'todo', 'id': self.todo.id},
+        ], since=since)
+
+        self.assertEqual([r['status'] for r in data['results']], ['ok'] * 4)
+        other.refresh_from_db()
+        self.assertEqual((other.completed, other.category_id), (True, self.category.id))
+        self.assertFalse(Todo.objects.filter(id=self.todo.id).exists())
+        self.assertFalse(Note.objects.filter(id=self.note.id).exists())
+        self.assertEqual(data['changes']['deleted']['todo'], [self.todo.id])
+        self.assertEqual(data['changes']['deleted']['note'], [self.note.id])
+        self.assertEqual([c['color'] for c in data['changes']['categories']], ['#FF0000'])
+        self.assertCountersMatch()
+        self.assertEqual(self.client.get(reverse('todo_stats')).json()['overdue'], 0)
+        self.assertEqual(self.client.get(reverse('search_todos'), {'q': 'barrer'}).json()['results'], [])
+
+    def test_stale_targets_are_skipped(self):
+        stranger = User.objects.create_user(username='mallory', password='secret-pass-123')
+        foreign = Todo.objects.create(user=stranger, title='Ajena')
+        data = self._sync([
+            {'op': 'update', 'type': 'todo', 'id': foreign.id, 'fields': {'title': 'Mía'}},
+            {'op': 'delete', 'type': 'todo', 'id': 999999},
+            {'op': 'create', 'type': 'note', 'client_id': 'n1', 'fields': {'todo': foreign.id, 'content': 'Hola'}},
+            {'op': 'update', 'type': 'todo', 'id': self.todo.id, 'fields': {'title': 'Barrer bien'}},
+        ])
+        self.assertEqual([r['status'] for r in data['results']], ['missing', 'missing', 'missing', 'ok'])
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.title, 'Ajena')
+        self.assertFalse(foreign.notes.exists())
+        self.todo.refresh_from_db()
+        self.assertEqual(self.todo.title, 'Barrer bien')
+
+    def test_invalid_mutation_rolls_back_batch(self):
+        data = self._sync([
+            {'op': 'create', 'type': 'todo', 'client_id': 't1', 'fields': {'title': 'Válida'}},
+            {'op': 'update', 'type': 'todo', 'id': self.todo.id, 'fields': {'status': 'archivada'}},
+        ], status=400)
+        self.assertEqual(data['mutation'], 1)
+        self.assertFalse(Todo.objects.filter(title='Válida').exists())
+        self.assertFalse(SyncBatch.objects.exists())
+
+        for mutation in (
+            {'op': 'create', 'type': 'todo', 'client_id': 't1', 'fields': {'description': 'Sin título'}},
+            {'op': 'create', 'type': 'todo', 'fields': {'title': 'Sin client_id'}},
+            {'op': 'update', 'type': 'todo', 'id': self.todo.id, 'fields': {'user': 1}},
+            {'op': 'move', 'type': 'todo', 'id': self.todo.id},
+        ):
+            self._sync([mutation], key=str(mutation), status=400)
+
+    def test_retry_with_same_key_is_not_applied_twice(self):
+        mutations = [{'op': 'create', 'type': 'todo', 'client_id': 't1', 'fields': {'title': 'Una vez'}}]
+        first = self._sync(mutations)
+        with CaptureQueriesContext(connection) as ctx:
+            retry = self._sync(mutations)
+        self.assertTrue(retry['replayed'])
+        self.assertEqual(retry['ids'], first['ids'])
+        self.assertEqual(Todo.objects.filter(title='Una vez').count(), 1)
+        self.assertFalse([q for q in ctx.captured_queries if q['sql'].startswith('INSERT')])
+
+        self._sync([{**mutations[0], 'fields': {'title': 'Otra cosa'}}], status=422)
+        response = self.client.post(reverse('sync_board'), data='{}', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_size_does_not_change_query_count(self):
+        def queries(count, key):
+            mutations = [
+                {'op': 'create', 'type': 'todo', 'client_id': f't{i}', 'fields': {'title': f'Tarea {i}'}}
+                for i in range(count)
+            ] + [
+                {'op': 'create', 'type': 'note', 'client_id': f'n{i}', 'fields': {'todo': f't{i}', 'content': 'Nota'}}
+                for i in range(count)
+            ]
+            with CaptureQueriesContext(connection) as ctx:
+                self._sync(mutations, key=key)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(queries(2, 'pequeño'), queries(40, 'grande'))
+        self.assertCountersMatch()
+
+
+class BulkTodoActionsTests(TestCase):
+    def setUp(self):
+        caches['board'].clear()
+        self.user = User.objects.create_user(username='fabio', password='secret-pass-123')
+        self.category = Category.objects.create(name='Casa', user=self.user)
+        self.todos = [
+            Todo.objects.create(user=self.user, title=f'Tarea {i}', due_date=timezone.now() - timedelta(days=1))
+            for i in range(3)
+        ]
+        self.ids = [todo.id for todo in self.todos]
+        self.client.force_login(self.user)
+
+    def _bulk(self, action, ids=None, value=None, status=200):
+        response = self.client.post(
+            reverse('bulk_todos'),
+            data=json.dumps({'action': action, 'ids': self.ids if ids is None else ids, 'value': value}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, status, response.content)
+        return response.json()
+
+    def assertCountersMatch(self):
+        self.assertEqual(
+            dict(TodoCounter.objects.filter(user=self.user).exclude(value=0).values_list('key', 'value')),
+            {k: v for k, v in compute_counters(self.user.id).items() if v},
+        )
+
+    def test_complete_and_uncomplete(self):
+        Todo.objects.filter(id=self.ids[0]).update(completed=True)
+        reconcile(self.user.id)
+        since = timezone.now()
+        version = get_version(self.user.id)
+
+        data = self._bulk('complete')
+        self.assertEqual(data, {'success': True, 'action': 'complete', 'matched': 3, 'updated': 2})
+        self.assertEqual(Todo.objects.filter(user=self.user, completed=True).count(), 3)
+        self.assertEqual(Todo.objects.filter(user=self.user, updated_at__gt=since).count(), 2)
+        self.assertNotEqual(get_version(self.user.id), version)
+        self.assertCountersMatch()
+        self.assertEqual(self.client.get(reverse('todo_stats')).json()['completed'], 3)
+
+        self.assertEqual(self._bulk('uncomplete', ids=self.ids[:1])['updated'], 1)
+        self.assertCountersMatch()
+
+    def test_set_status_and_priority(self):
+        self._bulk('set_status', value='review')
+        self._bulk('set_priority', ids=self.ids[1:], value='urgent')
+        self.assertEqual(
+            sorted(Todo.objects.filter(user=self.user).values_list('status', 'priority')),
+            [('review', 'medium'), ('review', 'urgent'), ('review', 'urgent')],
+        )
+        self.assertCountersMatch()
+        self._bulk('set_status', value='archived', status=400)
+        self._bulk('set_priority', value=None, status=400)
+
+    def test_set_category(self):
+        data = self._bulk('set_category', value=self.category.id)
+        self.assertEqual(data['updated'], 3)
+        self.assertEqual(Todo.objects.filter(category=self.category).count(), 3)
+        self._bulk('set_category', ids=self.ids[:1], value=None)
+        self.assertIsNone(Todo.objects.get(id=self.ids[0]).category_id)
+
+        other = User.objects.create_user(username='gala', password='secret-pass-123')
+        foreign = Category.objects.create(name='Ajena', user=other)
+        self._bulk('set_category', value=foreign.id, status=400)
+        self._bulk('set_category', value='casa', status=400)
+
+    def test_delete(self):
+        Note.objects.create(todo=self.todos[0], content='Nota')
+        since = timezone.now()
+        data = self._bulk('delete', ids=self.ids[:2])
+        self.assertEqual(data, {'success': True, 'action': 'delete', 'matched': 2, 'deleted': 2})
+        self.assertEqual(list(Todo.objects.filter(user=self.user).values_list('id', flat=True)), self.ids[2:])
+        self.assertFalse(Note.objects.exists())
+        self.assertCountersMatch()
+        results = self.client.get(reverse('search_todos'), {'q': 'tarea'}).json()['results']
+        self.assertEqual([r['todo_id'] for r in results], self.ids[2:])
+        changes = changes_since(self.user, since)
+        self.assertEqual(sorted(changes['deleted']['todo']), self.ids[:2])
+
+    def test_other_users_todos_are_ignored(self):
+        other = User.objects.create_user(username='gala', password='secret-pass-123')
+        foreign = Todo.objects.create(user=other, title='Ajena')
+        self.assertEqual(self._bulk('complete', ids=[foreign.id])['matched'], 0)
+        self.assertEqual(self._bulk('delete', ids=[foreign.id])['deleted'], 0)
+        foreign.refresh_from_db()
+        self.assertFalse(foreign.completed)
+
+    def test_invalid_requests(self):
+        self._bulk('explode', status=400)
+        self._bulk('complete', ids=[], status=400)
+        self._bulk('complete', ids=['uno'], status=400)
+        # Not iterated character by character nor taken as ids 1 and 0
+        self._bulk('complete', ids=''.join(str(todo_id) for todo_id in self.ids), status=400)
+        self._bulk('complete', ids=[True, False], status=400)
+        self._bulk('complete', ids=[str(self.ids[0])], status=400)
+        self._bulk('complete', ids={'id': self.ids[0]}, status=400)
+        self.assertFalse(Todo.objects.filter(completed=True).exists())
+        response = self.client.post(reverse('bulk_todos'), data='[]', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_query_count_does_not_grow_with_todos(self):
+        def queries(ids):
+            with CaptureQueriesContext(connection) as ctx:
+                self._bulk('set_status', ids=ids, value='done')
+            return len(ctx.captured_queries)
+
+        # Counter rows for both statuses exist from here on
+        self._bulk('set_status', value='done')
+        self._bulk('set_status', value='todo')
+        small = queries(self.ids[:1])
+        Todo.objects.bulk_create([Todo(user=self.user, title=f'Más {i}') for i in range(30)])
+        large = queries(list(Todo.objects.filter(user=self.user, status='todo').values_list('id', flat=True)))
+        self.assertEqual(small, large)
+
+    def test_action_bar_and_checkboxes(self):
+        html = self.client.get(reverse('dashboard')).content.decode()
+        self.assertIn(f'class="todo-select', html)
+        self.assertIn(reverse('bulk_actions'), html)
+        bar = self.client.get(reverse('bulk_actions')).content.decode()
+        self.assertIn('Casa', bar)
+        self.assertIn('data-action="set_status"', bar)
+        Category.objects.create(name='Oficina', user=self.user)
+        self.assertIn('Oficina', self.client.get(reverse('bulk_actions')).content.decode())
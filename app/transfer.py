@@ -0,0 +1,298 @@
+"""
+Exportación e importación de tableros (categorías, tareas y notas).
+
+La exportación es un generador de líneas JSONL o CSV pensado para
+``StreamingHttpResponse``: recorre las tablas con ``iterator()`` y nunca
+tiene más de un bloque de filas en memoria. Cada bloque de tareas va seguido
+de sus notas, así que la importación solo necesita recordar los ids de las
+tareas recientes para reasignar las notas.
+
+La importación lee fila a fila y escribe con ``bulk_create`` por lotes; las
+categorías se reasignan a las existentes del usuario con el mismo nombre o
+a las nuevas que se crean. Como ``bulk_create`` no dispara señales, el
+geohash, el índice de búsqueda y los contadores se actualizan aquí.
+"""
+import csv
+import io
+import json
+from collections import Counter
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .board_cache import invalidate_board
+from .counters import apply_deltas, todo_keys
+from .geo import geohash_for
+from .models import Category, Note, Todo
+from .search import index_notes, index_todos
+
+EXPORT_FORMATS = {
+    'jsonl': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+EXPORT_CHUNK_SIZE = 2000
+IMPORT_BATCH_SIZE = 1000
+# Tareas recientes cuyo id original se recuerda para reasignar sus notas
+IMPORT_TODO_WINDOW = 50000
+
+CATEGORY_FIELDS = ('id', 'name', 'color', 'created_at')
+TODO_FIELDS = (
+    'id', 'category_id', 'title', 'description', 'status', 'priority', 'completed',
+    'due_date', 'todo_order', 'latitude', 'longitude', 'address', 'location_updated_at',
+    'created_at',
+)
+NOTE_FIELDS = ('id', 'todo_id', 'content', 'created_at')
+
+CSV_COLUMNS = ('type',) + tuple(dict.fromkeys(CATEGORY_FIELDS + TODO_FIELDS + NOTE_FIELDS))
+
+# Campos que se importan; ids, claves foráneas y fechas automáticas aparte
+IMPORT_FIELDS = {
+    'category': ('name', 'color'),
+    'todo': (
+        'title', 'description', 'status', 'priority', 'completed', 'due_date', 'todo_order',
+        'latitude', 'longitude', 'address', 'location_updated_at',
+    ),
+    'note': ('content',),
+}
+
+
+class ImportFormatError(ValueError):
+    """Una fila del fichero importado no es válida."""
+
+    def __init__(self, line, message):
+        super().__init__(f'Línea {line}: {message}')
+        self.line = line
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def export_rows(user, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Recorre el tablero del usuario: categorías, y luego cada bloque de
+    tareas seguido de las notas de esas tareas.
+
+    Yields:
+        tuple: ``(tipo, fila)`` con ``fila`` un diccionario de ``values()``
+    """
+    categories = Category.objects.filter(user=user).order_by('id').values(*CATEGORY_FIELDS)
+    for row in categories.iterator(chunk_size=chunk_size):
+        yield 'category', row
+
+    todos = Todo.objects.filter(user=user).order_by('id').values(*TODO_FIELDS)
+    for chunk in _chunks(todos.iterator(chunk_size=chunk_size), chunk_size):
+        for row in chunk:
+            yield 'todo', row
+        notes = (
+            Note.objects.filter(todo_id__in=[row['id'] for row in chunk])
+            .order_by('todo_id', 'id').values(*NOTE_FIELDS)
+        )
+        for row in notes.iterator(chunk_size=chunk_size):
+            yield 'note', row
+
+
+class _Echo:
+    """Pseudo-fichero para que ``csv.writer`` devuelva cada línea escrita."""
+
+    def write(self, value):
+        return value
+
+
+def export_lines(user, fmt):
+    """
+    Genera la exportación del tablero línea a línea.
+
+    Args:
+        user (User): Dueño del tablero
+        fmt (str): ``jsonl`` o ``csv``
+
+    Yields:
+        str: Líneas terminadas en salto de línea
+    """
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(CSV_COLUMNS)
+        for kind, row in export_rows(user):
+            row = {**row, 'type': kind}
+            yield writer.writerow(
+                '' if row.get(column) is None else _csv_value(row[column]) for column in CSV_COLUMNS
+            )
+    else:
+        encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+        for kind, row in export_rows(user):
+            yield encoder.encode({'type': kind, **row}) + '\n'
+
+
+def _csv_value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def parse_jsonl(stream):
+    """
+    Yields:
+        tuple: ``(línea, fila)`` por cada línea no vacía de ``stream`` (bytes)
+    """
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            raise ImportFormatError(line_number, f'JSON inválido ({e})') from e
+        if not isinstance(row, dict):
+            raise ImportFormatError(line_number, 'se esperaba un objeto')
+        yield line_number, row
+
+
+def parse_csv(stream):
+    """
+    Yields:
+        tuple: ``(línea, fila)`` por cada fila de ``stream`` (bytes); las
+        celdas vacías se leen como ausentes.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    reader = csv.DictReader(text)
+    for row in reader:
+        yield reader.line_num, {key: value for key, value in row.items() if key and value != ''}
+
+
+PARSERS = {
+    'jsonl': parse_jsonl,
+    'csv': parse_csv,
+}
+
+
+class BoardImporter:
+    """
+    Importa filas de una exportación en el tablero de ``user``.
+
+    Uso: ``add()`` por cada fila y ``finish()`` al final, dentro de una
+    transacción si la importación debe ser todo o nada.
+    """
+
+    models = {'category': Category, 'todo': Todo, 'note': Note}
+
+    def __init__(self, user, batch_size=IMPORT_BATCH_SIZE):
+        self.user = user
+        self.batch_size = batch_size
+        self.category_map = {}
+        self.category_names = dict(Category.objects.filter(user=user).values_list('name', 'id'))
+        self.todo_map = {}
+        self.pending = {'category': [], 'todo': [], 'note': []}
+        self.counts = {'categories': 0, 'todos': 0, 'notes': 0}
+
+    def _build(self, kind, line, row):
+        model = self.models[kind]
+        values = {}
+        for name in IMPORT_FIELDS[kind]:
+            field = model._meta.get_field(name)
+            if name not in row:
+                if not (field.has_default() or field.null or field.blank):
+                    raise ImportFormatError(line, f'falta el campo {name}')
+                continue
+            value = row[name]
+            try:
+                values[name] = None if value is None and field.null else field.clean(value, None)
+            except ValidationError as e:
+                raise ImportFormatError(line, f'{name}: {" ".join(e.messages)}') from e
+        return model(**values)
+
+    def _reference(self, line, row, name):
+        value = row.get(name)
+        if value is None:
+            return None
+        try:
+            return int(value)
+        except (TypeError, ValueError) as e:
+            raise ImportFormatError(line, f'{name} inválido') from e
+
+    def add(self, line, row):
+        kind = row.get('type')
+        if kind not in self.models:
+            raise ImportFormatError(line, f'tipo desconocido: {kind!r}')
+        obj = self._build(kind, line, row)
+        old_id = self._reference(line, row, 'id')
+
+        if kind == 'category':
+            existing = self.category_names.get(obj.name)
+            if existing is not None:
+                self.category_map[old_id] = existing
+                return
+            obj.user = self.user
+        elif kind == 'todo':
+            self._flush('category')
+            old_category = self._reference(line, row, 'category_id')
+            if old_category is not None and old_category not in self.category_map:
+                raise ImportFormatError(line, f'categoría {old_category} no encontrada')
+            obj.user = self.user
+            obj.category_id = self.category_map.get(old_category)
+            obj.geohash = geohash_for(obj.latitude, obj.longitude)
+        else:
+            old_todo = self._reference(line, row, 'todo_id')
+            self._flush('todo')
+            if old_todo not in self.todo_map:
+                raise ImportFormatError(line, f'tarea {old_todo} no encontrada')
+            obj.todo_id = self.todo_map[old_todo]
+
+        self.pending[kind].append((old_id, obj))
+        if len(self.pending[kind]) >= self.batch_size:
+            self._flush(kind)
+
+    def _flush(self, kind):
+        pending = self.pending[kind]
+        if not pending:
+            return
+        self.pending[kind] = []
+        created = self.models[kind].objects.bulk_create([obj for _, obj in pending])
+
+        if kind == 'category':
+            for (old_id, _), category in zip(pending, created):
+                self.category_map[old_id] = category.id
+                self.category_names[category.name] = category.id
+            self.counts['categories'] += len(created)
+        elif kind == 'todo':
+            for (old_id, _), todo in zip(pending, created):
+                self.todo_map[old_id] = todo.id
+            # Solo las tareas recientes pueden recibir notas (ver export_rows)
+            for old_id in list(islice(self.todo_map, max(len(self.todo_map) - IMPORT_TODO_WINDOW, 0))):
+                del self.todo_map[old_id]
+            index_todos([todo.id for todo in created])
+            apply_deltas(self.user.id, Counter(key for todo in created for key in todo_keys(todo)))
+            self.counts['todos'] += len(created)
+        else:
+            index_notes([note.id for note in created])
+            self.counts['notes'] += len(created)
+
+    def finish(self):
+        """
+        Escribe lo que quede pendiente.
+
+        Returns:
+            dict: Filas creadas por tipo
+        """
+        for kind in ('category', 'todo', 'note'):
+            self._flush(kind)
+        invalidate_board(self.user.id)
+        return self.counts
+
+
+def import_rows(user, rows, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Importa ``rows`` (pares ``(línea, fila)`` de ``parse_jsonl``/``parse_csv``).
+
+    Returns:
+        dict: Filas creadas por tipo
+
+    Raises:
+        ImportFormatError: Si alguna fila no es válida.
+    """
+    importer = BoardImporter(user, batch_size)
+    for line, row in rows:
+        importer.add(line, row)
+    return importer.finish()
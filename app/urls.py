@@ -4,6 +4,8 @@ from . import views
 urlpatterns = [
     # Main views
     path('', views.dashboard, name='dashboard'),
+    path('board/actions/', views.bulk_actions, name='bulk_actions'),
+    path('board/<str:view>/', views.board_view, name='board_view'),
     
     # Category management
     path('categories/', views.categories, name='categories'),
@@ -21,7 +23,23 @@ urlpatterns = [
     path('note/add/<int:todo_id>/', views.add_note, name='add_note'),
     path('note/delete/<int:note_id>/', views.delete_note, name='delete_note'),
     
+    # JSON API
+    path('api/todos/', views.api_todos, name='api_todos'),
+    path('api/search/', views.search_todos, name='search_todos'),
+    path('api/stats/', views.todo_stats, name='todo_stats'),
+    path('api/todos/nearby/', views.nearby_todos, name='nearby_todos'),
+    path('api/todos/bulk/', views.bulk_todos, name='bulk_todos'),
+    path('api/changes/', views.board_changes, name='board_changes'),
+    path('events/', views.board_events, name='board_events'),
+    path('api/sync/', views.sync_board, name='sync_board'),
+    
+    # Board export / import
+    path('export/', views.export_board, name='export_board'),
+    path('import/', views.import_board, name='import_board'),
+    
     # AJAX endpoints
     path('update-order/', views.update_todo_order, name='update_todo_order'),
+    path('reorder-column/', views.reorder_column, name='reorder_column'),
     path('location/<int:todo_id>/', views.update_todo_location, name='update_todo_location'),
+    path('location/<int:todo_id>/status/', views.todo_location_status, name='todo_location_status'),
 ]
@@ -1,15 +1,39 @@
-from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
+from django.urls import reverse
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib import messages
 from django.contrib.auth import logout
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_POST
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST
+from django.db import IntegrityError, transaction
 from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.utils.safestring import mark_safe
+import asyncio
 import json
-from .models import Todo, Category, Note
+from .board_cache import BOARD_VIEWS, active_view, board_fragment, invalidate_board
+from .bulk import delete_todos, set_todo_fields, update_todos
+from .changes import changes_since, current_cursor, decode_cursor, todo_state
+from .counters import get_stats
+from .freshness import (
+    dashboard_etag, dashboard_last_modified, todo_detail_etag, todo_detail_last_modified,
+)
+from .geo import nearest_todos
+from .geocoding import enqueue_location, location_status
+from .metrics import render_text
+from .models import Todo, Category, Note, SyncBatch
+from .ordering import compute_order_keys
+from .pagination import InvalidCursor, paginate
+from .search import search
 from .services import LocationIQService
+from .sync import IdempotencyConflict, SyncError, apply_batch
+from .transfer import EXPORT_FORMATS, PARSERS, ImportFormatError, export_lines, import_rows
 
 # Landing page
 def landing_page(request):
@@ -32,28 +56,84 @@ def logout_view(request):
     messages.success(request, 'Has cerrado sesión exitosamente.')
     return redirect('landing_page')
 
+# Kanban columns: status, element id (STATUS_COLUMNS in board.js) and counter colour
+BOARD_COLUMNS = (
+    ('todo', 'todo-column', 'bg-gray-600'),
+    ('in_progress', 'in-progress-column', 'bg-blue-600'),
+    ('review', 'review-column', 'bg-purple-600'),
+    ('done', 'done-column', 'bg-green-600'),
+)
+
+# Board data shared by the dashboard and the view fragments
+def board_context(user):
+    """Carga el tablero con una sola consulta y agrupa las tareas por estado"""
+    todos = list(
+        Todo.objects.filter(user=user)
+        .select_related('category')
+        .order_by('todo_order', '-created_at')
+    )
+    
+    # Group todos by status for Kanban view (single query, grouped in Python)
+    status_groups = {status: [] for status, _ in Todo.STATUS_CHOICES}
+    for todo in todos:
+        status_groups.setdefault(todo.status, []).append(todo)
+    
+    labels = dict(Todo.STATUS_CHOICES)
+    columns = [
+        {'status': status, 'label': labels[status], 'id': column_id, 'badge': badge, 'todos': status_groups[status]}
+        for status, column_id, badge in BOARD_COLUMNS
+    ]
+    return {'todos': todos, 'status_groups': status_groups, 'columns': columns}
+
+def _render_board_view(request, view):
+    return board_fragment(
+        request.user.id, view,
+        lambda: render_to_string(BOARD_VIEWS[view], board_context(request.user), request),
+    )
+
 # Main dashboard view
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=dashboard_etag, last_modified_func=dashboard_last_modified)
 def dashboard(request):
-    todos = Todo.objects.filter(user=request.user).order_by('todo_order', '-created_at')
-    categories = Category.objects.filter(user=request.user)
+    # Taken before reading so the page never misses a change (app/changes.py)
+    changes_cursor = current_cursor()
     
-    # Group todos by status for Kanban view
-    status_groups = {
-        'todo': todos.filter(status='todo'),
-        'in_progress': todos.filter(status='in_progress'),
-        'review': todos.filter(status='review'),
-        'done': todos.filter(status='done'),
-    }
+    # Only the active view is rendered (the board is only loaded if its
+    # fragment is not cached); board.js fetches the other one
+    view = active_view(request)
+    board_html = _render_board_view(request, view)
     
     context = {
-        'todos': todos,
-        'categories': categories,
-        'status_groups': status_groups,
+        'active_view': view,
+        'board_html': mark_safe(board_html),
+        'changes_cursor': changes_cursor,
     }
     
     return render(request, 'app/dashboard.html', context)
 
+@login_required
+@cache_control(private=True, no_cache=True)
+def board_view(request, view):
+    """HTML de una vista del tablero (``kanban`` o ``list``) para mostrarla sin recargar"""
+    if view not in BOARD_VIEWS:
+        raise Http404
+    return HttpResponse(_render_board_view(request, view))
+
+@login_required
+@cache_control(private=True, no_cache=True)
+def bulk_actions(request):
+    """Barra de acciones masivas, que board.js pide al seleccionar la primera tarea"""
+    html = board_fragment(
+        request.user.id, 'bulk_actions',
+        lambda: render_to_string('app/bulk_actions.html', {
+            'categories': Category.objects.filter(user=request.user),
+            'status_choices': Todo.STATUS_CHOICES,
+            'priority_choices': Todo.PRIORITY_CHOICES,
+        }, request),
+    )
+    return HttpResponse(html)
+
 # Category management
 @login_required
 def categories(request):
@@ -131,7 +211,10 @@ def add_todo(request):
     return render(request, 'app/add_todo.html', {'categories': categories})
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=todo_detail_etag, last_modified_func=todo_detail_last_modified)
 def todo_detail(request, todo_id):
+    changes_cursor = current_cursor()
     todo = get_object_or_404(Todo, id=todo_id, user=request.user)
     categories = Category.objects.filter(user=request.user)
     
@@ -162,7 +245,8 @@ def todo_detail(request, todo_id):
     
     return render(request, 'app/todo_detail.html', {
         'todo': todo,
-        'categories': categories
+        'categories': categories,
+        'changes_cursor': changes_cursor,
     })
 
 @login_required
@@ -203,41 +287,426 @@ def delete_note(request, note_id):
     messages.success(request, 'Nota eliminada exitosamente.')
     return redirect('todo_detail', todo_id=todo_id)
 
+# JSON API
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+TODO_API_FIELDS = (
+    'id', 'title', 'status', 'priority', 'completed', 'category_id',
+    'todo_order', 'due_date', 'created_at', 'updated_at',
+)
+
+@login_required
+def api_todos(request):
+    """
+    Lista JSON de las tareas del usuario, paginada por cursor.
+    
+    Filtros opcionales por querystring: ``status``, ``priority``,
+    ``category`` (id) y ``completed`` (``true``/``false``). ``limit`` fija el
+    tamaño de página y ``cursor`` es el ``next_cursor`` de la página anterior.
+    """
+    todos = Todo.objects.filter(user=request.user)
+    
+    status = request.GET.get('status')
+    if status:
+        todos = todos.filter(status=status)
+    priority = request.GET.get('priority')
+    if priority:
+        todos = todos.filter(priority=priority)
+    category_id = request.GET.get('category')
+    if category_id:
+        if not category_id.isdigit():
+            return JsonResponse({'success': False, 'error': 'Categoría inválida'}, status=400)
+        todos = todos.filter(category_id=category_id)
+    completed = request.GET.get('completed')
+    if completed in ('true', 'false'):
+        todos = todos.filter(completed=completed == 'true')
+    
+    try:
+        limit = min(int(request.GET.get('limit', API_PAGE_SIZE)), API_MAX_PAGE_SIZE)
+    except ValueError:
+        limit = API_PAGE_SIZE
+    limit = max(limit, 1)
+    
+    try:
+        rows, next_cursor = paginate(
+            todos.values(*TODO_API_FIELDS), request.GET.get('cursor'), limit
+        )
+    except InvalidCursor:
+        return JsonResponse({'success': False, 'error': 'Cursor inválido'}, status=400)
+    
+    return JsonResponse({'results': rows, 'next_cursor': next_cursor})
+
+@login_required
+def search_todos(request):
+    """
+    Búsqueda de texto completo en las tareas y notas del usuario.
+    
+    ``q`` es el texto a buscar y ``limit`` el máximo de resultados. Cada
+    resultado trae el título y un fragmento con las coincidencias marcadas
+    con ``<mark>`` (el resto del texto va escapado).
+    """
+    try:
+        limit = int(request.GET.get('limit', 20))
+    except ValueError:
+        limit = 20
+    
+    results = search(request.user, request.GET.get('q', ''), limit)
+    for result in results:
+        result['url'] = reverse('todo_detail', args=[result['todo_id']])
+    return JsonResponse({'results': results})
+
+NEARBY_DEFAULT_RESULTS = 10
+NEARBY_MAX_RESULTS = 100
+NEARBY_FIELDS = ('id', 'title', 'status', 'address', 'latitude', 'longitude')
+
+@login_required
+def nearby_todos(request):
+    """
+    Tareas con ubicación cercanas a un punto, de la más cercana a la más lejana.
+    
+    ``lat`` y ``lon`` son obligatorios. ``k`` es el máximo de resultados (10
+    por defecto) y ``radius`` (km), opcional, la distancia máxima.
+    """
+    try:
+        latitude = float(request.GET['lat'])
+        longitude = float(request.GET['lon'])
+        radius = float(request.GET['radius']) if request.GET.get('radius') else None
+        k = int(request.GET.get('k', NEARBY_DEFAULT_RESULTS))
+    except (KeyError, ValueError):
+        return JsonResponse({'success': False, 'error': 'Parámetros inválidos'}, status=400)
+    
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return JsonResponse({'success': False, 'error': 'Coordenadas inválidas'}, status=400)
+    if (radius is not None and not radius > 0) or k < 1:
+        return JsonResponse({'success': False, 'error': 'Parámetros inválidos'}, status=400)
+    
+    matches = nearest_todos(
+        request.user.id, latitude, longitude, min(k, NEARBY_MAX_RESULTS), NEARBY_FIELDS, max_radius_km=radius,
+    )
+    
+    results = [
+        {
+            **row,
+            'latitude': float(row['latitude']),
+            'longitude': float(row['longitude']),
+            'distance_km': round(distance, 3),
+            'url': reverse('todo_detail', args=[row['id']]),
+        }
+        for distance, row in matches
+    ]
+    return JsonResponse({'results': results})
+
+@login_required
+def todo_stats(request):
+    """Estadísticas del tablero, leídas de los contadores desnormalizados."""
+    return JsonResponse(get_stats(request.user.id))
+
+# Partial templates the board and the detail page patch in place
+CHANGE_TEMPLATES = {
+    'board': {'card': 'app/todo_card.html', 'row': 'app/todo_row.html'},
+    'detail': {'location': 'app/todo_location.html'},
+}
+
+@login_required
+def board_changes(request):
+    """
+    Tareas, categorías y notas modificadas y borradas desde ``since`` (el
+    ``cursor`` de la respuesta anterior o el que trae la página).
+    
+    Con ``render=board`` cada tarea trae el HTML de su tarjeta del Kanban y
+    de su fila de la lista; con ``render=detail``, el de su ubicación. Si
+    ``reset`` es true hay demasiados cambios y conviene recargar la página.
+    """
+    try:
+        since = decode_cursor(request.GET.get('since', ''))
+    except InvalidCursor:
+        return JsonResponse({'success': False, 'error': 'Cursor inválido'}, status=400)
+    
+    changes = changes_since(request.user, since)
+    return JsonResponse(_changes_json(request, changes, CHANGE_TEMPLATES.get(request.GET.get('render'), {})))
+
+def _changes_json(request, changes, templates=None):
+    """``changes_since`` con las tareas como diccionarios (y su HTML si hay ``templates``)"""
+    todos = []
+    for todo in changes['todos']:
+        state = todo_state(todo)
+        if templates:
+            state['html'] = {
+                name: render_to_string(template, {'todo': todo}, request)
+                for name, template in templates.items()
+            }
+        todos.append(state)
+    return {**changes, 'todos': todos}
+
+@require_POST
+@login_required
+def sync_board(request):
+    """
+    Aplica un lote de mutaciones de un cliente sin conexión (ver ``app/sync.py``).
+    
+    Espera ``{"mutations": [...], "since": "<cursor>"}`` y la cabecera
+    ``Idempotency-Key``. Devuelve el resultado de cada mutación, los ids del
+    servidor de cada ``client_id`` y, como ``/api/changes/``, los cambios
+    desde ``since`` (incluidos los del propio lote) con el cursor siguiente.
+    """
+    key = request.headers.get('Idempotency-Key', '')
+    if not key or len(key) > SyncBatch._meta.get_field('key').max_length:
+        return JsonResponse({'success': False, 'error': 'Falta la cabecera Idempotency-Key'}, status=400)
+    try:
+        data = json.loads(request.body)
+        if not isinstance(data, dict):
+            raise ValueError(data)
+        since = decode_cursor(data['since']) if data.get('since') else None
+    except (ValueError, TypeError):
+        return JsonResponse({'success': False, 'error': 'JSON inválido'}, status=400)
+    except InvalidCursor:
+        return JsonResponse({'success': False, 'error': 'Cursor inválido'}, status=400)
+    
+    try:
+        try:
+            with transaction.atomic():
+                outcome, replayed = apply_batch(request.user, key, request.body, data.get('mutations'))
+        except IntegrityError:
+            # Otra petición con la misma clave terminó antes: se repite su resultado
+            with transaction.atomic():
+                outcome, replayed = apply_batch(request.user, key, request.body, data.get('mutations'))
+    except SyncError as e:
+        return JsonResponse({'success': False, 'error': str(e), 'mutation': e.index}, status=400)
+    except IdempotencyConflict:
+        return JsonResponse(
+            {'success': False, 'error': 'La clave de idempotencia ya se usó con otro lote'}, status=422,
+        )
+    
+    response = {'success': True, 'replayed': replayed, **outcome}
+    if since is not None:
+        response['changes'] = _changes_json(request, changes_since(request.user, since))
+        response['cursor'] = response['changes'].pop('cursor')
+    else:
+        response['cursor'] = current_cursor()
+    return JsonResponse(response)
+
+# Most todos a single bulk action may touch
+BULK_MAX_TODOS = 1000
+
+def _bulk_values(user, action, value):
+    """
+    Campos que escribe una acción masiva.
+    
+    Raises:
+        ValueError: Si la acción o su ``value`` no son válidos.
+    """
+    if action in ('complete', 'uncomplete'):
+        return {'completed': action == 'complete'}
+    if action == 'set_status' and value in dict(Todo.STATUS_CHOICES):
+        return {'status': value}
+    if action == 'set_priority' and value in dict(Todo.PRIORITY_CHOICES):
+        return {'priority': value}
+    if action == 'set_category':
+        if value is None:
+            return {'category_id': None}
+        category = Category.objects.filter(user=user, id=value).values_list('id', flat=True).first()
+        if category is not None:
+            return {'category_id': category}
+    raise ValueError(action)
+
+@require_POST
+@login_required
+def bulk_todos(request):
+    """
+    Aplica una acción a varias tareas del usuario a la vez.
+    
+    Espera ``{"action": "<acción>", "ids": [id, ...], "value": ...}`` con
+    ``complete``, ``uncomplete``, ``set_status``, ``set_priority``,
+    ``set_category`` (``value`` es el estado, la prioridad o el id de la
+    categoría; ``null`` la quita) o ``delete``. Es un solo UPDATE o DELETE
+    por tabla; los ids que no son del usuario se ignoran. Devuelve cuántas
+    tareas se encontraron y cuántas se modificaron o borraron.
+    """
+    try:
+        data = json.loads(request.body)
+        if not isinstance(data, dict):
+            raise ValueError(data)
+    except (ValueError, TypeError):
+        return JsonResponse({'success': False, 'error': 'JSON inválido'}, status=400)
+    todo_ids = data.get('ids')
+    # bool is an int subclass: true/false must not become ids 1 and 0
+    if not isinstance(todo_ids, list) or any(
+        not isinstance(todo_id, int) or isinstance(todo_id, bool) for todo_id in todo_ids
+    ):
+        return JsonResponse({'success': False, 'error': 'ids debe ser una lista de enteros'}, status=400)
+    todo_ids = set(todo_ids)
+    if not todo_ids or len(todo_ids) > BULK_MAX_TODOS:
+        return JsonResponse(
+            {'success': False, 'error': f'Indica entre 1 y {BULK_MAX_TODOS} tareas'}, status=400,
+        )
+    
+    action = data.get('action')
+    with transaction.atomic():
+        if action == 'delete':
+            deleted = delete_todos(request.user.id, todo_ids)
+            counts = {'matched': len(deleted), 'deleted': len(deleted)}
+            changed = bool(deleted)
+        else:
+            try:
+                values = _bulk_values(request.user, action, data.get('value'))
+            except (ValueError, TypeError):
+                return JsonResponse({'success': False, 'error': 'Acción inválida'}, status=400)
+            matched, updated = set_todo_fields(request.user.id, todo_ids, values)
+            counts = {'matched': matched, 'updated': updated}
+            changed = bool(updated)
+        if changed:
+            invalidate_board(request.user.id)
+    
+    return JsonResponse({'success': True, 'action': action, **counts})
+
+@login_required
+def board_events(request):
+    """
+    Stream de avisos en vivo del tablero (ver ``app/live.py``).
+    
+    Bajo ASGI lo sirve ``todo_list/asgi.py`` antes de llegar aquí; bajo WSGI
+    no hay stream y un 204 hace que ``EventSource`` no vuelva a intentarlo.
+    """
+    return HttpResponse(status=204)
+
+# Board export / import
+@login_required
+def export_board(request):
+    """
+    Descarga el tablero del usuario (categorías, tareas y notas) en streaming.
+    
+    ``format`` puede ser ``jsonl`` (por defecto) o ``csv``.
+    """
+    fmt = request.GET.get('format', 'jsonl')
+    if fmt not in EXPORT_FORMATS:
+        return JsonResponse({'success': False, 'error': 'Formato no soportado'}, status=400)
+    
+    response = StreamingHttpResponse(export_lines(request.user, fmt), content_type=EXPORT_FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="tablero-{timezone.now():%Y%m%d}.{fmt}"'
+    return response
+
+@require_POST
+@login_required
+def import_board(request):
+    """
+    Importa un fichero de ``export_board`` en el tablero del usuario.
+    
+    Es todo o nada: si una fila no es válida no se importa ninguna.
+    """
+    upload = request.FILES.get('file')
+    if upload is None:
+        return JsonResponse({'success': False, 'error': 'Falta el fichero'}, status=400)
+    
+    fmt = request.POST.get('format') or upload.name.rsplit('.', 1)[-1].lower()
+    if fmt not in PARSERS:
+        return JsonResponse({'success': False, 'error': 'Formato no soportado'}, status=400)
+    
+    try:
+        with transaction.atomic():
+            counts = import_rows(request.user, PARSERS[fmt](upload))
+    except ImportFormatError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    return JsonResponse({'success': True, 'imported': counts})
+
 # AJAX endpoints
 @csrf_exempt
 @require_POST
 @login_required
-def update_todo_order(request):
+async def update_todo_order(request):
     try:
         data = json.loads(request.body)
         todo_id = data.get('todo_id')
         new_status = data.get('status')
         new_order = data.get('order', 0)
         
-        print(f"Updating todo {todo_id} to status {new_status} with order {new_order}")  # Debug
-        
-        todo = get_object_or_404(Todo, id=todo_id, user=request.user)
+        user = await request.auser()
+        todo = await aget_object_or_404(Todo, id=todo_id, user=user)
         todo.status = new_status
         todo.todo_order = new_order
-        todo.save()
-        
-        print(f"Todo updated successfully: {todo.title} -> {todo.status}")  # Debug
+        await todo.asave()
         
         return JsonResponse({'success': True})
     except Exception as e:
-        print(f"Error updating todo: {str(e)}")  # Debug
         return JsonResponse({'success': False, 'error': str(e)})
 
+@require_POST
+@login_required
+def reorder_column(request):
+    """
+    Vista AJAX que aplica el orden completo de una columna del Kanban.
+
+    Espera ``{"status": "<estado>", "order": [id, id, ...]}`` con las tareas de
+    la columna en su nuevo orden. Solo se escriben las filas cuya clave o
+    estado cambia, en una única transacción.
+    """
+    try:
+        data = json.loads(request.body)
+    except (ValueError, TypeError):
+        return JsonResponse({'success': False, 'error': 'JSON inválido'}, status=400)
+
+    status = data.get('status')
+    todo_ids = data.get('order')
+
+    if status not in dict(Todo.STATUS_CHOICES):
+        return JsonResponse({'success': False, 'error': 'Estado inválido'}, status=400)
+    try:
+        todo_ids = [int(todo_id) for todo_id in todo_ids]
+    except (ValueError, TypeError):
+        return JsonResponse({'success': False, 'error': 'Orden inválido'}, status=400)
+    if len(set(todo_ids)) != len(todo_ids):
+        return JsonResponse({'success': False, 'error': 'Orden con tareas repetidas'}, status=400)
+
+    with transaction.atomic():
+        todos = (
+            Todo.objects.select_for_update()
+            .filter(user=request.user, id__in=todo_ids)
+            .in_bulk()
+        )
+        if len(todos) != len(todo_ids):
+            return JsonResponse({'success': False, 'error': 'Tarea no encontrada'}, status=404)
+
+        current_keys = [
+            todos[todo_id].todo_order if todos[todo_id].status == status else None
+            for todo_id in todo_ids
+        ]
+        new_keys = compute_order_keys(current_keys)
+
+        changed = []
+        for todo_id, key in zip(todo_ids, new_keys):
+            todo = todos[todo_id]
+            if todo.status != status or todo.todo_order != key:
+                todo.status = status
+                todo.todo_order = key
+                changed.append(todo)
+        # Not Todo.objects.bulk_update: status moves must update the counters
+        update_todos(request.user.id, changed, ['status', 'todo_order'])
+        if changed:
+            invalidate_board(request.user.id)
+
+    return JsonResponse({
+        'success': True,
+        'updated': len(changed),
+        'order': {str(todo_id): key for todo_id, key in zip(todo_ids, new_keys)},
+    })
+
 # Location management
 @csrf_exempt
 @require_POST
 @login_required
-def update_todo_location(request, todo_id):
+async def update_todo_location(request, todo_id):
     """
     Vista AJAX para actualizar la ubicación de una tarea
+    
+    Guarda las coordenadas al momento. Si la dirección (o que no la hay) ya
+    está en caché se devuelve directamente; si no, y
+    ``GEOCODING_INLINE_TIMEOUT`` lo permite, se intenta resolver con el
+    cliente async dentro de ese plazo. En otro caso se encola la
+    geocodificación y se responde 202 con la URL para consultar el estado.
     """
     try:
-        todo = get_object_or_404(Todo, id=todo_id, user=request.user)
+        user = await request.auser()
+        todo = await aget_object_or_404(Todo, id=todo_id, user=user)
         data = json.loads(request.body)
         
         latitude = data.get('latitude')
@@ -251,15 +720,14 @@ def update_todo_location(request, todo_id):
         
         # Validar que las coordenadas sean números válidos
         try:
-            latitude = float(latitude)
-            longitude = float(longitude)
+            latitude = round(float(latitude), 6)
+            longitude = round(float(longitude), 6)
         except (ValueError, TypeError):
             return JsonResponse({
                 'success': False, 
                 'error': 'Coordenadas inválidas'
             })
         
-        # Obtener dirección usando LocationIQ
         location_service = LocationIQService()
         
         if not location_service.is_api_key_valid():
@@ -268,30 +736,68 @@ def update_todo_location(request, todo_id):
                 'error': 'API key de LocationIQ no configurada'
             })
         
-        address_info = location_service.get_address_from_coordinates(latitude, longitude)
+        todo.latitude = latitude
+        todo.longitude = longitude
+        
+        found, address_info = await location_service.cache.aget(latitude, longitude)
+        if not found and settings.GEOCODING_INLINE_TIMEOUT:
+            try:
+                found, address_info = await asyncio.wait_for(
+                    location_service.aresolve_address(latitude, longitude),
+                    timeout=settings.GEOCODING_INLINE_TIMEOUT,
+                )
+            except asyncio.TimeoutError:
+                pass
         
-        if address_info:
-            # Actualizar la tarea con la información de ubicación
-            todo.latitude = latitude
-            todo.longitude = longitude
-            todo.address = address_info.get('formatted_address', '')
+        if found:
+            # Sin dirección para el punto: reintentarlo en la cola daría lo mismo
+            todo.address = address_info.get('formatted_address', '') if address_info else None
             todo.location_updated_at = timezone.now()
-            todo.save()
+            await todo.asave()
             
             return JsonResponse({
                 'success': True,
-                'address': address_info.get('formatted_address', ''),
-                'display_name': address_info.get('display_name', ''),
+                'status': 'done',
+                'address': todo.address,
+                'display_name': address_info.get('display_name', '') if address_info else '',
                 'location_updated_at': todo.location_updated_at.isoformat()
             })
-        else:
-            return JsonResponse({
-                'success': False, 
-                'error': 'No se pudo obtener la dirección'
-            })
+        
+        # La dirección anterior ya no corresponde a las nuevas coordenadas
+        todo.address = None
+        await todo.asave()
+        await sync_to_async(enqueue_location)(todo)
+        
+        return JsonResponse({
+            'success': True,
+            'status': 'pending',
+            'status_url': reverse('todo_location_status', args=[todo.id]),
+        }, status=202)
             
     except Exception as e:
         return JsonResponse({
             'success': False, 
             'error': f'Error interno: {str(e)}'
         })
+
+@login_required
+async def todo_location_status(request, todo_id):
+    """
+    Vista AJAX de sondeo: estado de la geocodificación de una tarea
+    """
+    user = await request.auser()
+    status = await sync_to_async(location_status)(todo_id, user)
+    if status is None:
+        return JsonResponse({'success': False, 'error': 'Tarea no encontrada'}, status=404)
+    return JsonResponse({'success': True, **status})
+
+# Monitoring
+def metrics(request):
+    """Métricas de rendimiento por vista en el formato de texto de Prometheus"""
+    token = settings.METRICS_TOKEN
+    if token:
+        if not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return HttpResponse('No autorizado', status=401, content_type='text/plain; charset=utf-8')
+    elif not settings.DEBUG:
+        raise Http404
+    return HttpResponse(render_text(), content_type='text/plain; version=0.0.4; charset=utf-8')
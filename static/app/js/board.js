@@ -0,0 +1,498 @@
+// Dashboard: view toggle, drag and drop between columns, multi-select with
+// bulk actions, locations and in-place and live updates. Only the active view comes with the page; the
+// other one is fetched from its data-fragment-url the first time it is shown. Needs common.js and SortableJS; the URLs and the initial
+// changes cursor come from data attributes of this script tag.
+
+const boardScript = document.currentScript;
+const reorderUrl = boardScript.dataset.reorderUrl;
+const bulkUrl = boardScript.dataset.bulkUrl;
+const changesUrl = boardScript.dataset.changesUrl;
+const eventsUrl = boardScript.dataset.eventsUrl;
+let changesCursor = boardScript.dataset.changesCursor;
+
+// Remembers the last view for the next page load (BOARD_VIEW_COOKIE in app/board_cache.py)
+const VIEW_COOKIE = 'board_view';
+
+const STATUS_COLUMNS = {
+    'todo': 'todo-column',
+    'in_progress': 'in-progress-column',
+    'review': 'review-column',
+    'done': 'done-column'
+};
+
+document.addEventListener('DOMContentLoaded', function() {
+    // Initialize view toggle functionality
+    initializeViewToggle();
+
+    // Initialize Sortable for Kanban
+    initializeSortable();
+
+    // Initialize todo card click handlers
+    initializeTodoCardClicks();
+
+    // Initialize multi-select and bulk actions
+    initializeBulkActions();
+
+    // Initialize location functionality
+    initializeLocationButtons();
+
+    // Catch up with changes made from other tabs when coming back
+    document.addEventListener('visibilitychange', () => {
+        if (document.visibilityState === 'visible') {
+            syncBoard();
+        }
+    });
+
+    listenForChanges();
+});
+
+// View Toggle Functionality
+function initializeViewToggle() {
+    const kanbanBtn = document.getElementById('kanban-btn');
+    const listBtn = document.getElementById('list-btn');
+    const toggleSlider = document.getElementById('toggle-slider');
+    const kanbanView = document.getElementById('kanban-view');
+    const listView = document.getElementById('list-view');
+
+    let currentView = listBtn.classList.contains('active') ? 'list' : 'kanban';
+
+    function switchView(view) {
+        const isKanban = view === 'kanban';
+
+        // Animate slider - Fixed positioning
+        if (isKanban) {
+            toggleSlider.style.transform = 'translateX(0)';
+        } else {
+            toggleSlider.style.transform = 'translateX(100%)';
+        }
+
+        // Update button states
+        kanbanBtn.classList.toggle('active', isKanban);
+        listBtn.classList.toggle('active', !isKanban);
+
+        document.cookie = `${VIEW_COOKIE}=${view}; path=/; max-age=31536000; SameSite=Lax`;
+
+        // Animate view transition once the view is loaded
+        const hiding = isKanban ? listView : kanbanView;
+        const showing = isKanban ? kanbanView : listView;
+        hiding.classList.add('view-transition', 'fade-out');
+        loadView(showing).then(() => {
+            hiding.classList.add('hidden');
+            hiding.classList.remove('fade-out');
+            showing.classList.remove('hidden');
+            showing.classList.add('view-transition', 'fade-in');
+            setTimeout(() => {
+                showing.classList.remove('fade-in');
+            }, 300);
+        });
+
+        currentView = view;
+    }
+
+    // Event listeners
+    kanbanBtn.addEventListener('click', () => {
+        if (currentView !== 'kanban') {
+            switchView('kanban');
+        }
+    });
+
+    listBtn.addEventListener('click', () => {
+        if (currentView !== 'list') {
+            switchView('list');
+        }
+    });
+}
+
+// Fills a container from its data-fragment-url the first time it is needed
+function loadFragment(container, onLoad) {
+    if (container.dataset.loaded) {
+        return Promise.resolve();
+    }
+    return fetch(container.dataset.fragmentUrl)
+    .then(response => {
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
+        return response.text();
+    })
+    .then(html => {
+        container.innerHTML = html;
+        container.dataset.loaded = 'true';
+        onLoad();
+    });
+}
+
+// Fetches a view that did not come with the page; the fragment is current,
+// so later syncs only have to patch what changes after it
+function loadView(view) {
+    const delay = new Promise(resolve => setTimeout(resolve, 150));
+    const loading = loadFragment(view, () => {
+        markSelected(view);
+        if (view.id === 'kanban-view') {
+            initializeSortable();
+        }
+    })
+    .catch(error => {
+        console.error('Error loading view:', error);
+        window.location.reload();
+    });
+    return Promise.all([delay, loading]);
+}
+
+// Sortable Initialization
+function initializeSortable() {
+    const statusMap = {};
+    Object.entries(STATUS_COLUMNS).forEach(([status, columnId]) => {
+        statusMap[columnId] = status;
+    });
+
+    if (!document.getElementById('kanban-view').dataset.loaded) {
+        return;
+    }
+
+    Object.keys(statusMap).forEach(columnId => {
+        const column = document.getElementById(columnId);
+
+        if (column) {
+            new Sortable(column, {
+                group: 'todos',
+                animation: 150,
+                ghostClass: 'sortable-ghost',
+                handle: '.drag-handle', // Only drag from handle
+                filter: '.no-drag', // Don't drag empty state
+                onEnd: function(evt) {
+                    reorderColumn(evt.to, statusMap[evt.to.id]);
+                    if (evt.from !== evt.to) {
+                        updateColumnCount(evt.from);
+                    }
+                }
+            });
+        } else {
+            console.error(`Column not found: ${columnId}`);
+        }
+    });
+}
+
+// Click handler for todo cards
+function initializeTodoCardClicks() {
+    document.addEventListener('click', function(e) {
+        const todoCard = e.target.closest('.todo-card');
+        if (todoCard && !e.target.closest('.drag-handle, .todo-select')) {
+            const todoId = todoCard.dataset.todoId;
+            if (todoId) {
+                window.location.href = `/todo/detail/${todoId}/`;
+            }
+        }
+    });
+}
+
+// Multi-select: the selection survives view switches and in-place updates;
+// actions go to the bulk endpoint in one request (see bulk_todos in
+// app/views.py) and the board then syncs as after any other change
+const selectedTodos = new Set();
+
+function initializeBulkActions() {
+    document.addEventListener('change', function(e) {
+        const checkbox = e.target.closest('.todo-select');
+        if (checkbox) {
+            setSelected(checkbox.dataset.todoId, checkbox.checked);
+            return;
+        }
+        const select = e.target.closest('select.bulk-action');
+        if (select && select.value) {
+            runBulkAction(select.dataset.action, select.value === 'none' ? null : select.value);
+            select.value = '';
+        }
+    });
+
+    document.addEventListener('click', function(e) {
+        const button = e.target.closest('button.bulk-action');
+        if (button) {
+            runBulkAction(button.dataset.action, null);
+        } else if (e.target.closest('#bulk-clear')) {
+            clearSelection();
+        }
+    });
+}
+
+function setSelected(todoId, selected) {
+    if (selected) {
+        selectedTodos.add(String(todoId));
+    } else {
+        selectedTodos.delete(String(todoId));
+    }
+    // The card and the row of the same todo
+    document.querySelectorAll(`.todo-select[data-todo-id="${todoId}"]`).forEach(checkbox => {
+        checkbox.checked = selected;
+    });
+    updateBulkBar();
+}
+
+function markSelected(root) {
+    root.querySelectorAll('.todo-select').forEach(checkbox => {
+        checkbox.checked = selectedTodos.has(checkbox.dataset.todoId);
+    });
+}
+
+function clearSelection() {
+    selectedTodos.clear();
+    markSelected(document);
+    updateBulkBar();
+}
+
+function updateBulkBar() {
+    const bar = document.getElementById('bulk-actions');
+    if (!selectedTodos.size) {
+        bar.classList.add('hidden');
+        return;
+    }
+    loadFragment(bar, () => {})
+    .then(() => {
+        const count = document.getElementById('bulk-count');
+        count.textContent = selectedTodos.size;
+        bar.classList.toggle('hidden', !selectedTodos.size);
+    })
+    .catch(error => console.error('Error loading bulk actions:', error));
+}
+
+function runBulkAction(action, value) {
+    const ids = Array.from(selectedTodos);
+    if (!ids.length) {
+        return;
+    }
+    if (action === 'delete' && !confirm(`¿Eliminar ${ids.length} tareas?`)) {
+        return;
+    }
+    fetch(bulkUrl, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': getCookie('csrftoken')
+        },
+        body: JSON.stringify({action: action, ids: ids, value: value})
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            clearSelection();
+            syncBoard();
+        } else {
+            alert('Error al actualizar las tareas: ' + data.error);
+        }
+    })
+    .catch(error => {
+        console.error('Fetch error:', error);
+        alert('Error de conexión al actualizar las tareas');
+    });
+}
+
+function columnTodoIds(column) {
+    return Array.from(column.querySelectorAll('.todo-card')).map(card => card.dataset.id);
+}
+
+function updateColumnCount(column) {
+    if (!column) {
+        return;
+    }
+    const counter = document.querySelector(`[data-count-for="${column.id}"]`);
+    if (counter) {
+        counter.textContent = columnTodoIds(column).length;
+    }
+}
+
+function reorderColumn(column, status) {
+    fetch(reorderUrl, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': getCookie('csrftoken')
+        },
+        body: JSON.stringify({
+            status: status,
+            order: columnTodoIds(column)
+        })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            // Picks up the new order keys of the moved cards
+            syncBoard();
+        } else {
+            console.error('Error updating column order:', data.error);
+            alert('Error al actualizar la tarea: ' + data.error);
+            window.location.reload();
+        }
+    })
+    .catch(error => {
+        console.error('Fetch error:', error);
+        alert('Error de conexión al actualizar la tarea');
+    });
+}
+
+// In-place updates: apply the changes since the last sync instead of
+// reloading the page (see app/changes.py)
+let syncing = null;
+let syncAgain = false;
+
+function syncBoard() {
+    if (syncing) {
+        syncAgain = true;
+        return syncing;
+    }
+    syncing = fetchChanges(changesUrl, changesCursor, 'board')
+    .then(data => {
+        if (data.reset) {
+            window.location.reload();
+            return;
+        }
+        data.deleted.todo.forEach(todoId => {
+            removeTodo(todoId);
+            selectedTodos.delete(String(todoId));
+        });
+        data.todos.forEach(patchTodo);
+        updateBulkBar();
+        Object.values(STATUS_COLUMNS).forEach(columnId => {
+            updateColumnCount(document.getElementById(columnId));
+        });
+        changesCursor = data.cursor;
+    })
+    .catch(error => console.error('Error syncing board:', error))
+    .finally(() => {
+        syncing = null;
+        if (syncAgain) {
+            syncAgain = false;
+            syncBoard();
+        }
+    });
+    return syncing;
+}
+
+// Live updates from other tabs and devices (see app/live.py). Events carry
+// no data, they only trigger a sync; the browser reconnects on its own and
+// every (re)connection syncs once to pick up what was missed meanwhile.
+function listenForChanges() {
+    if (!window.EventSource || !eventsUrl) {
+        return;
+    }
+    const source = new EventSource(eventsUrl);
+    let connected = false;
+    source.addEventListener('open', () => {
+        if (connected) {
+            syncBoard();
+        }
+        connected = true;
+    });
+    source.addEventListener('changed', () => syncBoard());
+}
+
+function removeTodo(todoId) {
+    document.querySelectorAll(`.todo-card[data-id="${todoId}"], .todo-row[data-row-id="${todoId}"]`)
+    .forEach(element => element.remove());
+}
+
+function patchTodo(todo) {
+    removeTodo(todo.id);
+    insertSorted(document.getElementById(STATUS_COLUMNS[todo.status]), elementFromHtml(todo.html.card), '.todo-card');
+    insertSorted(document.getElementById('list-rows'), elementFromHtml(todo.html.row), '.todo-row');
+    if (selectedTodos.has(String(todo.id))) {
+        setSelected(todo.id, true);
+    }
+}
+
+// Same order as the board: todo_order, then newest first
+function insertSorted(container, element, selector) {
+    if (!container) {
+        return;
+    }
+    const order = Number(element.dataset.order);
+    const created = Number(element.dataset.created);
+    const next = Array.from(container.querySelectorAll(selector)).find(sibling => {
+        const siblingOrder = Number(sibling.dataset.order);
+        return siblingOrder > order || (siblingOrder === order && Number(sibling.dataset.created) < created);
+    });
+    container.insertBefore(element, next || null);
+    container.querySelectorAll('.column-empty').forEach(empty => empty.remove());
+}
+
+// Location functionality
+function initializeLocationButtons() {
+    document.addEventListener('click', function(e) {
+        const button = e.target.closest('.location-btn');
+        if (button) {
+            e.preventDefault();
+            e.stopPropagation();
+
+            if (button.dataset.todoId) {
+                addLocation(button);
+            }
+        }
+    });
+}
+
+function addLocation(button) {
+    const originalContent = button.innerHTML;
+
+    // Show loading state
+    button.innerHTML = `
+        <svg class="w-3 h-3 lg:w-4 lg:h-4 animate-spin" fill="none" stroke="currentColor" viewBox="0 0 24 24">
+            <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M4 4v5h.582m15.356 2A8.001 8.001 0 004.582 9m0 0H9m11 11v-5h-.581m0 0a8.003 8.003 0 01-15.357-2m15.357 2H15"></path>
+        </svg>
+    `;
+    button.disabled = true;
+
+    const onError = message => showLocationError(message, button, originalContent);
+    getCurrentPosition(
+        (latitude, longitude) => updateTodoLocation(
+            button.dataset.todoId, latitude, longitude,
+            address => showLocationSuccess(address, button, originalContent),
+            onError
+        ),
+        onError
+    );
+}
+
+function showLocationSuccess(address, button, originalContent) {
+    // Change button to success state
+    button.innerHTML = `
+        <svg class="w-3 h-3 lg:w-4 lg:h-4 text-green-400" fill="none" stroke="currentColor" viewBox="0 0 24 24">
+            <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M5 13l4 4L19 7"></path>
+        </svg>
+    `;
+    button.classList.remove('text-gray-500', 'hover:text-blue-400');
+    button.classList.add('text-green-400');
+    button.title = address ? `Ubicación: ${address}` : 'Ubicación guardada, sin dirección conocida';
+
+    // Show success message
+    showNotification('Ubicación agregada exitosamente', 'success');
+
+    // Reset button after 3 seconds
+    setTimeout(() => {
+        button.innerHTML = originalContent;
+        button.classList.remove('text-green-400');
+        button.classList.add('text-gray-500', 'hover:text-blue-400');
+        button.disabled = false;
+        button.title = 'Agregar ubicación';
+    }, 3000);
+}
+
+function showLocationError(message, button, originalContent) {
+    // Change button to error state
+    button.innerHTML = `
+        <svg class="w-3 h-3 lg:w-4 lg:h-4 text-red-400" fill="none" stroke="currentColor" viewBox="0 0 24 24">
+            <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M6 18L18 6M6 6l12 12"></path>
+        </svg>
+    `;
+    button.classList.remove('text-gray-500', 'hover:text-blue-400');
+    button.classList.add('text-red-400');
+
+    // Show error message
+    showNotification(message, 'error');
+
+    // Reset button after 3 seconds
+    setTimeout(() => {
+        button.innerHTML = originalContent;
+        button.classList.remove('text-red-400');
+        button.classList.add('text-gray-500', 'hover:text-blue-400');
+        button.disabled = false;
+    }, 3000);
+}
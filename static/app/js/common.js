@@ -0,0 +1,166 @@
+// Helpers shared by the board and the todo detail page
+
+function getCookie(name) {
+    let cookieValue = null;
+    if (document.cookie && document.cookie !== '') {
+        const cookies = document.cookie.split(';');
+        for (let i = 0; i < cookies.length; i++) {
+            const cookie = cookies[i].trim();
+            if (cookie.substring(0, name.length + 1) === (name + '=')) {
+                cookieValue = decodeURIComponent(cookie.substring(name.length + 1));
+                break;
+            }
+        }
+    }
+    return cookieValue;
+}
+
+function showNotification(message, type = 'info') {
+    // Create notification element
+    const notification = document.createElement('div');
+    notification.className = `fixed top-4 right-4 z-50 p-4 rounded-lg shadow-lg max-w-sm transform transition-all duration-300 translate-x-full`;
+
+    const bgColor = type === 'success' ? 'bg-green-600' : type === 'error' ? 'bg-red-600' : 'bg-blue-600';
+    notification.classList.add(bgColor, 'text-white');
+
+    notification.innerHTML = `
+        <div class="flex items-center justify-between">
+            <span class="text-sm font-medium"></span>
+            <button class="ml-4 text-white hover:text-gray-200" onclick="this.parentElement.parentElement.remove()">
+                <svg class="w-4 h-4" fill="none" stroke="currentColor" viewBox="0 0 24 24">
+                    <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M6 18L18 6M6 6l12 12"></path>
+                </svg>
+            </button>
+        </div>
+    `;
+    notification.querySelector('span').textContent = message;
+
+    document.body.appendChild(notification);
+
+    // Animate in
+    setTimeout(() => {
+        notification.classList.remove('translate-x-full');
+    }, 100);
+
+    // Auto remove after 5 seconds
+    setTimeout(() => {
+        notification.classList.add('translate-x-full');
+        setTimeout(() => {
+            if (notification.parentElement) {
+                notification.remove();
+            }
+        }, 300);
+    }, 5000);
+}
+
+// Location
+
+function getCurrentPosition(onPosition, onError) {
+    if (!navigator.geolocation) {
+        onError('La geolocalización no está soportada en este navegador.');
+        return;
+    }
+
+    const options = {
+        enableHighAccuracy: true,
+        timeout: 10000,
+        maximumAge: 60000
+    };
+
+    navigator.geolocation.getCurrentPosition(
+        function(position) {
+            onPosition(position.coords.latitude, position.coords.longitude);
+        },
+        function(error) {
+            let errorMessage = 'Error al obtener la ubicación.';
+
+            switch(error.code) {
+                case error.PERMISSION_DENIED:
+                    errorMessage = 'Permiso denegado para acceder a la ubicación.';
+                    break;
+                case error.POSITION_UNAVAILABLE:
+                    errorMessage = 'La información de ubicación no está disponible.';
+                    break;
+                case error.TIMEOUT:
+                    errorMessage = 'Tiempo de espera agotado al obtener la ubicación.';
+                    break;
+                default:
+                    errorMessage = 'Error desconocido al obtener la ubicación.';
+                    break;
+            }
+
+            onError(errorMessage);
+        },
+        options
+    );
+}
+
+function pollLocationStatus(statusUrl, onDone, onError, attempt = 0) {
+    if (attempt >= 20) {
+        onError('La dirección se está resolviendo; aparecerá en unos minutos.');
+        return;
+    }
+    setTimeout(() => {
+        fetch(statusUrl)
+        .then(response => response.json())
+        .then(data => {
+            if (data.status === 'done') {
+                onDone(data);
+            } else if (data.status === 'failed' || !data.success) {
+                onError(data.error || 'No se pudo obtener la dirección.');
+            } else {
+                pollLocationStatus(statusUrl, onDone, onError, attempt + 1);
+            }
+        })
+        .catch(() => pollLocationStatus(statusUrl, onDone, onError, attempt + 1));
+    }, Math.min(1000 * (attempt + 1), 5000));
+}
+
+// Saves the position of a todo; onDone gets the address once it is resolved,
+// right away or after polling the geocoding job
+function updateTodoLocation(todoId, latitude, longitude, onDone, onError) {
+    fetch(`/todo/location/${todoId}/`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': getCookie('csrftoken')
+        },
+        body: JSON.stringify({
+            latitude: latitude,
+            longitude: longitude
+        })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success && data.status === 'pending') {
+            pollLocationStatus(data.status_url, result => onDone(result.address), onError);
+        } else if (data.success) {
+            onDone(data.address);
+        } else {
+            onError(data.error || 'Error al actualizar la ubicación.');
+        }
+    })
+    .catch(error => {
+        console.error('Error updating location:', error);
+        onError('Error de conexión al actualizar la ubicación.');
+    });
+}
+
+// Changes since a cursor (see app/changes.py); render picks the HTML
+// partials that come with each todo ('board' or 'detail')
+function fetchChanges(url, cursor, render) {
+    const params = new URLSearchParams({since: cursor, render: render});
+    return fetch(`${url}?${params}`, {headers: {'Accept': 'application/json'}})
+    .then(response => {
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
+        return response.json();
+    });
+}
+
+function elementFromHtml(html) {
+    const template = document.createElement('template');
+    template.innerHTML = html.trim();
+    return template.content.firstElementChild;
+}
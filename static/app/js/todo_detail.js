@@ -0,0 +1,100 @@
+// Todo detail: location button. Needs common.js; the todo id comes from the
+// data-todo-id attribute of #addLocationBtn, the changes URL and cursor from
+// data attributes of this script tag.
+
+const detailScript = document.currentScript;
+let changesCursor = detailScript.dataset.changesCursor;
+
+document.addEventListener('DOMContentLoaded', function() {
+    const addLocationBtn = document.getElementById('addLocationBtn');
+
+    if (addLocationBtn) {
+        addLocationBtn.addEventListener('click', function() {
+            addLocationForDetail(addLocationBtn);
+        });
+    }
+});
+
+function addLocationForDetail(button) {
+    const originalContent = button.innerHTML;
+
+    // Show loading state
+    button.innerHTML = `
+        <svg class="w-4 h-4 animate-spin" fill="none" stroke="currentColor" viewBox="0 0 24 24">
+            <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M4 4v5h.582m15.356 2A8.001 8.001 0 004.582 9m0 0H9m11 11v-5h-.581m0 0a8.003 8.003 0 01-15.357-2m15.357 2H15"></path>
+        </svg>
+        <span>Obteniendo ubicación...</span>
+    `;
+    button.disabled = true;
+
+    const onError = message => showLocationError(message, button, originalContent);
+    getCurrentPosition(
+        (latitude, longitude) => updateTodoLocation(
+            button.dataset.todoId, latitude, longitude,
+            address => {
+                showLocationSuccess(button);
+                refreshLocation(button.dataset.todoId);
+                setTimeout(() => resetButton(button, originalContent, 'bg-green-600'), 3000);
+            },
+            onError
+        ),
+        onError
+    );
+}
+
+// Replaces the location block with the one rendered by the server
+function refreshLocation(todoId) {
+    fetchChanges(detailScript.dataset.changesUrl, changesCursor, 'detail')
+    .then(data => {
+        if (data.reset) {
+            window.location.reload();
+            return;
+        }
+        const todo = data.todos.find(changed => String(changed.id) === String(todoId));
+        if (todo) {
+            document.getElementById('todo-location').innerHTML = todo.html.location;
+        }
+        changesCursor = data.cursor;
+    })
+    .catch(error => console.error('Error refreshing location:', error));
+}
+
+function resetButton(button, originalContent, stateClass) {
+    button.innerHTML = originalContent;
+    button.classList.remove(stateClass);
+    button.classList.add('bg-accent-blue', 'hover:bg-blue-600');
+    button.disabled = false;
+}
+
+function showLocationSuccess(button) {
+    // Change button to success state
+    button.innerHTML = `
+        <svg class="w-4 h-4 text-green-400" fill="none" stroke="currentColor" viewBox="0 0 24 24">
+            <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M5 13l4 4L19 7"></path>
+        </svg>
+        <span class="text-green-400">Ubicación agregada</span>
+    `;
+    button.classList.remove('bg-accent-blue', 'hover:bg-blue-600');
+    button.classList.add('bg-green-600');
+
+    // Show success message
+    showNotification('Ubicación agregada exitosamente', 'success');
+}
+
+function showLocationError(message, button, originalContent) {
+    // Change button to error state
+    button.innerHTML = `
+        <svg class="w-4 h-4 text-red-400" fill="none" stroke="currentColor" viewBox="0 0 24 24">
+            <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M6 18L18 6M6 6l12 12"></path>
+        </svg>
+        <span class="text-red-400">Error</span>
+    `;
+    button.classList.remove('bg-accent-blue', 'hover:bg-blue-600');
+    button.classList.add('bg-red-600');
+
+    // Show error message
+    showNotification(message, 'error');
+
+    // Reset button after 3 seconds
+    setTimeout(() => resetButton(button, originalContent, 'bg-red-600'), 3000);
+}
@@ -13,4 +13,10 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todo_list.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from app.live import with_board_events  # noqa: E402  (needs the app registry)
+
+# The live board stream is served outside Django's request handling, which
+# would hold a thread and a database connection for each open stream
+application = with_board_events(django_application)
@@ -0,0 +1,87 @@
+"""
+Database configuration for settings.DATABASES.
+
+Two modes:
+
+- ``DATABASE_URL`` set (e.g. PostgreSQL on Render): parsed with
+  dj-database-url, with persistent connections (``DB_CONN_MAX_AGE``) and
+  health checks. ``DB_POOL_MAX_SIZE`` switches to Django's native connection
+  pool instead (PostgreSQL with psycopg 3 and psycopg-pool), which is what
+  ASGI deployments should use.
+- No ``DATABASE_URL``: the local SQLite file, tuned so several gunicorn
+  workers can write at once (see ``SQLITE_PRAGMAS``).
+"""
+from django.core.exceptions import ImproperlyConfigured
+
+# Applied on every new SQLite connection (Django's ``init_command``)
+SQLITE_PRAGMAS = {
+    # Readers no longer block the writer and vice versa
+    'journal_mode': 'WAL',
+    # In WAL mode only a power loss can lose the last commits, never corrupt
+    'synchronous': 'NORMAL',
+    'mmap_size': 128 * 1024 * 1024,
+    'cache_size': -20000,  # Negative = KiB, ~20 MB per connection
+    'busy_timeout': 5000,  # ms waiting for the write lock before "database is locked"
+    'temp_store': 'MEMORY',
+}
+
+
+def sqlite_options(pragmas=SQLITE_PRAGMAS):
+    return {
+        'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in pragmas.items()),
+        # Take the write lock at BEGIN: a deferred transaction that reads and
+        # then writes can fail instantly instead of waiting on busy_timeout
+        'transaction_mode': 'IMMEDIATE',
+    }
+
+
+def sqlite_database(path):
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path,
+        'OPTIONS': sqlite_options(),
+    }
+
+
+def url_database(url, conn_max_age=600, pool_min_size=0, pool_max_size=0):
+    """
+    ``DATABASES['default']`` for a ``DATABASE_URL``.
+
+    With ``pool_max_size`` the connections come from a pool shared by the
+    process and ``CONN_MAX_AGE`` must be 0 (Django rejects both together).
+    """
+    import dj_database_url
+
+    pooled = pool_max_size > 0
+    config = dj_database_url.parse(
+        url,
+        conn_max_age=0 if pooled else conn_max_age,
+        conn_health_checks=not pooled and conn_max_age > 0,
+    )
+    engine = config['ENGINE']
+    if engine == 'django.db.backends.sqlite3':
+        config.setdefault('OPTIONS', {}).update(sqlite_options())
+    elif pooled:
+        if engine != 'django.db.backends.postgresql':
+            raise ImproperlyConfigured('DB_POOL_MAX_SIZE is only supported with PostgreSQL')
+        try:
+            import psycopg_pool  # noqa: F401
+        except ImportError as e:
+            raise ImproperlyConfigured('DB_POOL_MAX_SIZE requires psycopg[pool] (psycopg 3)') from e
+        config.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': pool_min_size,
+            'max_size': pool_max_size,
+        }
+    return config
+
+
+def database_from_env(environ, default_sqlite_path):
+    url = environ.get('DATABASE_URL')
+    if not url:
+        return sqlite_database(default_sqlite_path)
+    return url_database(
+        url,
+        conn_max_age=int(environ.get('DB_CONN_MAX_AGE', '600')),
+        pool_min_size=int(environ.get('DB_POOL_MIN_SIZE', '2')),
+        pool_max_size=int(environ.get('DB_POOL_MAX_SIZE', '0')),
+    )
@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 
+from .database import database_from_env
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -54,7 +56,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'app.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -67,7 +71,8 @@ ROOT_URLCONF = 'todo_list.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that also times renders for /metrics
+        'BACKEND': 'app.metrics.InstrumentedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -87,13 +92,91 @@ WSGI_APPLICATION = 'todo_list.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# DATABASE_URL (with DB_CONN_MAX_AGE / DB_POOL_MAX_SIZE) or a tuned local
+# SQLite file; see todo_list/database.py
 DATABASES = {
+    'default': database_from_env(os.environ, BASE_DIR / 'db.sqlite3'),
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Rendered board fragments and their per-user version keys. LocMem is only
+    # coherent with a single worker process; set BOARD_CACHE_DIR to share a
+    # file-based cache between the workers of one host.
+    'board': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ['BOARD_CACHE_DIR'],
+    } if os.environ.get('BOARD_CACHE_DIR') else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'board',
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    },
+    # Sessions (cached modes) and authenticated users. With a per-process
+    # cache a logout or password change would not reach the other workers, so
+    # the cached SESSION_MODEs refuse to start without AUTH_CACHE_DIR (or
+    # another shared backend), see app.auth.check_shared_cache.
+    'auth': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ['AUTH_CACHE_DIR'],
+    } if os.environ.get('AUTH_CACHE_DIR') else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'auth',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+    # Shared between workers; create the table with `manage.py createcachetable`
+    'geocoding': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'geocoding_cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    },
 }
 
+# Mixed into dashboard/todo_detail ETags so a deploy with new templates
+# does not answer 304 with pages rendered by the old ones
+CONDITIONAL_GET_SALT = os.environ.get('RENDER_GIT_COMMIT', '')
+
+# Sessions and the authenticated user:
+# - 'db': Django's default, two queries (session + user) per request
+# - 'cached_db': sessions read from the 'auth' cache, written through to the DB
+# - 'signed_cookies': sessions kept in a signed cookie, no server storage
+# The cached modes also cache the user for AUTH_USER_CACHE_TTL seconds.
+# Switching modes logs everybody out once.
+SESSION_MODE = os.environ.get('SESSION_MODE', 'db')
+SESSION_ENGINE = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}[SESSION_MODE]
+SESSION_CACHE_ALIAS = 'auth'
+AUTH_CACHE_ALIAS = 'auth'
+AUTH_USER_CACHE_TTL = 0 if SESSION_MODE == 'db' else int(os.environ.get('AUTH_USER_CACHE_TTL', '300'))
+if SESSION_MODE != 'db':
+    AUTHENTICATION_BACKENDS = ['app.auth.CachedModelBackend']
+
+BOARD_CACHE_ALIAS = 'board'
+BOARD_CACHE_TTL = int(os.environ.get('BOARD_CACHE_TTL', '3600'))
+
+# Tombstones older than this are pruned by reconcile_counters (the newest one
+# per user and model is kept for ETags); /api/changes/ cursors older than
+# this get a reset.
+TOMBSTONE_RETENTION_DAYS = int(os.environ.get('TOMBSTONE_RETENTION_DAYS', '30'))
+
+# /metrics (Prometheus). With a token, scrapers send `Authorization: Bearer <token>`;
+# without one the endpoint is only served when DEBUG is on.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -131,16 +214,26 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
-# Configuración para archivos estáticos en producción
-if not DEBUG:
-    # En producción, solo usar STATIC_ROOT
-    STATIC_ROOT = BASE_DIR / 'staticfiles'
-else:
-    # En desarrollo, usar STATICFILES_DIRS
-    STATICFILES_DIRS = [
-        BASE_DIR / 'static',
-    ]
-    STATIC_ROOT = BASE_DIR / 'staticfiles'
+STATICFILES_DIRS = [
+    BASE_DIR / 'static',
+]
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# collectstatic writes content-hashed copies (served by WhiteNoise with
+# far-future, immutable cache headers) plus .br/.gz variants. Defaults to off
+# with DEBUG, which has no manifest; the test runner also uses plain names
+# (see todo_list/test_runner.py).
+STATIC_HASHED = os.environ.get('STATIC_HASHED', str(not DEBUG)).lower() == 'true'
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage' if STATIC_HASHED
+        else 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+TEST_RUNNER = 'todo_list.test_runner.TestRunner'
 
 # Login/Logout URLs
 LOGIN_REDIRECT_URL = '/todo/'
@@ -155,3 +248,40 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # LocationIQ API Configuration
 LOCATIONIQ_API_KEY = os.environ.get('LOCATIONIQ_API_KEY', '')
 LOCATIONIQ_BASE_URL = os.environ.get('LOCATIONIQ_BASE_URL', 'https://us1.locationiq.com/v1')
+
+# Reverse geocoding cache (in-process LRU + shared cache backend)
+LOCATIONIQ_CACHE_ALIAS = os.environ.get('LOCATIONIQ_CACHE_ALIAS', 'geocoding')
+LOCATIONIQ_CACHE_PRECISION = int(os.environ.get('LOCATIONIQ_CACHE_PRECISION', '4'))  # ~11 m
+LOCATIONIQ_CACHE_TTL = int(os.environ.get('LOCATIONIQ_CACHE_TTL', str(30 * 24 * 3600)))
+LOCATIONIQ_CACHE_NEGATIVE_TTL = int(os.environ.get('LOCATIONIQ_CACHE_NEGATIVE_TTL', '600'))
+LOCATIONIQ_CACHE_LRU_SIZE = int(os.environ.get('LOCATIONIQ_CACHE_LRU_SIZE', '1024'))
+
+# LocationIQ HTTP client: pool size, timeouts (seconds), retries and circuit breaker
+LOCATIONIQ_POOL_SIZE = int(os.environ.get('LOCATIONIQ_POOL_SIZE', '10'))
+LOCATIONIQ_CONNECT_TIMEOUT = float(os.environ.get('LOCATIONIQ_CONNECT_TIMEOUT', '2'))
+LOCATIONIQ_READ_TIMEOUT = float(os.environ.get('LOCATIONIQ_READ_TIMEOUT', '4'))
+LOCATIONIQ_TIME_BUDGET = float(os.environ.get('LOCATIONIQ_TIME_BUDGET', '6'))
+LOCATIONIQ_MAX_RETRIES = int(os.environ.get('LOCATIONIQ_MAX_RETRIES', '2'))
+LOCATIONIQ_BACKOFF_BASE = float(os.environ.get('LOCATIONIQ_BACKOFF_BASE', '0.2'))
+LOCATIONIQ_BACKOFF_MAX = float(os.environ.get('LOCATIONIQ_BACKOFF_MAX', '2'))
+LOCATIONIQ_BREAKER_THRESHOLD = int(os.environ.get('LOCATIONIQ_BREAKER_THRESHOLD', '5'))
+LOCATIONIQ_BREAKER_RESET_TIMEOUT = float(os.environ.get('LOCATIONIQ_BREAKER_RESET_TIMEOUT', '30'))
+
+# Background geocoding queue (`manage.py geocode_worker`)
+LOCATIONIQ_RATE_LIMIT = float(os.environ.get('LOCATIONIQ_RATE_LIMIT', '2'))  # requests/second
+GEOCODING_BATCH_SIZE = int(os.environ.get('GEOCODING_BATCH_SIZE', '20'))
+GEOCODING_MAX_ATTEMPTS = int(os.environ.get('GEOCODING_MAX_ATTEMPTS', '5'))
+GEOCODING_RETRY_DELAY = int(os.environ.get('GEOCODING_RETRY_DELAY', '30'))  # seconds, doubled per attempt
+GEOCODING_LEASE_SECONDS = int(os.environ.get('GEOCODING_LEASE_SECONDS', '300'))
+# Seconds update_todo_location may wait on LocationIQ before queueing (0 = always queue).
+# Worth enabling under ASGI, where waiting does not hold a worker.
+GEOCODING_INLINE_TIMEOUT = float(os.environ.get('GEOCODING_INLINE_TIMEOUT', '0'))
+
+# Live board updates (Server-Sent Events, ASGI only; see app/live.py)
+# 'app.live.LocalBroker' only reaches connections of the same process; with
+# several workers use 'app.live.CacheBroker' and a shared BOARD_CACHE_DIR.
+LIVE_BROKER = os.environ.get('LIVE_BROKER', 'app.live.LocalBroker')
+LIVE_POLL_INTERVAL = float(os.environ.get('LIVE_POLL_INTERVAL', '1'))  # seconds, CacheBroker
+LIVE_MAX_CONNECTIONS = int(os.environ.get('LIVE_MAX_CONNECTIONS', '10000'))  # per process
+LIVE_HEARTBEAT = float(os.environ.get('LIVE_HEARTBEAT', '25'))  # seconds between keep-alive comments
+LIVE_STREAM_MAX_AGE = float(os.environ.get('LIVE_STREAM_MAX_AGE', '300'))  # seconds, then the browser reconnects
@@ -0,0 +1,26 @@
+"""
+Test runner for ``python manage.py test`` (``settings.TEST_RUNNER``).
+
+Tests never run ``collectstatic``, so they use the plain static files
+storage even when ``STATIC_HASHED`` is on; tests that need the hashed
+storage override ``STORAGES`` themselves. Other runners (e.g. pytest) should
+set ``STATIC_HASHED=False`` in the environment instead.
+"""
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+PLAIN_STATIC_STORAGE = {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._plain_static = override_settings(
+            STORAGES={**settings.STORAGES, 'staticfiles': PLAIN_STATIC_STORAGE},
+        )
+        self._plain_static.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._plain_static.disable()
+        super().teardown_test_environment(**kwargs)